@@ -0,0 +1,297 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Measures the overhead of the tools themselves against an in-process fake
+msedgedriver, so it runs without a browser.
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --compare results.json --threshold 1.25
+
+With --compare, benchmarks whose median is more than threshold times the
+baseline median are reported and the exit status is 1.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import warnings
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_ROOT = os.path.join(_HERE, '..')
+sys.path.insert(1, _ROOT)
+sys.path.insert(1, os.path.join(_HERE, '..', 'tests'))
+
+import selenium
+from msedge.selenium_tools import Edge, EdgeOptions
+from msedge.selenium_tools.remote_connection import EdgeRemoteConnection
+from fake_msedgedriver import FakeDriverServer, FakeService
+
+try:
+    _clock = time.perf_counter
+except AttributeError:  # above is available in py3.3+
+    _clock = time.time
+
+BENCHMARKS = []
+
+
+def benchmark(iterations):
+    """
+    Registers a benchmark. The function receives the number of iterations
+    and returns a list with the seconds taken by each iteration.
+    """
+    def register(func):
+        BENCHMARKS.append((func.__name__[len('bench_'):], func, iterations))
+        return func
+    return register
+
+
+def _options():
+    options = EdgeOptions()
+    options.use_chromium = True
+    options.add_argument('--headless')
+    options.add_experimental_option('prefs', {'download.default_directory': '/tmp'})
+    return options
+
+
+def _timed(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = _clock()
+        func()
+        samples.append(_clock() - started)
+    return samples
+
+
+@benchmark(iterations=20000)
+def bench_options_to_capabilities(iterations):
+    options = _options()
+    return _timed(options.to_capabilities, iterations)
+
+
+@benchmark(iterations=5000)
+def bench_options_freeze(iterations):
+    options = _options()
+    return _timed(options.freeze, iterations)
+
+
+@benchmark(iterations=100)
+def bench_edge_startup(iterations):
+    samples = []
+    options = _options()
+    for _ in range(iterations):
+        service = FakeService()
+        service.start()
+        started = _clock()
+        driver = Edge(options=options, service=service)
+        samples.append(_clock() - started)
+        driver.quit()
+    return samples
+
+
+@benchmark(iterations=100)
+def bench_edge_startup_frozen(iterations):
+    samples = []
+    options = _options().freeze()
+    for _ in range(iterations):
+        service = FakeService()
+        service.start()
+        started = _clock()
+        driver = Edge(options=options, service=service)
+        samples.append(_clock() - started)
+        driver.quit()
+    return samples
+
+
+@benchmark(iterations=100)
+def bench_quit(iterations):
+    samples = []
+    options = _options()
+    for _ in range(iterations):
+        driver = Edge(options=options, service=FakeService())
+        started = _clock()
+        driver.quit()
+        samples.append(_clock() - started)
+    return samples
+
+
+def _command_benchmark(iterations, command):
+    driver = Edge(options=_options(), service=FakeService())
+    try:
+        return _timed(lambda: command(driver), iterations)
+    finally:
+        driver.quit()
+
+
+@benchmark(iterations=2000)
+def bench_execute_cdp_cmd(iterations):
+    return _command_benchmark(iterations, lambda driver: driver.execute_cdp_cmd('Browser.getVersion', {}))
+
+
+@benchmark(iterations=2000)
+def bench_set_network_conditions(iterations):
+    return _command_benchmark(iterations, lambda driver: driver.set_network_conditions(latency=5))
+
+
+@benchmark(iterations=2000)
+def bench_current_url(iterations):
+    return _command_benchmark(iterations, lambda driver: driver.current_url)
+
+
+@benchmark(iterations=2000)
+def bench_remote_connection_execute(iterations):
+    server = FakeDriverServer().start()
+    try:
+        connection = EdgeRemoteConnection(server.url)
+        return _timed(lambda: connection.execute('status', {}), iterations)
+    finally:
+        server.stop()
+
+
+_IMPORT_SCRIPT = '''
+import sys, time
+clock = getattr(time, 'perf_counter', time.time)
+started = clock()
+%s
+sys.stdout.write(repr(clock() - started))
+'''
+
+
+def _import_benchmark(iterations, statements):
+    # Every sample is a fresh interpreter, so nothing is cached in sys.modules.
+    script = _IMPORT_SCRIPT % statements
+    samples = []
+    for _ in range(iterations):
+        output = subprocess.check_output([sys.executable, '-W', 'ignore', '-c', script], cwd=_ROOT)
+        samples.append(float(output))
+    return samples
+
+
+@benchmark(iterations=20)
+def bench_import_package(iterations):
+    return _import_benchmark(iterations, 'import msedge.selenium_tools')
+
+
+@benchmark(iterations=20)
+def bench_import_options(iterations):
+    return _import_benchmark(iterations, '\n'.join([
+        'from msedge.selenium_tools import EdgeOptions',
+        'options = EdgeOptions()',
+        'options.use_chromium = True',
+        'options.to_capabilities()']))
+
+
+@benchmark(iterations=20)
+def bench_import_edge(iterations):
+    return _import_benchmark(iterations, 'from msedge.selenium_tools import Edge')
+
+
+def _summarize(samples):
+    ordered = sorted(samples)
+    count = len(ordered)
+    total = sum(ordered)
+    return {
+        'iterations': count,
+        'total': total,
+        'mean': total / count,
+        'median': ordered[count // 2],
+        'p90': ordered[min(count - 1, int(count * 0.9))],
+        'min': ordered[0],
+        'max': ordered[-1],
+        'ops_per_sec': count / total if total else None,
+    }
+
+
+def run(names=None, scale=1.0):
+    """
+    Runs the registered benchmarks, or those in names, and returns the
+    results as a JSON-serializable dict.
+
+    :Args:
+     - names - Optional list of benchmark names to run.
+     - scale - Factor applied to every benchmark's iteration count.
+    """
+    results = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        for name, func, iterations in BENCHMARKS:
+            if names and name not in names:
+                continue
+            results[name] = _summarize(func(max(1, int(iterations * scale))))
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'selenium': selenium.__version__,
+            'scale': scale,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """
+    Returns a list of (name, current median, baseline median, ratio) for
+    benchmarks slower than threshold times their baseline.
+    """
+    regressions = []
+    for name, result in current['results'].items():
+        previous = baseline['results'].get(name)
+        if not previous or not previous['median']:
+            continue
+        ratio = result['median'] / previous['median']
+        if ratio > threshold:
+            regressions.append((name, result['median'], previous['median'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('benchmarks', nargs='*', help='names of benchmarks to run (default: all)')
+    parser.add_argument('--output', help='write the JSON results to this file')
+    parser.add_argument('--compare', help='baseline JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='slowdown ratio of the median reported as a regression')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='factor applied to the iteration counts')
+    args = parser.parse_args(argv)
+
+    current = run(args.benchmarks, args.scale)
+    for name, result in sorted(current['results'].items()):
+        print('%-32s median %10.1fus  p90 %10.1fus  %12.0f ops/s' % (
+            name, result['median'] * 1e6, result['p90'] * 1e6, result['ops_per_sec'] or 0))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        for name, median, previous, ratio in regressions:
+            print('REGRESSION %s: median %.1fus vs %.1fus (x%.2f)' % (
+                name, median * 1e6, previous * 1e6, ratio))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -18,6 +18,56 @@
 # specific language governing permissions and limitations
 # under the License.
 
-from .webdriver import WebDriver as Edge  
-from .service import Service as EdgeService
-from .options import Options as EdgeOptions
\ No newline at end of file
+import sys
+
+# Public names and the modules defining them. They are imported on first
+# access, so that e.g. building EdgeOptions does not import selenium's
+# remote WebDriver stack.
+_LAZY_NAMES = {
+    'Edge': ('.webdriver', 'WebDriver'),
+    'EdgeService': ('.service', 'Service'),
+    'EdgeOptions': ('.options', 'Options'),
+    'EdgeServicePool': ('.service_pool', 'ServicePool'),
+    'EdgeSessionPool': ('.session_pool', 'SessionPool'),
+    'AsyncEdge': ('.async_webdriver', 'WebDriver'),
+    'launch_many': ('.launcher', 'launch_many'),
+    'EdgeStartupProfiler': ('.profiling', 'StartupProfiler'),
+    'EdgeExecutor': ('.executor', 'Executor'),
+    'close_all': ('.teardown', 'close_all'),
+}
+
+__all__ = sorted(_LAZY_NAMES)
+
+
+def _load(name):
+    from importlib import import_module
+    module_name, attribute = _LAZY_NAMES[name]
+    value = getattr(import_module(module_name, __name__), attribute)
+    globals()[name] = value
+    return value
+
+
+def __getattr__(name):
+    if name in _LAZY_NAMES:
+        return _load(name)
+    if not name.startswith('_'):
+        # Submodules are attributes of the package once imported, as they
+        # were when the public names were imported eagerly.
+        from importlib import import_module, util
+        if util.find_spec('%s.%s' % (__name__, name)) is not None:
+            return import_module('.' + name, __name__)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_NAMES))
+
+
+if sys.version_info < (3, 7):
+    # Module __getattr__ (PEP 562) is not available, so every public name
+    # is imported eagerly. AsyncEdge needs the async syntax of Python 3.5.
+    if sys.version_info < (3, 5):
+        del _LAZY_NAMES['AsyncEdge']
+        __all__.remove('AsyncEdge')
+    for _name in __all__:
+        _load(_name)
@@ -0,0 +1,180 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import logging
+import string
+from urllib import parse
+
+from selenium.webdriver.remote import utils
+from selenium.webdriver.remote.errorhandler import ErrorCode
+from selenium.webdriver.remote.remote_connection import RemoteConnection
+
+from .remote_connection import command_table
+
+LOGGER = logging.getLogger(__name__)
+
+
+class AsyncEdgeRemoteConnection(object):
+    """
+    An asyncio counterpart of EdgeRemoteConnection.
+
+    It has the same command table, including the Edge-specific launchApp,
+    setNetworkConditions, getNetworkConditions and executeCdpCommand
+    commands, and talks HTTP/1.1 over asyncio streams so that many
+    sessions can be driven from one event loop.
+    """
+
+    def __init__(self, remote_server_addr, keep_alive=True, timeout=None):
+        """
+        :Args:
+         - remote_server_addr - URL of the driver, e.g. http://localhost:9515
+         - keep_alive - Whether to reuse connections between commands.
+         - timeout - Seconds to wait for a response, or None to wait forever.
+        """
+        parsed = parse.urlparse(remote_server_addr)
+        if parsed.scheme != 'http':
+            raise ValueError("Only http:// driver URLs are supported: %s" % remote_server_addr)
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.w3c = True
+        self._url = remote_server_addr
+        self._host = parsed.hostname
+        self._port = parsed.port or 80
+        self._base_path = parsed.path.rstrip('/')
+        self._headers = RemoteConnection.get_remote_connection_headers(parsed, keep_alive)
+        self._headers['Host'] = parsed.netloc
+        self._commands = command_table()
+        self._idle = []
+
+    async def execute(self, command, params):
+        """
+        Send a command to the remote server.
+
+        :Args:
+         - command - A string specifying the command to execute.
+         - params - A dictionary of named parameters to send with the command as
+           its JSON payload.
+        """
+        command_info = self._commands[command]
+        assert command_info is not None, 'Unrecognised command %s' % command
+        path = string.Template(command_info[1]).substitute(params)
+        if self.w3c and isinstance(params, dict) and 'sessionId' in params:
+            del params['sessionId']
+        return await self._request(command_info[0], path, utils.dump_json(params))
+
+    async def execute_serialized(self, command, body, params=None):
+        """
+        Send a command whose JSON payload has already been serialized.
+        """
+        command_info = self._commands[command]
+        path = string.Template(command_info[1]).substitute(params or {})
+        return await self._request(command_info[0], path, body)
+
+    async def close(self):
+        """
+        Closes all idle connections.
+        """
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+
+    async def _request(self, method, path, body=None):
+        LOGGER.debug('%s %s %s' % (method, path, body))
+        if method not in ('POST', 'PUT'):
+            body = None
+        data = body.encode('UTF-8') if body else b''
+        headers = dict(self._headers)
+        headers['Content-Length'] = str(len(data))
+        if not self.keep_alive:
+            headers['Connection'] = 'close'
+        request = ['%s %s%s HTTP/1.1' % (method, self._base_path, path)]
+        request.extend('%s: %s' % item for item in headers.items())
+        payload = ('\r\n'.join(request) + '\r\n\r\n').encode('latin-1') + data
+
+        # A reused connection may have been closed by the server while it
+        # was idle; retry once on a fresh connection in that case.
+        while True:
+            reused = bool(self._idle)
+            reader, writer = self._idle.pop() if reused else \
+                await asyncio.open_connection(self._host, self._port)
+            try:
+                writer.write(payload)
+                response = await asyncio.wait_for(self._read_response(reader), self.timeout)
+                break
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if not reused:
+                    raise
+            except BaseException:
+                writer.close()
+                raise
+
+        statuscode, response_headers, raw = response
+        if self.keep_alive and response_headers.get('connection', '').lower() != 'close':
+            self._idle.append((reader, writer))
+        else:
+            writer.close()
+        LOGGER.debug("Finished Request")
+        return self._parse_response(statuscode, response_headers, raw)
+
+    async def _read_response(self, reader):
+        status_line = await reader.readuntil(b'\r\n')
+        statuscode = int(status_line.split(b' ', 2)[1])
+        headers = {}
+        while True:
+            line = await reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if 'content-length' in headers:
+            raw = await reader.readexactly(int(headers['content-length']))
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readuntil(b'\r\n')
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            raw = b''.join(chunks)
+        else:
+            headers['connection'] = 'close'
+            raw = await reader.read()
+        return statuscode, headers, raw
+
+    def _parse_response(self, statuscode, headers, raw):
+        data = raw.decode('UTF-8')
+        if 399 < statuscode <= 500:
+            return {'status': statuscode, 'value': data}
+        content_type = headers.get('content-type', '').split(';')
+        if any(x.startswith('image/png') for x in content_type):
+            return {'status': 0, 'value': data}
+        try:
+            data = utils.load_json(data.strip())
+        except ValueError:
+            if 199 < statuscode < 300:
+                status = ErrorCode.SUCCESS
+            else:
+                status = ErrorCode.UNKNOWN_ERROR
+            return {'status': status, 'value': data.strip()}
+
+        # Some of the drivers incorrectly return a response
+        # with no 'value' field when they should return null.
+        if 'value' not in data:
+            data['value'] = None
+        return data
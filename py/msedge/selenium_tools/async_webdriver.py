@@ -0,0 +1,338 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import errno
+import os
+import subprocess
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common import utils
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.errorhandler import ErrorHandler
+from selenium.webdriver.remote.webdriver import _make_w3c_caps
+from selenium.webdriver.remote import utils as remote_utils
+
+from .async_remote_connection import AsyncEdgeRemoteConnection
+from .options import Options, CapabilitiesSnapshot
+
+try:
+    _running_loop = asyncio.get_running_loop
+except AttributeError:  # above is available in py3.7+
+    _running_loop = asyncio.get_event_loop
+
+
+class AsyncService(object):
+    """
+    Starts and stops the EdgeDriver executable without blocking the event loop.
+    """
+
+    def __init__(self, executable_path, port=0, verbose=False, log_path=None,
+                 service_args=None, env=None):
+        """
+        Creates a new instance of the EdgeDriver service.
+
+        :param executable_path: Path to the Microsoft WebDriver binary.
+        :param port: Run the remote service on a specified port.
+            Defaults to 0, which binds to a random open port of the
+            system's choosing.
+        :verbose: Whether to make the webdriver more verbose (passes the
+            --verbose option to the binary). Defaults to False.
+        :param log_path: Optional path for the webdriver binary to log to.
+            Defaults to None which disables logging.
+        :param service_args : List of args to pass to the edgedriver service
+        """
+        self.path = executable_path
+        self.port = port or utils.free_port()
+        self.service_args = list(service_args or [])
+        if verbose:
+            self.service_args.append("--verbose")
+        self.log_path = log_path
+        self.env = env or os.environ
+        self.process = None
+
+    @property
+    def service_url(self):
+        """
+        Gets the url of the Service
+        """
+        return "http://%s" % utils.join_host_port('localhost', self.port)
+
+    def command_line_args(self):
+        return ["--port=%d" % self.port] + self.service_args
+
+    async def start(self, timeout=30):
+        """
+        Starts the driver and waits until its port accepts connections.
+
+        :Exceptions:
+         - WebDriverException : Raised either when it can't start the service
+           or when it can't connect to the service
+        """
+        log_file = open(self.log_path, 'a+') if self.log_path else subprocess.DEVNULL
+        try:
+            self.process = await asyncio.create_subprocess_exec(
+                self.path, *self.command_line_args(), env=self.env,
+                stdout=log_file, stderr=log_file, stdin=subprocess.DEVNULL)
+        except OSError as err:
+            if err.errno == errno.ENOENT:
+                raise WebDriverException(
+                    "'%s' executable needs to be in PATH. Please download from "
+                    "http://go.microsoft.com/fwlink/?LinkId=619687" % os.path.basename(self.path))
+            raise
+        finally:
+            if log_file is not subprocess.DEVNULL:
+                log_file.close()
+
+        loop = _running_loop()
+        deadline = loop.time() + timeout
+        delay = 0.005
+        try:
+            while True:
+                if self.process.returncode is not None:
+                    raise WebDriverException(
+                        'Service %s unexpectedly exited. Status code was: %s'
+                        % (self.path, self.process.returncode))
+                try:
+                    _, writer = await asyncio.open_connection('localhost', self.port)
+                except OSError:
+                    if loop.time() > deadline:
+                        raise WebDriverException("Can not connect to the Service %s" % self.path)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 0.5)
+                else:
+                    writer.close()
+                    return
+        except BaseException:
+            # Also when the start is cancelled, e.g. by asyncio.wait_for().
+            await self.stop()
+            raise
+
+    async def stop(self, timeout=10):
+        """
+        Stops the driver, killing it if it does not exit within timeout seconds.
+        """
+        process, self.process = self.process, None
+        if process is None or process.returncode is not None:
+            return
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+
+
+class WebDriver(object):
+    """
+    Controls Microsoft Edge from asyncio code.
+
+    Commands are coroutines, so hundreds of sessions can be driven from a
+    single event loop. Values are passed and returned as plain JSON;
+    elements are the raw W3C element references.
+
+    :Usage:
+        options = EdgeOptions()
+        options.use_chromium = True
+        driver = await AsyncEdge.create(options=options)
+        await driver.get('https://www.bing.com')
+        version = await driver.execute_cdp_cmd('Browser.getVersion', {})
+        await driver.quit()
+    """
+
+    def __init__(self, command_executor, service=None):
+        """
+        Wraps an AsyncEdgeRemoteConnection. Use AsyncEdge.create() to start
+        a driver service and a session.
+        """
+        self.command_executor = command_executor
+        self.service = service
+        self.session_id = None
+        self.capabilities = {}
+        self.w3c = True
+        self.error_handler = ErrorHandler()
+
+    @classmethod
+    async def create(cls, executable_path='', port=0, options=None,
+                     desired_capabilities=None, verbose=False,
+                     service_log_path=None, service_args=None, keep_alive=True):
+        """
+        Starts the EdgeDriver service and a new session.
+
+        :Args:
+         - executable_path - path to the executable. If the default is used it assumes the executable is in the $PATH
+         - port - port you would like the service to run, if left as 0, a free port will be found.
+         - options - an instance of EdgeOptions, or a snapshot created with EdgeOptions.freeze()
+         - desired_capabilities - Dictionary object with capabilities to merge
+           with those of the options.
+         - verbose - whether to set verbose logging in the service
+         - service_log_path - Where to log information from the driver.
+         - service_args - List of args to pass to the driver service
+         - keep_alive - Whether to reuse HTTP connections between commands.
+        """
+        if options is None:
+            options = Options()
+        use_chromium = options.use_chromium
+        if executable_path == '':
+            executable_path = 'msedgedriver' if use_chromium else 'MicrosoftWebDriver.exe'
+
+        service = AsyncService(executable_path, port=port, verbose=verbose,
+                               log_path=service_log_path, service_args=service_args)
+        await service.start()
+        try:
+            driver = cls(AsyncEdgeRemoteConnection(service.service_url, keep_alive=keep_alive),
+                         service)
+        except BaseException:
+            await service.stop()
+            raise
+        try:
+            if isinstance(options, CapabilitiesSnapshot) and desired_capabilities is None:
+                await driver.start_session(options)
+            else:
+                capabilities = options.to_capabilities()
+                if desired_capabilities is not None:
+                    capabilities = dict(capabilities, **desired_capabilities)
+                await driver.start_session(capabilities)
+        except BaseException:
+            await driver.quit()
+            raise
+        return driver
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.quit()
+
+    async def start_session(self, capabilities):
+        """
+        Creates a new session with the desired capabilities.
+        """
+        if isinstance(capabilities, CapabilitiesSnapshot):
+            if capabilities._session_body is None:
+                capabilities._session_body = remote_utils.dump_json({
+                    "capabilities": _make_w3c_caps(capabilities.to_capabilities()),
+                    "desiredCapabilities": capabilities})
+            response = await self.command_executor.execute_serialized(
+                Command.NEW_SESSION, capabilities._session_body)
+            self.error_handler.check_response(response)
+        else:
+            response = await self.execute(Command.NEW_SESSION, {
+                "capabilities": _make_w3c_caps(capabilities),
+                "desiredCapabilities": capabilities})
+        if 'sessionId' not in response:
+            response = response['value']
+        self.session_id = response['sessionId']
+        self.capabilities = response.get('value')
+        if self.capabilities is None:
+            self.capabilities = response.get('capabilities')
+        self.w3c = response.get('status') is None
+        self.command_executor.w3c = self.w3c
+
+    async def execute(self, driver_command, params=None):
+        """
+        Sends a command to be executed by the AsyncEdgeRemoteConnection.
+
+        :Returns:
+          The command's JSON response loaded into a dictionary object.
+        """
+        if self.session_id is not None:
+            if not params:
+                params = {'sessionId': self.session_id}
+            elif 'sessionId' not in params:
+                params['sessionId'] = self.session_id
+        response = await self.command_executor.execute(driver_command, params or {})
+        if response:
+            self.error_handler.check_response(response)
+            return response
+        return {'success': 0, 'value': None, 'sessionId': self.session_id}
+
+    async def get(self, url):
+        """
+        Loads a web page in the current browser session.
+        """
+        await self.execute(Command.GET, {'url': url})
+
+    async def current_url(self):
+        """
+        Gets the URL of the current page.
+        """
+        return (await self.execute(Command.GET_CURRENT_URL))['value']
+
+    async def title(self):
+        """
+        Returns the title of the current page.
+        """
+        return (await self.execute(Command.GET_TITLE))['value']
+
+    async def page_source(self):
+        """
+        Gets the source of the current page.
+        """
+        return (await self.execute(Command.GET_PAGE_SOURCE))['value']
+
+    async def execute_script(self, script, *args):
+        """
+        Synchronously executes JavaScript in the current window/frame.
+        """
+        command = Command.W3C_EXECUTE_SCRIPT if self.w3c else Command.EXECUTE_SCRIPT
+        return (await self.execute(command, {'script': script, 'args': list(args)}))['value']
+
+    async def get_screenshot_as_base64(self):
+        """
+        Gets the screenshot of the current window as a base64 encoded string.
+        """
+        return (await self.execute(Command.SCREENSHOT))['value']
+
+    async def launch_app(self, id):
+        """Launches Edge app specified by id."""
+        return await self.execute("launchApp", {'id': id})
+
+    async def get_network_conditions(self):
+        """
+        Gets Edge network emulation settings.
+        """
+        return (await self.execute("getNetworkConditions"))['value']
+
+    async def set_network_conditions(self, **network_conditions):
+        """
+        Sets Edge network emulation settings. See WebDriver.set_network_conditions().
+        """
+        await self.execute("setNetworkConditions", {
+            'network_conditions': network_conditions
+        })
+
+    async def execute_cdp_cmd(self, cmd, cmd_args):
+        """
+        Execute Edge Devtools Protocol command and get returned result.
+        See WebDriver.execute_cdp_cmd().
+        """
+        return (await self.execute("executeCdpCommand", {'cmd': cmd, 'params': cmd_args}))['value']
+
+    async def quit(self):
+        """
+        Closes the browser and shuts down the EdgeDriver executable
+        that is started when starting the EdgeDriver
+        """
+        try:
+            if self.session_id is not None:
+                await self.execute(Command.QUIT)
+        except Exception:
+            # We don't care about the message because something probably has gone wrong
+            pass
+        finally:
+            self.session_id = None
+            await self.command_executor.close()
+            if self.service is not None:
+                await self.service.stop()
@@ -0,0 +1,377 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Declarative resource blocking, set up on EdgeOptions and applied by Edge
+after the session is created.
+
+Requests matching URL patterns are blocked by the browser itself through
+Network.setBlockedURLs. Blocking by resource type and serving canned
+responses need the requests to be intercepted with the Fetch domain over
+a DevTools connection.
+"""
+
+import base64
+import logging
+import re
+import threading
+
+from .cdp import CdpError
+
+LOGGER = logging.getLogger(__name__)
+
+# The resource types of the DevTools protocol.
+RESOURCE_TYPES = (
+    'Document', 'Stylesheet', 'Image', 'Media', 'Font', 'Script', 'TextTrack',
+    'XHR', 'Fetch', 'EventSource', 'WebSocket', 'Manifest', 'SignedExchange',
+    'Ping', 'CSPViolationReport', 'Preflight', 'Other',
+)
+
+# Rules added by BlockingProfile.add_preset().
+PRESETS = {
+    'images': {'resource_types': ('Image',)},
+    'media': {'resource_types': ('Media',)},
+    'fonts': {'resource_types': ('Font',)},
+    'ads': {'urls': (
+        '*://*.doubleclick.net/*', '*://*.googlesyndication.com/*',
+        '*://*.googleadservices.com/*', '*://*.adservice.google.com/*',
+        '*://*.amazon-adsystem.com/*', '*://*.adnxs.com/*', '*://*.criteo.com/*',
+        '*://*.taboola.com/*', '*://*.outbrain.com/*', '*://*.moatads.com/*',
+    )},
+    'analytics': {'urls': (
+        '*://*.google-analytics.com/*', '*://*.googletagmanager.com/*',
+        '*://*.hotjar.com/*', '*://*.segment.io/*', '*://*.segment.com/*',
+        '*://*.mixpanel.com/*', '*://*.nr-data.net/*', '*://*.clarity.ms/*',
+        '*://*.scorecardresearch.com/*', '*://*.quantserve.com/*',
+    )},
+}
+
+
+def _pattern_to_regex(pattern):
+    # DevTools URL patterns: '*' matches any characters, '?' exactly one,
+    # and the pattern has to match the whole URL.
+    return re.escape(pattern).replace(r'\*', '.*').replace(r'\?', '.')
+
+
+_PATTERN_HOST = re.compile(r'^[^:/]*://([^/]*)/')
+_URL_HOST = re.compile(r'^[^:/]*://(?:[^@/]*@)?([^:/?#]*)')
+
+
+def _pattern_host(pattern):
+    # Returns the host a pattern is limited to, if its host part is a
+    # literal host name or '*.' followed by one.
+    match = _PATTERN_HOST.match(pattern)
+    if match is None:
+        return None
+    host = match.group(1)
+    if host.startswith('*.'):
+        host = host[2:]
+    if not host or any(c in host for c in '*?:@'):
+        return None
+    return host.lower()
+
+
+# Python before 3.5 allows at most 100 groups, the whole match included,
+# in a regular expression.
+_MAX_GROUPS = 99
+
+
+class _Matcher(object):
+    """
+    Matches URLs against some canned response patterns at once, with one
+    regular expression per _MAX_GROUPS patterns. Compiled on first use.
+    """
+
+    __slots__ = ('indexes', 'patterns', 'regexes')
+
+    def __init__(self, responses, indexes):
+        self.indexes = indexes
+        self.patterns = [responses[index].url_pattern for index in indexes]
+        self.regexes = None
+
+    def match(self, url):
+        regexes = self.regexes
+        if regexes is None:
+            regexes = self.regexes = [re.compile('(?:%s)\\Z' % '|'.join(
+                '(%s)' % _pattern_to_regex(pattern)
+                for pattern in self.patterns[start:start + _MAX_GROUPS]), re.DOTALL)
+                for start in range(0, len(self.patterns), _MAX_GROUPS)]
+        # The alternatives are tried in order, so the first match is the
+        # first matching pattern.
+        for offset, regex in enumerate(regexes):
+            match = regex.match(url)
+            if match is not None:
+                return self.indexes[offset * _MAX_GROUPS + match.lastindex - 1]
+        return None
+
+
+class CannedResponse(object):
+    """
+    A response served instead of requesting a URL.
+    """
+
+    __slots__ = ('url_pattern', 'status', 'headers', 'body')
+
+    def __init__(self, url_pattern, body=b'', status=200, headers=None, content_type=None):
+        if not isinstance(body, bytes):
+            body = body.encode('UTF-8')
+        headers = dict(headers or {})
+        if content_type is not None:
+            headers['Content-Type'] = content_type
+        self.url_pattern = url_pattern
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+class BlockingProfile(object):
+    """
+    A set of rules for the requests of a session: URL patterns to block,
+    resource types to block, and canned responses.
+
+    :Usage:
+        options = EdgeOptions()
+        options.use_chromium = True
+        options.add_blocking_preset('ads')
+        options.block_urls('*.mp4', '*://fonts.googleapis.com/*')
+        options.disable_images()
+        options.add_canned_response('*://example.com/config.json', '{"beta": false}',
+                                    content_type='application/json')
+        driver = Edge(options=options)
+    """
+
+    def __init__(self):
+        self.url_patterns = []
+        self.resource_types = []
+        self.responses = []
+        self._compiled = None
+
+    def __bool__(self):
+        return bool(self.url_patterns or self.resource_types or self.responses)
+
+    __nonzero__ = __bool__
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_compiled'] = None
+        return state
+
+    def block_urls(self, *patterns):
+        """
+        Blocks requests to URLs matching any of the patterns, in which '*'
+        matches any characters.
+        """
+        for pattern in patterns:
+            if not pattern:
+                raise ValueError("pattern can not be empty")
+            if pattern not in self.url_patterns:
+                self.url_patterns.append(pattern)
+        self._compiled = None
+        return self
+
+    def block_resource_types(self, *resource_types):
+        """
+        Blocks requests of the resource types, e.g. 'Image', 'Media' or
+        'Font'. See RESOURCE_TYPES.
+        """
+        for resource_type in resource_types:
+            if resource_type not in RESOURCE_TYPES:
+                raise ValueError("resource type should be one of %s" % ', '.join(RESOURCE_TYPES))
+            if resource_type not in self.resource_types:
+                self.resource_types.append(resource_type)
+        self._compiled = None
+        return self
+
+    def disable_images(self):
+        """
+        Blocks all image requests.
+        """
+        return self.block_resource_types('Image')
+
+    def add_response(self, url_pattern, body=b'', status=200, headers=None, content_type=None):
+        """
+        Serves a canned response to requests for URLs matching url_pattern.
+        The first matching response is used.
+
+        :Args:
+         - url_pattern - A URL pattern, in which '*' matches any characters
+           and '?' exactly one.
+         - body - The response body, as bytes or text encoded to UTF-8.
+         - status - The HTTP status code.
+         - headers - Optional dict of response headers.
+         - content_type - Optional Content-Type header.
+        """
+        self.responses.append(CannedResponse(url_pattern, body, status, headers, content_type))
+        self._compiled = None
+        return self
+
+    def add_preset(self, name):
+        """
+        Adds the rules of a PRESETS entry: 'ads', 'analytics', 'images',
+        'media' or 'fonts'.
+        """
+        if name not in PRESETS:
+            raise ValueError("preset should be one of %s" % ', '.join(sorted(PRESETS)))
+        preset = PRESETS[name]
+        self.block_urls(*preset.get('urls', ()))
+        self.block_resource_types(*preset.get('resource_types', ()))
+        return self
+
+    def copy(self):
+        """
+        Returns a copy that can be changed independently.
+        """
+        clone = BlockingProfile()
+        clone.url_patterns = list(self.url_patterns)
+        clone.resource_types = list(self.resource_types)
+        clone.responses = list(self.responses)
+        return clone
+
+    def compile(self):
+        """
+        Returns the CompiledProfile of the rules, compiled once and then
+        reused until the rules change.
+        """
+        compiled = self._compiled
+        if compiled is None:
+            compiled = self._compiled = CompiledProfile(self)
+        return compiled
+
+
+class CompiledProfile(object):
+    """
+    The rules of a BlockingProfile prepared for the browser and for
+    matching intercepted requests.
+
+    Canned response patterns naming a host, e.g. '*://*.example.com/*',
+    are indexed by that host, and only those for the URL's host and its
+    parent domains are tried. The patterns sharing a host, and those
+    without one, are each combined into a single regular expression, so
+    matching stays fast with thousands of rules.
+    """
+
+    def __init__(self, profile):
+        self.blocked_urls = list(profile.url_patterns)
+        self.blocked_types = frozenset(profile.resource_types)
+        self.responses = list(profile.responses)
+        self.fetch_patterns = [{'urlPattern': '*', 'resourceType': resource_type, 'requestStage': 'Request'}
+                               for resource_type in profile.resource_types]
+        self.fetch_patterns.extend({'urlPattern': response.url_pattern, 'requestStage': 'Request'}
+                                   for response in self.responses)
+        self._encoded = [{
+            'responseCode': response.status,
+            'responseHeaders': [{'name': k, 'value': str(v)} for k, v in response.headers.items()],
+            'body': base64.b64encode(response.body).decode('ascii'),
+        } for response in self.responses]
+        by_host = {}
+        other = []
+        for index, response in enumerate(self.responses):
+            host = _pattern_host(response.url_pattern)
+            (by_host.setdefault(host, []) if host else other).append(index)
+        self._by_host = dict((host, _Matcher(self.responses, indexes))
+                             for host, indexes in by_host.items())
+        self._other = _Matcher(self.responses, other) if other else None
+
+    def match(self, url):
+        """
+        Returns the index of the first canned response for url, or None.
+        """
+        best = self._other.match(url) if self._other is not None else None
+        if self._by_host:
+            match = _URL_HOST.match(url)
+            labels = match.group(1).lower().split('.') if match else ()
+            for i in range(len(labels)):
+                matcher = self._by_host.get('.'.join(labels[i:]))
+                if matcher is not None:
+                    index = matcher.match(url)
+                    if index is not None and (best is None or index < best):
+                        best = index
+        return best
+
+    def fulfill_params(self, index, request_id):
+        """
+        Returns the Fetch.fulfillRequest parameters of a canned response.
+        """
+        params = dict(self._encoded[index])
+        params['requestId'] = request_id
+        return params
+
+
+class ResourceBlocker(object):
+    """
+    Applies a CompiledProfile to the page of a driver.
+
+    :Attributes:
+     - fulfilled - Number of requests answered with a canned response.
+     - blocked - Number of requests blocked by resource type.
+     - continued - Number of intercepted requests let through.
+    """
+
+    def __init__(self, driver, compiled):
+        self.driver = driver
+        self.compiled = compiled
+        self.fulfilled = 0
+        self.blocked = 0
+        self.continued = 0
+        self._cdp = None
+        self._lock = threading.Lock()
+
+    def apply(self):
+        compiled = self.compiled
+        if compiled.blocked_urls:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': compiled.blocked_urls})
+        if compiled.fetch_patterns:
+            self._cdp = self.driver.connect_cdp()
+            self._cdp.on('Fetch.requestPaused', self._request_paused)
+            self._cdp.execute('Fetch.enable', {'patterns': compiled.fetch_patterns})
+        return self
+
+    def close(self):
+        """
+        Stops intercepting requests.
+        """
+        cdp, self._cdp = self._cdp, None
+        if cdp is not None:
+            cdp.close()
+
+    def _request_paused(self, params):
+        # Runs on the DevTools reader thread, so replies are not waited for.
+        cdp = self._cdp
+        if cdp is None:
+            return
+        request_id = params['requestId']
+        index = self.compiled.match(params.get('request', {}).get('url', ''))
+        if index is not None:
+            method, command = 'Fetch.fulfillRequest', self.compiled.fulfill_params(index, request_id)
+            counter = 'fulfilled'
+        elif params.get('resourceType') in self.compiled.blocked_types:
+            method, command = 'Fetch.failRequest', {'requestId': request_id, 'errorReason': 'BlockedByClient'}
+            counter = 'blocked'
+        else:
+            method, command = 'Fetch.continueRequest', {'requestId': request_id}
+            counter = 'continued'
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+        try:
+            cdp.send(method, command)
+        except CdpError:
+            LOGGER.debug("Could not answer paused request %s", request_id, exc_info=True)
@@ -0,0 +1,474 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import hashlib
+import itertools
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+
+try:
+    from urllib import parse
+    from urllib import request as url_request
+except ImportError:  # above is available in py3+, below is py2.7
+    import urlparse as parse
+    import urllib2 as url_request
+
+from selenium.common.exceptions import WebDriverException
+
+try:
+    from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+except ImportError:  # above is available in py3.2+, below is py2.7
+    class FutureTimeoutError(Exception):
+        pass
+
+    class Future(object):
+        """
+        The part of concurrent.futures.Future used by CdpConnection.
+        """
+
+        def __init__(self):
+            self._event = threading.Event()
+            self._result = None
+            self._exception = None
+
+        def done(self):
+            return self._event.is_set()
+
+        def cancelled(self):
+            return False
+
+        def set_result(self, result):
+            self._result = result
+            self._event.set()
+
+        def set_exception(self, exception):
+            self._exception = exception
+            self._event.set()
+
+        def result(self, timeout=None):
+            if not self._event.wait(timeout):
+                raise FutureTimeoutError()
+            if self._exception is not None:
+                raise self._exception
+            return self._result
+
+LOGGER = logging.getLogger(__name__)
+
+_WEBSOCKET_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+_OP_CONTINUATION = 0x0
+_OP_TEXT = 0x1
+_OP_BINARY = 0x2
+_OP_CLOSE = 0x8
+_OP_PING = 0x9
+_OP_PONG = 0xA
+
+
+class CdpError(WebDriverException):
+    """
+    Raised when a DevTools command fails or the DevTools connection is lost.
+    """
+
+    def __init__(self, msg=None, code=None):
+        WebDriverException.__init__(self, msg)
+        self.code = code
+
+
+class _WebSocket(object):
+    """
+    Minimal RFC 6455 client, sufficient for the DevTools protocol.
+    """
+
+    def __init__(self, url, timeout=30):
+        parsed = parse.urlparse(url)
+        if parsed.scheme != 'ws':
+            raise ValueError("Only ws:// DevTools URLs are supported: %s" % url)
+        self._sock = socket.create_connection((parsed.hostname, parsed.port or 80), timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._send_lock = threading.Lock()
+        # Frames may arrive in the same segment as the handshake response.
+        self._buffered = self._handshake(parsed, timeout)
+        self._sock.settimeout(None)
+        self._reader = self._sock.makefile('rb')
+
+    def _handshake(self, parsed, timeout):
+        key = base64.b64encode(os.urandom(16))
+        path = parsed.path or '/'
+        if parsed.query:
+            path += '?' + parsed.query
+        request = ('GET %s HTTP/1.1\r\n'
+                   'Host: %s\r\n'
+                   'Upgrade: websocket\r\n'
+                   'Connection: Upgrade\r\n'
+                   'Sec-WebSocket-Key: %s\r\n'
+                   'Sec-WebSocket-Version: 13\r\n\r\n') % (path, parsed.netloc, key.decode('ascii'))
+        self._sock.sendall(request.encode('ascii'))
+
+        response = b''
+        while b'\r\n\r\n' not in response:
+            data = self._sock.recv(4096)
+            if not data:
+                raise CdpError("DevTools WebSocket handshake failed: connection closed")
+            response += data
+        head, _, rest = response.partition(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        if ' 101 ' not in lines[0] + ' ':
+            raise CdpError("DevTools WebSocket handshake failed: %s" % lines[0])
+        headers = dict((name.strip().lower(), value.strip())
+                       for name, _, value in (line.partition(':') for line in lines[1:]))
+        expected = base64.b64encode(hashlib.sha1(key + _WEBSOCKET_GUID).digest()).decode('ascii')
+        if headers.get('sec-websocket-accept') != expected:
+            raise CdpError("DevTools WebSocket handshake failed: bad Sec-WebSocket-Accept")
+        return rest
+
+    def send(self, data, opcode=_OP_TEXT):
+        length = len(data)
+        if length < 126:
+            header = struct.pack('!BB', 0x80 | opcode, 0x80 | length)
+        elif length < 1 << 16:
+            header = struct.pack('!BBH', 0x80 | opcode, 0x80 | 126, length)
+        else:
+            header = struct.pack('!BBQ', 0x80 | opcode, 0x80 | 127, length)
+        mask = os.urandom(4)
+        with self._send_lock:
+            self._sock.sendall(header + mask + _apply_mask(data, mask))
+
+    def recv(self):
+        """
+        Returns the payload of the next data message, or None once the
+        connection is closed.
+        """
+        message = []
+        while True:
+            header = self._read(2)
+            if header is None:
+                return None
+            first, second = struct.unpack('!BB', header)
+            opcode = first & 0x0F
+            length = second & 0x7F
+            if length >= 126:
+                extended = self._read(2 if length == 126 else 8)
+                if extended is None:
+                    return None
+                length = struct.unpack('!H' if length == 126 else '!Q', extended)[0]
+            mask = None
+            if second & 0x80:
+                mask = self._read(4)
+                if mask is None:
+                    return None
+            payload = self._read(length) if length else b''
+            if payload is None:
+                return None
+            if mask:
+                payload = _apply_mask(payload, mask)
+
+            if opcode == _OP_CLOSE:
+                try:
+                    self.send(payload[:2], _OP_CLOSE)
+                except socket.error:
+                    pass
+                return None
+            if opcode == _OP_PING:
+                self.send(payload, _OP_PONG)
+                continue
+            if opcode == _OP_PONG:
+                continue
+            message.append(payload)
+            if first & 0x80:
+                return b''.join(message)
+
+    def _read(self, size):
+        data = b''
+        if self._buffered:
+            data, self._buffered = self._buffered[:size], self._buffered[size:]
+        if len(data) < size:
+            try:
+                data += self._reader.read(size - len(data))
+            except (socket.error, ValueError):
+                return None
+        if len(data) < size:
+            return None
+        return data
+
+    def close(self):
+        try:
+            self.send(struct.pack('!H', 1000), _OP_CLOSE)
+        except (socket.error, ValueError):
+            pass
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        # The file object keeps the descriptor open until it is closed too.
+        try:
+            self._reader.close()
+        except (socket.error, ValueError):
+            pass
+        self._sock.close()
+
+
+if hasattr(int, 'from_bytes'):
+    def _apply_mask(data, mask):
+        if not data:
+            return data
+        length = len(data)
+        key = (mask * (length // 4 + 1))[:length]
+        return (int.from_bytes(data, 'big') ^ int.from_bytes(key, 'big')).to_bytes(length, 'big')
+else:  # above is available in py3+, below is py2.7
+    def _apply_mask(data, mask):
+        data = bytearray(data)
+        mask = bytearray(mask)
+        for i in range(len(data)):
+            data[i] ^= mask[i & 3]
+        return bytes(data)
+
+
+class CdpConnection(object):
+    """
+    A direct DevTools Protocol connection to the browser.
+
+    Unlike WebDriver.execute_cdp_cmd(), which sends every command as its
+    own HTTP request through msedgedriver, commands are written to one
+    WebSocket without waiting for earlier replies, replies are matched to
+    commands by id, and events are delivered to subscribers.
+
+    :Usage:
+        cdp = driver.connect_cdp()
+        cdp.on('Network.requestWillBeSent', lambda params: print(params['request']['url']))
+        cdp.execute('Network.enable')
+        results = cdp.execute_many([('Runtime.evaluate', {'expression': '1 + 1'}),
+                                    ('Browser.getVersion', {})])
+        cdp.close()
+    """
+
+    def __init__(self, websocket_url, timeout=30):
+        """
+        Connects to a DevTools WebSocket endpoint.
+
+        :Args:
+         - websocket_url - The webSocketDebuggerUrl of a target or of the browser.
+         - timeout - Default number of seconds to wait for connecting and for replies.
+        """
+        self.websocket_url = websocket_url
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._listeners = {}
+        self._lock = threading.Lock()
+        # Closed by close(), and whether the reader saw the end of the stream.
+        self._closed = False
+        self._finished = False
+        self._socket = _WebSocket(websocket_url, timeout)
+        self._thread = threading.Thread(target=self._run, name='msedge-cdp-reader')
+        self._thread.daemon = True
+        self._thread.start()
+
+    @classmethod
+    def targets(cls, debugger_address, timeout=30):
+        """
+        Returns the list of DevTools targets served at debugger_address (host:port).
+        """
+        response = url_request.urlopen('http://%s/json/list' % debugger_address, timeout=timeout)
+        try:
+            return json.loads(response.read().decode('UTF-8'))
+        finally:
+            response.close()
+
+    @classmethod
+    def connect(cls, debugger_address, target_id=None, target_type='page', timeout=30):
+        """
+        Connects to a target of the browser listening at debugger_address.
+
+        :Args:
+         - debugger_address - The host:port the browser serves DevTools on.
+         - target_id - Id of the target to attach to. Defaults to the first
+           target of target_type.
+         - target_type - Type of target to pick when no id is given.
+         - timeout - Default number of seconds to wait for replies.
+        """
+        for target in cls.targets(debugger_address, timeout):
+            if target_id is not None and target['id'] == target_id or \
+                    target_id is None and target.get('type') == target_type:
+                return cls(target['webSocketDebuggerUrl'], timeout)
+        raise CdpError("No DevTools target found at %s" % debugger_address)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def closed(self):
+        return self._closed or self._finished
+
+    def send(self, method, params=None, session_id=None):
+        """
+        Sends a command without waiting for its reply.
+
+        :Args:
+         - method - A str, the DevTools command, e.g. 'Page.navigate'.
+         - params - A dict of command parameters.
+         - session_id - Optional flattened target session to send the command to.
+
+        :Returns:
+            A concurrent.futures.Future resolving to the command result.
+        """
+        future = Future()
+        message = {'id': next(self._ids), 'method': method, 'params': params or {}}
+        if session_id is not None:
+            message['sessionId'] = session_id
+        with self._lock:
+            if self._closed or self._finished:
+                raise CdpError("DevTools connection is closed")
+            self._pending[message['id']] = future
+        try:
+            self._socket.send(json.dumps(message).encode('UTF-8'))
+        except (socket.error, ValueError) as e:
+            with self._lock:
+                self._pending.pop(message['id'], None)
+            raise CdpError("Failed to send %s: %s" % (method, e))
+        return future
+
+    def execute(self, method, params=None, session_id=None, timeout=None):
+        """
+        Sends a command and returns its result dict.
+        """
+        future = self.send(method, params, session_id)
+        try:
+            return future.result(self.timeout if timeout is None else timeout)
+        except FutureTimeoutError:
+            self._forget([future])
+            raise
+
+    def execute_many(self, commands, session_id=None, timeout=None):
+        """
+        Sends all commands before waiting for the first reply.
+
+        :Args:
+         - commands - An iterable of (method, params) tuples.
+
+        :Returns:
+            A list of results in the order of the commands.
+        """
+        futures = [self.send(method, params, session_id) for method, params in commands]
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return [future.result(timeout) for future in futures]
+        except FutureTimeoutError:
+            self._forget(futures)
+            raise
+
+    def on(self, event, callback):
+        """
+        Subscribes callback(params) to an event such as 'Network.responseReceived'.
+
+        Callbacks run on the connection's reader thread and should return
+        quickly; commands may be sent from them, but their replies can not
+        be waited for there.
+        """
+        with self._lock:
+            self._listeners.setdefault(event, []).append(callback)
+
+    def off(self, event, callback):
+        """
+        Removes a callback added with on().
+        """
+        with self._lock:
+            listeners = self._listeners.get(event, [])
+            if callback in listeners:
+                listeners.remove(callback)
+
+    def wait_for(self, event, predicate=None, timeout=None):
+        """
+        Blocks until event is received, optionally one for which
+        predicate(params) is true, and returns its params.
+        """
+        future = Future()
+
+        def listener(params):
+            if not future.done() and (predicate is None or predicate(params)):
+                future.set_result(params)
+
+        self.on(event, listener)
+        try:
+            return future.result(self.timeout if timeout is None else timeout)
+        finally:
+            self.off(event, listener)
+
+    def close(self):
+        """
+        Closes the WebSocket and fails any command still waiting for a reply.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        # Also when the reader already saw the end of the stream, which
+        # leaves the socket open.
+        self._socket.close()
+        if self._thread is not threading.current_thread():
+            self._thread.join(self.timeout)
+        self._fail_pending()
+
+    def _run(self):
+        while True:
+            data = self._socket.recv()
+            if data is None:
+                break
+            try:
+                message = json.loads(data.decode('UTF-8'))
+            except ValueError:
+                LOGGER.warning("Ignoring malformed DevTools message")
+                continue
+            if 'id' in message:
+                with self._lock:
+                    future = self._pending.pop(message['id'], None)
+                if future is None or future.cancelled():
+                    continue
+                if 'error' in message:
+                    error = message['error']
+                    future.set_exception(CdpError(error.get('message'), error.get('code')))
+                else:
+                    future.set_result(message.get('result', {}))
+            elif 'method' in message:
+                with self._lock:
+                    listeners = list(self._listeners.get(message['method'], ()))
+                for listener in listeners:
+                    try:
+                        listener(message.get('params', {}))
+                    except Exception:
+                        LOGGER.exception("DevTools event listener for %s failed", message['method'])
+        with self._lock:
+            self._finished = True
+        self._fail_pending()
+
+    def _forget(self, futures):
+        # Drops commands whose reply is no longer waited for.
+        with self._lock:
+            for command_id, future in list(self._pending.items()):
+                if future in futures:
+                    del self._pending[command_id]
+
+    def _fail_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(CdpError("DevTools connection closed"))
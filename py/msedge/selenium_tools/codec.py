@@ -0,0 +1,102 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+
+class JsonCodec(object):
+    """
+    Encodes and decodes command payloads with the standard library json
+    module, like selenium does.
+
+    A codec has dumps(obj), returning str or bytes, and loads(data),
+    accepting the UTF-8 response body as bytes.
+    """
+
+    name = 'json'
+
+    def dumps(self, obj):
+        return json.dumps(obj)
+
+    def loads(self, data):
+        if isinstance(data, bytes):
+            data = data.decode('UTF-8')
+        return json.loads(data)
+
+
+class OrjsonCodec(object):
+    """
+    Encodes and decodes command payloads with orjson.
+    """
+
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def dumps(self, obj):
+        return self._orjson.dumps(obj)
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+
+class UjsonCodec(object):
+    """
+    Encodes and decodes command payloads with ujson.
+    """
+
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self._ujson = ujson
+
+    def dumps(self, obj):
+        return self._ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False)
+
+    def loads(self, data):
+        return self._ujson.loads(data)
+
+
+CODECS = {
+    'json': JsonCodec,
+    'orjson': OrjsonCodec,
+    'ujson': UjsonCodec,
+}
+
+# Tried in this order by get_codec('auto').
+PREFERRED = ('orjson', 'ujson', 'json')
+
+
+def get_codec(codec='auto'):
+    """
+    Returns a codec instance.
+
+    :Args:
+     - codec - A codec name from CODECS, 'auto' for the fastest one that
+       is installed, or a codec instance, which is returned as is.
+    """
+    if not isinstance(codec, str):
+        return codec
+    if codec == 'auto':
+        for name in PREFERRED:
+            try:
+                return CODECS[name]()
+            except ImportError:
+                continue
+    if codec not in CODECS:
+        raise ValueError("codec should be 'auto' or one of %s" % ', '.join(sorted(CODECS)))
+    return CODECS[codec]()
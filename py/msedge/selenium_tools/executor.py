@@ -0,0 +1,404 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+import logging
+import multiprocessing
+import os
+import pickle
+import signal
+import sys
+import time
+import traceback
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from .options import Options
+from .service import kill_process_tree
+
+LOGGER = logging.getLogger(__name__)
+
+
+class TaskTimeoutError(TimeoutException):
+    """
+    Raised for a task that did not finish within the executor's task_timeout.
+    """
+
+
+class WorkerCrashedError(WebDriverException):
+    """
+    Raised for a task whose worker process died more often than the
+    executor's max_retries allow.
+    """
+
+
+class RemoteTaskError(WebDriverException):
+    """
+    Raised in place of an exception of a task that could not be sent back
+    from the worker process. The worker's traceback is in stacktrace.
+    """
+
+
+def _create_driver(options, **driver_kwargs):
+    from .webdriver import WebDriver
+    return WebDriver(options=options, **driver_kwargs)
+
+
+class _Worker(object):
+
+    def __init__(self, context, options, driver_factory, driver_kwargs):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, options, driver_factory, driver_kwargs),
+            name='msedge-executor-worker')
+        self.process.daemon = True
+        self.process.start()
+        child_conn.close()
+        self.task = None
+        self.deadline = None
+        self.attempts = 0
+
+    def assign(self, task, timeout):
+        self.task = task
+        self.deadline = time.time() + timeout if timeout is not None else None
+        self.conn.send(task)
+
+    def kill(self):
+        _kill_process_tree(self.process)
+        self.conn.close()
+
+
+class Executor(object):
+    """
+    Runs a function over many inputs in a pool of worker processes, each
+    owning a long-lived Edge session created from the same options.
+
+    The function is called as fn(driver, item) in a worker process, so it
+    and its results must be picklable, e.g. a module level function
+    returning plain data.
+
+    :Usage:
+        def title(driver, url):
+            driver.get(url)
+            return driver.title
+
+        with EdgeExecutor(options, max_workers=8, task_timeout=60) as executor:
+            for url, result in zip(urls, executor.map(title, urls)):
+                print(url, result)
+    """
+
+    def __init__(self, options=None, max_workers=None, task_timeout=None,
+                 max_retries=1, max_pending=None, driver_factory=None,
+                 mp_context=None, **driver_kwargs):
+        """
+        Creates a new executor. Worker processes are started by the first map().
+
+        :Args:
+         - options - EdgeOptions for the sessions. They are frozen once and
+           the snapshot is sent to every worker.
+         - max_workers - Number of worker processes. Defaults to the number of CPUs.
+         - task_timeout - Seconds a task may run. A worker exceeding it is
+           killed along with its driver and browser, and replaced.
+         - max_retries - How often a task is retried on a fresh session after
+           its driver or worker process crashed.
+         - max_pending - Maximum number of finished results waiting for an
+           earlier result in map(). Defaults to twice max_workers.
+         - driver_factory - Optional picklable callable taking the options and
+           driver_kwargs and returning a driver. Defaults to Edge(options=...).
+         - mp_context - Optional multiprocessing context, e.g. for 'spawn'.
+         - driver_kwargs - Further keyword arguments for the driver factory.
+        """
+        if isinstance(options, Options):
+            options = options.freeze()
+        self.options = options
+        self.max_workers = max_workers or multiprocessing.cpu_count()
+        if self.max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.task_timeout = task_timeout
+        self.max_retries = max_retries
+        self.max_pending = max_pending or 2 * self.max_workers
+        self.driver_factory = driver_factory or _create_driver
+        self.driver_kwargs = driver_kwargs
+        self._context = mp_context or multiprocessing.get_context()
+        self._workers = []
+        self._running = False
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+    def map(self, fn, iterable, ordered=True, return_exceptions=False):
+        """
+        Calls fn(driver, item) for every item and yields the results as they
+        are consumed.
+
+        Items are taken from iterable only as workers become free, so a
+        slow consumer holds back the producers. Only one map() can run at a
+        time, until its iterator is exhausted or closed; tasks still running
+        when the iterator is closed early are cancelled by replacing their
+        workers.
+
+        :Args:
+         - fn - Picklable callable taking a driver and an item.
+         - iterable - The items.
+         - ordered - Whether results are yielded in the order of the items,
+           or as they finish.
+         - return_exceptions - Whether the exception of a failed task is
+           yielded in place of its result instead of being raised.
+
+        :Returns:
+            An iterator of results.
+        """
+        if self._closed:
+            raise RuntimeError("Executor has been shut down")
+        if self._running:
+            raise RuntimeError("Executor.map() is already running")
+        self._running = True
+        try:
+            results = self._map(fn, iter(iterable), ordered, return_exceptions)
+            # Runs up to the first yield, so that closing the iterator
+            # before its first result still ends the map.
+            next(results)
+        except BaseException:
+            self._running = False
+            raise
+        return results
+
+    def shutdown(self, timeout=30):
+        """
+        Quits every worker's session and stops the worker processes. Workers
+        that do not exit within timeout are killed along with their driver
+        and browser.
+        """
+        self._closed = True
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            try:
+                worker.conn.send(None)
+            except (IOError, OSError, ValueError):
+                pass
+        deadline = time.time() + timeout
+        for worker in workers:
+            worker.process.join(max(0, deadline - time.time()))
+            if worker.process.is_alive():
+                LOGGER.warning("Killing worker %d which did not exit", worker.process.pid)
+            worker.kill()
+
+    def _start_worker(self):
+        return _Worker(self._context, self.options, self.driver_factory, self.driver_kwargs)
+
+    def _map(self, fn, items, ordered, return_exceptions):
+        indexes = itertools.count()
+        exhausted = False
+        finished = {}
+        next_index = 0
+        try:
+            while len(self._workers) < self.max_workers:
+                self._workers.append(self._start_worker())
+            yield None  # consumed by map()
+            while True:
+                for worker in list(self._workers):
+                    if worker.task is not None or exhausted or len(finished) >= self.max_pending:
+                        continue
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        exhausted = True
+                        continue
+                    self._assign(worker, (next(indexes), fn, item), 0)
+
+                busy = [worker for worker in self._workers if worker.task is not None]
+                if not busy:
+                    if exhausted and not finished:
+                        return
+                    continue
+
+                for index, ok, value in self._collect(busy):
+                    finished[index] = (ok, value)
+                if not ordered:
+                    ready = list(finished)
+                else:
+                    ready = []
+                    while next_index in finished:
+                        ready.append(next_index)
+                        next_index += 1
+                for index in ready:
+                    ok, value = finished.pop(index)
+                    if ok or return_exceptions:
+                        yield value
+                    else:
+                        raise value
+        finally:
+            self._running = False
+            for worker in list(self._workers):
+                if worker.task is not None:
+                    worker.kill()
+                    self._replace(worker)
+
+    def _collect(self, busy):
+        # Waits for results, crashed workers or the earliest deadline and
+        # returns the finished (index, ok, value) tuples.
+        from multiprocessing.connection import wait  # available in py3.3+
+        deadlines = [worker.deadline for worker in busy if worker.deadline is not None]
+        timeout = max(0, min(deadlines) - time.time()) if deadlines else None
+        by_handle = {}
+        for worker in busy:
+            by_handle[worker.conn] = worker
+            by_handle[worker.process.sentinel] = worker
+        ready = set(by_handle[handle] for handle in wait(list(by_handle), timeout))
+
+        results = []
+        now = time.time()
+        for worker in busy:
+            index = worker.task[0]
+            if worker in ready:
+                try:
+                    if not worker.conn.poll():
+                        raise EOFError()
+                    ok, crashed, payload = worker.conn.recv()
+                except (EOFError, IOError, OSError):
+                    worker.kill()
+                    if worker.attempts < self.max_retries:
+                        LOGGER.warning("Worker %d crashed, retrying task %d", worker.process.pid, index)
+                        self._assign(self._replace(worker), worker.task, worker.attempts + 1)
+                        continue
+                    self._replace(worker)
+                    results.append((index, False, WorkerCrashedError(
+                        "Worker process died while running task %d" % index)))
+                    continue
+                task, worker.task = worker.task, None
+                if crashed and worker.attempts < self.max_retries:
+                    LOGGER.warning("Driver of worker %d crashed, retrying task %d on a new session",
+                                   worker.process.pid, index)
+                    self._assign(worker, task, worker.attempts + 1)
+                    continue
+                results.append((index, ok, _loads(payload)))
+            elif worker.deadline is not None and now >= worker.deadline:
+                LOGGER.warning("Task %d timed out, killing worker %d", index, worker.process.pid)
+                worker.kill()
+                self._replace(worker)
+                results.append((index, False, TaskTimeoutError(
+                    "Task %d did not finish within %s seconds" % (index, self.task_timeout))))
+        return results
+
+    def _assign(self, worker, task, attempts):
+        if not worker.process.is_alive():
+            worker.kill()
+            worker = self._replace(worker)
+        worker.attempts = attempts
+        try:
+            worker.assign(task, self.task_timeout)
+        except (IOError, OSError):
+            # Died since the check; the next _collect() notices and retries.
+            pass
+
+    def _replace(self, worker):
+        replacement = self._start_worker()
+        self._workers[self._workers.index(worker)] = replacement
+        return replacement
+
+
+def _loads(payload):
+    try:
+        return pickle.loads(payload)
+    except Exception as e:
+        return RemoteTaskError("Could not unpickle the result: %r" % e)
+
+
+def _dumps(ok, value):
+    try:
+        return ok, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        error = value if not ok else e
+        return False, pickle.dumps(RemoteTaskError(
+            "Could not pickle the %s: %r" % ('result' if ok else 'exception', error),
+            stacktrace=traceback.format_exception(type(error), error, error.__traceback__)),
+            pickle.HIGHEST_PROTOCOL)
+
+
+def _kill_process_tree(process):
+    if not process.is_alive():
+        process.join(0)
+        return
+    try:
+        # Workers lead their own process group, which their driver and
+        # browser processes belong to as well.
+        kill_process_tree(process.pid, process_group=True)
+    except OSError:
+        process.kill()
+    process.join()
+
+
+def _is_alive(driver):
+    process = getattr(driver.service, 'process', None)
+    if process is None or (hasattr(process, 'poll') and process.poll() is not None):
+        return False
+    try:
+        driver.current_window_handle
+        return True
+    except Exception:
+        return False
+
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        LOGGER.debug("Failed to quit driver", exc_info=True)
+
+
+def _worker_main(conn, options, driver_factory, driver_kwargs):
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+
+    def terminate(signum, frame):
+        sys.exit(1)
+    signal.signal(signal.SIGTERM, terminate)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    driver = None
+    try:
+        try:
+            driver = driver_factory(options, **driver_kwargs)
+        except Exception:
+            LOGGER.warning("Failed to create the worker's driver", exc_info=True)
+        while True:
+            task = conn.recv()
+            if task is None:
+                return
+            index, fn, item = task
+            crashed = False
+            try:
+                if driver is None:
+                    driver = driver_factory(options, **driver_kwargs)
+                ok, payload = _dumps(True, fn(driver, item))
+            except Exception as e:
+                if driver is None or not _is_alive(driver):
+                    # The executor decides whether to retry the task; the
+                    # next one gets a new session.
+                    crashed = True
+                    if driver is not None:
+                        _quit(driver)
+                        driver = None
+                ok, payload = _dumps(False, e)
+            conn.send((ok, crashed, payload))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        if driver is not None:
+            _quit(driver)
@@ -0,0 +1,467 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Builds HTTP Archive (HAR 1.2) entries from DevTools Network events while
+they arrive, and writes each entry to a file as soon as its request has
+completed.
+
+Events come from the performance log, which needs the session to be
+created with the 'ms:loggingPrefs' capability set to
+{'performance': 'ALL'}, or from a DevTools connection.
+"""
+
+import codecs
+import collections
+import json
+import logging
+import threading
+import time
+
+try:
+    from urllib import parse
+except ImportError:  # above is available in py3+, below is py2.7
+    import urlparse as parse
+
+LOGGER = logging.getLogger(__name__)
+
+HAR_VERSION = '1.2'
+
+NETWORK_EVENTS = (
+    'Network.requestWillBeSent',
+    'Network.responseReceived',
+    'Network.dataReceived',
+    'Network.loadingFinished',
+    'Network.loadingFailed',
+)
+
+PAGE_EVENTS = (
+    'Page.domContentEventFired',
+    'Page.loadEventFired',
+)
+
+# Performance log messages not containing any of these are not parsed.
+_LOG_PREFIXES = ('"Network.', '"Page.')
+
+
+def performance_log_events(driver, methods=NETWORK_EVENTS + PAGE_EVENTS):
+    """
+    Yields (method, params) for the DevTools events in the performance
+    log of driver, fetching log entries until there are no more.
+
+    The driver returns the entries logged since the previous fetch, so
+    draining the log regularly, e.g. after every page, keeps the batches
+    small. Messages of other events are skipped without being parsed.
+
+    :Args:
+     - driver - An Edge driver whose session logs performance entries.
+     - methods - The event names to yield, or None for all.
+    """
+    methods = frozenset(methods) if methods is not None else None
+    while True:
+        entries = driver.get_log('performance')
+        if not entries:
+            return
+        for entry in entries:
+            text = entry.get('message')
+            if not text or methods is not None and not any(p in text for p in _LOG_PREFIXES):
+                continue
+            try:
+                message = json.loads(text)['message']
+                method = message['method']
+            except (ValueError, KeyError, TypeError):
+                LOGGER.debug("Ignoring malformed performance log entry")
+                continue
+            if methods is None or method in methods:
+                yield method, message.get('params', {})
+        del entries
+
+
+class _Request(object):
+
+    __slots__ = ('params', 'response', 'page', 'data_length', 'encoded_length')
+
+    def __init__(self, params, page):
+        self.params = params
+        self.page = page
+        self.response = None
+        self.data_length = 0
+        self.encoded_length = None
+
+
+class _Page(object):
+
+    __slots__ = ('id', 'title', 'started', 'timestamp', 'on_content_load', 'on_load')
+
+    def __init__(self, id, title, started, timestamp):
+        self.id = id
+        self.title = title
+        self.started = started
+        self.timestamp = timestamp
+        self.on_content_load = -1
+        self.on_load = -1
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'startedDateTime': _iso(self.started),
+            'pageTimings': {'onContentLoad': self.on_content_load, 'onLoad': self.on_load},
+        }
+
+
+class HarBuilder(object):
+    """
+    Correlates Network events by request id and returns a HAR entry for
+    every request once it has finished or failed.
+
+    Only requests in flight are kept. When more than max_pending are,
+    the oldest is given up on and returned as an entry marked _incomplete,
+    so memory stays bounded however long the session runs.
+
+    :Usage:
+        builder = HarBuilder()
+        for entry in builder.entries(performance_log_events(driver)):
+            print(entry['request']['url'], entry['time'])
+    """
+
+    def __init__(self, max_pending=10000):
+        self.max_pending = max_pending
+        self.pages = []
+        self.dropped = 0
+        self._pending = collections.OrderedDict()
+        self._page = None
+        self._main_frame = None
+
+    def entries(self, events):
+        """
+        Yields HAR entries built from an iterable of (method, params) events.
+        """
+        for method, params in events:
+            for entry in self.feed(method, params):
+                yield entry
+
+    def feed(self, method, params):
+        """
+        Processes one event and returns the list of entries it completed.
+        """
+        handler = self._HANDLERS.get(method)
+        if handler is None:
+            return []
+        return handler(self, params)
+
+    def flush(self):
+        """
+        Returns the requests still in flight as entries marked _incomplete,
+        and forgets them.
+        """
+        pending, self._pending = self._pending, collections.OrderedDict()
+        return [self._entry(request, None, incomplete=True) for request in pending.values()]
+
+    def _request_will_be_sent(self, params):
+        completed = []
+        request_id = params.get('requestId')
+        previous = self._pending.pop(request_id, None)
+        if previous is not None and 'redirectResponse' in params:
+            previous.response = params['redirectResponse']
+            completed.append(self._entry(previous, params.get('timestamp')))
+        if params.get('type') == 'Document' and request_id == params.get('loaderId'):
+            frame = params.get('frameId')
+            if self._main_frame is None:
+                self._main_frame = frame
+            if frame == self._main_frame and previous is None:
+                self._page = _Page('page_%d' % (len(self.pages) + 1), params['request'].get('url', ''),
+                                   params.get('wallTime'), params.get('timestamp'))
+                self.pages.append(self._page)
+        self._pending[request_id] = _Request(params, self._page)
+        if len(self._pending) > self.max_pending:
+            self.dropped += 1
+            completed.append(self._entry(self._pending.popitem(last=False)[1], None, incomplete=True))
+        return completed
+
+    def _response_received(self, params):
+        request = self._pending.get(params.get('requestId'))
+        if request is not None:
+            request.response = params.get('response')
+        return []
+
+    def _data_received(self, params):
+        request = self._pending.get(params.get('requestId'))
+        if request is not None:
+            request.data_length += params.get('dataLength', 0)
+        return []
+
+    def _loading_finished(self, params):
+        request = self._pending.pop(params.get('requestId'), None)
+        if request is None:
+            return []
+        request.encoded_length = params.get('encodedDataLength')
+        return [self._entry(request, params.get('timestamp'))]
+
+    def _loading_failed(self, params):
+        request = self._pending.pop(params.get('requestId'), None)
+        if request is None:
+            return []
+        entry = self._entry(request, params.get('timestamp'))
+        entry['response']['_error'] = params.get('errorText')
+        return [entry]
+
+    def _dom_content_event_fired(self, params):
+        self._page_timing('on_content_load', params)
+        return []
+
+    def _load_event_fired(self, params):
+        self._page_timing('on_load', params)
+        return []
+
+    def _page_timing(self, attribute, params):
+        page = self._page
+        if page is not None and page.timestamp is not None and params.get('timestamp') is not None:
+            setattr(page, attribute, round((params['timestamp'] - page.timestamp) * 1000, 3))
+
+    _HANDLERS = {
+        'Network.requestWillBeSent': _request_will_be_sent,
+        'Network.responseReceived': _response_received,
+        'Network.dataReceived': _data_received,
+        'Network.loadingFinished': _loading_finished,
+        'Network.loadingFailed': _loading_failed,
+        'Page.domContentEventFired': _dom_content_event_fired,
+        'Page.loadEventFired': _load_event_fired,
+    }
+
+    def _entry(self, request, finished, incomplete=False):
+        sent = request.params
+        http_request = sent.get('request', {})
+        response = request.response or {}
+        timings, total = _timings(sent.get('timestamp'), response.get('timing'), finished)
+        protocol = _http_version(response.get('protocol'))
+        post_data = http_request.get('postData')
+        entry = {
+            'startedDateTime': _iso(sent.get('wallTime')),
+            'time': total,
+            'request': {
+                'method': http_request.get('method', 'GET'),
+                'url': http_request.get('url', ''),
+                'httpVersion': protocol,
+                'cookies': [],
+                'headers': _headers(http_request.get('headers')),
+                'queryString': _query_string(http_request.get('url', '')),
+                'headersSize': -1,
+                'bodySize': len(post_data.encode('UTF-8')) if post_data else 0,
+            },
+            'response': {
+                'status': response.get('status', 0),
+                'statusText': response.get('statusText', ''),
+                'httpVersion': protocol,
+                'cookies': [],
+                'headers': _headers(response.get('headers')),
+                'content': {
+                    'size': request.data_length,
+                    'mimeType': response.get('mimeType', 'x-unknown'),
+                },
+                'redirectURL': _header(response.get('headers'), 'location'),
+                'headersSize': -1,
+                'bodySize': -1 if request.encoded_length is None else request.encoded_length,
+            },
+            'cache': {},
+            'timings': timings,
+            '_requestId': sent.get('requestId'),
+            '_resourceType': sent.get('type'),
+        }
+        if post_data:
+            entry['request']['postData'] = {
+                'mimeType': _header(http_request.get('headers'), 'content-type'),
+                'text': post_data,
+            }
+        if response.get('remoteIPAddress'):
+            entry['serverIPAddress'] = response['remoteIPAddress']
+        if request.page is not None:
+            entry['pageref'] = request.page.id
+        if incomplete:
+            entry['_incomplete'] = True
+        return entry
+
+
+class HarWriter(object):
+    """
+    Writes a HAR file one entry at a time. The pages are written by close().
+
+    :Usage:
+        with open('session.har', 'wb') as f:
+            writer = HarWriter(f)
+            for entry in entries:
+                writer.write(entry)
+            writer.close(builder.pages)
+    """
+
+    def __init__(self, out):
+        self.out = codecs.getwriter('UTF-8')(out)
+        self.written = 0
+        self.out.write(u'{"log": {"version": "%s", "creator": {"name": "msedge-selenium-tools", '
+                       u'"version": "3.141.4"}, "entries": [' % HAR_VERSION)
+
+    def write(self, entry):
+        if self.written:
+            self.out.write(u',\n')
+        else:
+            self.out.write(u'\n')
+        self.out.write(json.dumps(entry, ensure_ascii=False))
+        self.written += 1
+
+    def close(self, pages=()):
+        self.out.write(u'\n], "pages": [')
+        self.out.write(u', '.join(json.dumps(page.as_dict(), ensure_ascii=False) for page in pages))
+        self.out.write(u']}}\n')
+        self.out.flush()
+
+
+class HarRecorder(object):
+    """
+    Streams the network activity of a driver into a HAR file. Created by
+    WebDriver.record_har().
+
+    :Attributes:
+     - builder - The HarBuilder correlating the events.
+     - entries_written - Number of entries written so far.
+    """
+
+    def __init__(self, driver, out, source='log', max_pending=10000):
+        if source not in ('log', 'cdp'):
+            raise ValueError("source should be 'log' or 'cdp'")
+        self.driver = driver
+        self.source = source
+        self.builder = HarBuilder(max_pending)
+        self._lock = threading.Lock()
+        self._file = open(out, 'wb') if not hasattr(out, 'write') else None
+        self._writer = HarWriter(self._file or out)
+        self._cdp = None
+        if source == 'log':
+            # Events logged before recording started are not wanted.
+            while driver.get_log('performance'):
+                pass
+        else:
+            self._cdp = driver.connect_cdp()
+            for method in NETWORK_EVENTS + PAGE_EVENTS:
+                self._cdp.on(method, self._listener(method))
+            self._cdp.execute_many([('Network.enable', {}), ('Page.enable', {})])
+
+    @property
+    def entries_written(self):
+        return self._writer.written
+
+    def collect(self):
+        """
+        Processes the events logged since the last call and writes the
+        entries of the requests that completed. Events of the 'cdp'
+        source are processed as they arrive.
+        """
+        if self.source == 'log':
+            for method, params in performance_log_events(self.driver):
+                self._feed(method, params)
+
+    def close(self):
+        """
+        Collects the remaining events, writes the requests still in flight
+        as incomplete entries, and finishes the HAR file.
+        """
+        if self._cdp is not None:
+            self._cdp.close()
+        else:
+            self.collect()
+        with self._lock:
+            for entry in self.builder.flush():
+                self._writer.write(entry)
+            self._writer.close(self.builder.pages)
+        if self._file is not None:
+            self._file.close()
+
+    def _listener(self, method):
+        return lambda params: self._feed(method, params)
+
+    def _feed(self, method, params):
+        with self._lock:
+            for entry in self.builder.feed(method, params):
+                self._writer.write(entry)
+
+
+def _timings(started, timing, finished):
+    # Converts Chromium's ResourceTiming, milliseconds relative to
+    # requestTime, into HAR timings. Returns (timings, total time).
+    if not timing:
+        total = round((finished - started) * 1000, 3) if started is not None and finished is not None else 0
+        return {'blocked': -1, 'dns': -1, 'connect': -1, 'send': 0, 'wait': 0,
+                'receive': max(total, 0), 'ssl': -1}, max(total, 0)
+    blocked = next((timing[key] for key in ('dnsStart', 'connectStart', 'sendStart')
+                    if timing.get(key, -1) >= 0), 0)
+    timings = {
+        'blocked': blocked,
+        'dns': _span(timing, 'dnsStart', 'dnsEnd'),
+        'connect': _span(timing, 'connectStart', 'connectEnd'),
+        'ssl': _span(timing, 'sslStart', 'sslEnd'),
+        'send': max(_span(timing, 'sendStart', 'sendEnd'), 0),
+        'wait': max(timing.get('receiveHeadersEnd', 0) - timing.get('sendEnd', 0), 0),
+        'receive': 0,
+    }
+    if finished is not None and timing.get('requestTime') is not None:
+        timings['receive'] = max(
+            (finished - timing['requestTime']) * 1000 - timing.get('receiveHeadersEnd', 0), 0)
+    for key in timings:
+        timings[key] = round(timings[key], 3)
+    total = sum(timings[key] for key in ('blocked', 'dns', 'connect', 'send', 'wait', 'receive')
+                if timings[key] > 0)
+    return timings, round(total, 3)
+
+
+def _span(timing, start, end):
+    if timing.get(start, -1) < 0 or timing.get(end, -1) < 0:
+        return -1
+    return timing[end] - timing[start]
+
+
+def _iso(wall_time):
+    if wall_time is None:
+        return None
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(wall_time)) + \
+        '.%03dZ' % int(wall_time % 1 * 1000)
+
+
+def _http_version(protocol):
+    if not protocol:
+        return 'HTTP/1.1'
+    return {'h2': 'HTTP/2.0', 'h3': 'HTTP/3.0', 'http/1.0': 'HTTP/1.0',
+            'http/1.1': 'HTTP/1.1'}.get(protocol.lower(), protocol)
+
+
+def _headers(headers):
+    if not headers:
+        return []
+    result = []
+    for name, value in headers.items():
+        # Repeated headers are joined with newlines.
+        for line in str(value).split('\n'):
+            result.append({'name': name, 'value': line})
+    return result
+
+
+def _header(headers, name):
+    for key, value in (headers or {}).items():
+        if key.lower() == name:
+            return value
+    return ''
+
+
+def _query_string(url):
+    query = parse.urlparse(url).query
+    return [{'name': name, 'value': value}
+            for name, value in parse.parse_qsl(query, keep_blank_values=True)]
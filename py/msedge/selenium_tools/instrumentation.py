@@ -0,0 +1,165 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bisect
+import threading
+
+
+class CommandEvent(object):
+    """
+    Describes one command sent through an EdgeRemoteConnection.
+
+    :Attributes:
+     - command - The command name, e.g. 'executeCdpCommand'.
+     - duration - Seconds from sending the request to parsing the response.
+     - request_bytes - Size of the request body.
+     - response_bytes - Size of the response body, 0 if none was received.
+     - error - The exception raised, or the error reported by the driver,
+       or None if the command succeeded.
+    """
+
+    __slots__ = ('command', 'duration', 'request_bytes', 'response_bytes', 'error')
+
+    def __init__(self, command, duration, request_bytes, response_bytes, error=None):
+        self.command = command
+        self.duration = duration
+        self.request_bytes = request_bytes
+        self.response_bytes = response_bytes
+        self.error = error
+
+    def __repr__(self):
+        return '<CommandEvent %s %.6fs %d/%d bytes%s>' % (
+            self.command, self.duration, self.request_bytes, self.response_bytes,
+            ' error' if self.error is not None else '')
+
+
+class LatencyHistogram(object):
+    """
+    A histogram of durations in logarithmic buckets, from 100 microseconds
+    doubling up to about two minutes. Percentiles are estimated as the
+    upper bound of the bucket they fall into.
+    """
+
+    BOUNDS = tuple(0.0001 * 2 ** i for i in range(21))
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        """
+        Returns the estimated q-th percentile (0-100), or None if empty.
+        """
+        if not self.count:
+            return None
+        rank = q / 100.0 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                bound = self.BOUNDS[index] if index < len(self.BOUNDS) else self.max
+                return min(bound, self.max)
+        return self.max
+
+
+class _CommandRecord(object):
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.errors = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+
+class CommandStats(object):
+    """
+    Aggregates CommandEvents per command name. Thread-safe.
+
+    :Usage:
+        stats = driver.command_executor.enable_stats()
+        ...
+        for command, summary in stats.summary().items():
+            print(command, summary['count'], summary['p99'])
+    """
+
+    def __init__(self):
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        self.record(event)
+
+    def record(self, event):
+        with self._lock:
+            record = self._records.get(event.command)
+            if record is None:
+                record = self._records[event.command] = _CommandRecord()
+            record.latency.add(event.duration)
+            record.request_bytes += event.request_bytes
+            record.response_bytes += event.response_bytes
+            if event.error is not None:
+                record.errors += 1
+
+    def summary(self):
+        """
+        Returns a dict keyed by command name with count, errors, mean, min,
+        p50, p90, p99 and max latency in seconds, and the total request
+        and response bytes.
+        """
+        with self._lock:
+            result = {}
+            for command, record in self._records.items():
+                latency = record.latency
+                result[command] = {
+                    'count': latency.count,
+                    'errors': record.errors,
+                    'mean': latency.total / latency.count,
+                    'min': latency.min,
+                    'p50': latency.percentile(50),
+                    'p90': latency.percentile(90),
+                    'p99': latency.percentile(99),
+                    'max': latency.max,
+                    'request_bytes': record.request_bytes,
+                    'response_bytes': record.response_bytes,
+                }
+            return result
+
+    def histogram(self, command):
+        """
+        Returns a copy of the LatencyHistogram of command, or None.
+        """
+        with self._lock:
+            record = self._records.get(command)
+            if record is None:
+                return None
+            histogram = LatencyHistogram()
+            histogram.__dict__.update(record.latency.__dict__)
+            histogram.counts = list(record.latency.counts)
+            return histogram
+
+    def reset(self):
+        with self._lock:
+            self._records.clear()
@@ -0,0 +1,152 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .options import Options
+from .service import Service
+from .teardown import close_all
+from .webdriver import WebDriver
+
+LOGGER = logging.getLogger(__name__)
+
+
+class LaunchResult(object):
+    """
+    The drivers started by launch_many() and how long starting them took.
+
+    :Attributes:
+     - drivers - The started drivers.
+     - timings - One dict per driver, in the same order, with the seconds
+       spent in 'service_start', 'new_session' and in 'total'.
+     - wall_time - Seconds from the call until every driver was started.
+    """
+
+    def __init__(self, drivers, timings, wall_time):
+        self.drivers = drivers
+        self.timings = timings
+        self.wall_time = wall_time
+
+    def __iter__(self):
+        return iter(self.drivers)
+
+    def __len__(self):
+        return len(self.drivers)
+
+    def quit_all(self):
+        """
+        Quits every driver, in parallel.
+        """
+        _quit_all(self.drivers)
+
+
+def launch_many(n, options=None, max_parallel=8, executable_path='',
+                service_factory=None, **driver_kwargs):
+    """
+    Starts n drivers concurrently, at most max_parallel at a time.
+
+    If any launch fails, launches that have not begun are cancelled, every
+    driver already started is quit, and the first error is raised.
+
+    :Args:
+     - n - Number of drivers to start.
+     - options - EdgeOptions for every driver. They are frozen once and the
+       snapshot is shared between the launches.
+     - max_parallel - Maximum number of launches in progress at once.
+     - executable_path - Path to the driver executable.
+     - service_factory - Optional callable returning a service for each
+       driver, e.g. EdgeServicePool.acquire. Defaults to a new EdgeService.
+     - driver_kwargs - Further keyword arguments passed to Edge(...).
+
+    :Returns:
+        A LaunchResult.
+    """
+    if isinstance(options, Options):
+        options = options.freeze()
+    use_chromium = options is not None and options.use_chromium
+    if executable_path == '':
+        executable_path = 'msedgedriver' if use_chromium else 'MicrosoftWebDriver.exe'
+    if service_factory is None:
+        def service_factory():
+            return Service(executable_path)
+
+    failed = threading.Event()
+
+    def launch(index):
+        if failed.is_set():
+            return index, None, None
+        started = time.time()
+        service = service_factory()
+        if getattr(service, 'process', None) is None:
+            try:
+                service.start()
+            except Exception:
+                _stop(service)
+                raise
+        service_started = time.time()
+        if failed.is_set():
+            _stop(service)
+            return index, None, None
+        driver = WebDriver(options=options, service=service, **driver_kwargs)
+        finished = time.time()
+        return index, driver, {
+            'service_start': service_started - started,
+            'new_session': finished - service_started,
+            'total': finished - started,
+        }
+
+    started = time.time()
+    drivers = [None] * n
+    timings = [None] * n
+    error = None
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_parallel, n)))
+    try:
+        futures = [executor.submit(launch, index) for index in range(n)]
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            try:
+                index, driver, timing = future.result()
+            except Exception as e:
+                if error is None:
+                    error = e
+                    failed.set()
+                    for pending in futures:
+                        pending.cancel()
+                else:
+                    LOGGER.warning("Another launch failed as well", exc_info=True)
+                continue
+            drivers[index] = driver
+            timings[index] = timing
+    finally:
+        executor.shutdown(wait=True)
+
+    if error is not None:
+        _quit_all([driver for driver in drivers if driver is not None])
+        raise error
+    return LaunchResult(drivers, timings, time.time() - started)
+
+
+def _quit_all(drivers):
+    close_all(drivers)
+
+
+def _stop(service):
+    try:
+        service.stop()
+    except Exception:
+        LOGGER.debug("Failed to stop service", exc_info=True)
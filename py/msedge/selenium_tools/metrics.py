@@ -0,0 +1,292 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import math
+import threading
+import time
+from array import array
+
+from selenium.common.exceptions import WebDriverException
+
+LOGGER = logging.getLogger(__name__)
+
+_NAN = float('nan')
+
+# Metrics of Performance.getMetrics reported per page by summaries(),
+# as their highest value while the page was shown. The counters and
+# durations are cumulative since the navigation, so that is their total.
+SUMMARY_METRICS = (
+    'JSHeapUsedSize',
+    'JSHeapTotalSize',
+    'Nodes',
+    'LayoutCount',
+    'RecalcStyleCount',
+    'LayoutDuration',
+    'RecalcStyleDuration',
+    'ScriptDuration',
+    'TaskDuration',
+)
+
+# Installed in every new document, so that the largest contentful paint
+# can be read once the page has loaded.
+_LCP_OBSERVER_SCRIPT = '''
+(function() {
+  try {
+    new PerformanceObserver(function(list) {
+      var entries = list.getEntries();
+      var last = entries[entries.length - 1];
+      window.__msedgeLargestContentfulPaint = last.renderTime || last.loadTime || last.startTime;
+    }).observe({type: 'largest-contentful-paint', buffered: true});
+  } catch (e) {}
+})();
+'''
+
+_NAVIGATION_TIMING_SCRIPT = '''
+var navigation = performance.getEntriesByType('navigation')[0];
+var timing = {url: location.href, ttfb: null, dom_content_loaded: null, load: null,
+              transfer_size: null, first_contentful_paint: null,
+              largest_contentful_paint: window.__msedgeLargestContentfulPaint || null};
+if (navigation) {
+  timing.ttfb = navigation.responseStart;
+  timing.dom_content_loaded = navigation.domContentLoadedEventEnd;
+  timing.load = navigation.loadEventEnd;
+  timing.transfer_size = navigation.transferSize;
+} else if (performance.timing) {
+  var t = performance.timing;
+  timing.ttfb = t.responseStart - t.navigationStart;
+  timing.dom_content_loaded = t.domContentLoadedEventEnd - t.navigationStart;
+  timing.load = t.loadEventEnd - t.navigationStart;
+}
+performance.getEntriesByType('paint').forEach(function(entry) {
+  if (entry.name == 'first-contentful-paint') timing.first_contentful_paint = entry.startTime;
+});
+return timing;
+'''
+
+
+class _Page(object):
+
+    __slots__ = ('navigation_start', 'first_sample', 'last_sample', 'samples', 'peaks', 'timing')
+
+    def __init__(self, navigation_start, sample_time):
+        self.navigation_start = navigation_start
+        self.first_sample = sample_time
+        self.last_sample = sample_time
+        self.samples = 0
+        self.peaks = array('d', [_NAN] * len(SUMMARY_METRICS))
+        self.timing = None
+
+
+class MetricsSampler(object):
+    """
+    Samples Performance.getMetrics of a driver's current page on a
+    background thread and keeps the samples as time series.
+
+    Every metric is stored in its own array of doubles, next to arrays of
+    the sample times and page numbers. A new page starts whenever the
+    NavigationStart metric changes. Per-page peaks are kept as samples
+    arrive, so summaries() still covers samples dropped once max_samples
+    is exceeded.
+
+    :Usage:
+        with driver.sample_metrics(interval=0.5) as sampler:
+            for url in urls:
+                driver.get(url)
+                sampler.capture_page()
+        for page in sampler.summaries():
+            print(page['url'], page['largest_contentful_paint'], page['JSHeapUsedSize'])
+    """
+
+    def __init__(self, driver, interval=1.0, max_samples=100000):
+        """
+        Creates a sampler. Sampling begins with start().
+
+        :Args:
+         - driver - An Edge (Chromium) driver.
+         - interval - Seconds between samples.
+         - max_samples - Number of samples kept. Beyond it the oldest
+           quarter is dropped.
+        """
+        self.driver = driver
+        self.interval = interval
+        self.max_samples = max_samples
+        self.errors = 0
+        self.times = array('d')
+        self.pages = array('l')
+        self._series = {}
+        self._pages = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._enabled = False
+        self._script_identifier = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        """
+        Enables the Performance domain and starts the sampling thread.
+        """
+        if not self._enabled:
+            self.driver.execute_cdp_cmd('Performance.enable', {'timeDomain': 'timeTicks'})
+            result = self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument',
+                                                 {'source': _LCP_OBSERVER_SCRIPT})
+            self._script_identifier = (result or {}).get('identifier')
+            self._enabled = True
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='msedge-metrics-sampler')
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the sampling thread, disables the Performance domain and
+        removes the paint observer from the documents loaded afterwards.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._enabled:
+            self._enabled = False
+            try:
+                self.driver.execute_cdp_cmd('Performance.disable', {})
+            except WebDriverException:
+                LOGGER.debug("Could not disable the Performance domain", exc_info=True)
+            identifier, self._script_identifier = self._script_identifier, None
+            if identifier is not None:
+                try:
+                    self.driver.execute_cdp_cmd('Page.removeScriptToEvaluateOnNewDocument',
+                                                {'identifier': identifier})
+                except WebDriverException:
+                    LOGGER.debug("Could not remove the paint observer script", exc_info=True)
+
+    def sample(self):
+        """
+        Takes a sample right away, in addition to those of the thread.
+        """
+        metrics = self.driver.execute_cdp_cmd('Performance.getMetrics', {}).get('metrics', [])
+        self._record(time.time(), dict((m['name'], m['value']) for m in metrics))
+
+    def capture_page(self):
+        """
+        Reads the navigation and paint timings of the current page, for
+        its summary. Call it once the page has loaded.
+
+        :Returns:
+            The timings, in milliseconds since the navigation started.
+        """
+        self.sample()
+        timing = self.driver.execute_script(_NAVIGATION_TIMING_SCRIPT)
+        with self._lock:
+            self._pages[-1].timing = timing
+        return timing
+
+    def metric_names(self):
+        """
+        Returns the names of the metrics sampled so far.
+        """
+        with self._lock:
+            return sorted(self._series)
+
+    def series(self, name):
+        """
+        Returns (times, values) arrays of a metric. Values are NaN in
+        samples taken before the browser reported the metric.
+        """
+        with self._lock:
+            values = self._series.get(name)
+            if values is None:
+                raise KeyError("Metric %s has not been sampled" % name)
+            return array('d', self.times), array('d', values)
+
+    def summaries(self):
+        """
+        Returns one dict per page with its url, the number of samples and
+        their time span, its navigation and paint timings if
+        capture_page() was called for it, and the peak of every
+        SUMMARY_METRICS metric.
+        """
+        with self._lock:
+            pages = list(self._pages)
+        result = []
+        for number, page in enumerate(pages):
+            timing = page.timing or {}
+            summary = {
+                'page': number,
+                'url': timing.get('url'),
+                'samples': page.samples,
+                'duration': page.last_sample - page.first_sample,
+                'ttfb': timing.get('ttfb'),
+                'dom_content_loaded': timing.get('dom_content_loaded'),
+                'load': timing.get('load'),
+                'transfer_size': timing.get('transfer_size'),
+                'first_contentful_paint': timing.get('first_contentful_paint'),
+                'largest_contentful_paint': timing.get('largest_contentful_paint'),
+            }
+            for name, peak in zip(SUMMARY_METRICS, page.peaks):
+                summary[name] = None if math.isnan(peak) else peak
+            result.append(summary)
+        return result
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.sample()
+            except Exception:
+                # E.g. while the browser is busy navigating.
+                with self._lock:
+                    self.errors += 1
+                LOGGER.debug("Failed to sample the page metrics", exc_info=True)
+
+    def _record(self, sample_time, metrics):
+        with self._lock:
+            count = len(self.times)
+            if count >= self.max_samples:
+                dropped = max(1, self.max_samples // 4)
+                del self.times[:dropped]
+                del self.pages[:dropped]
+                for values in self._series.values():
+                    del values[:dropped]
+                count -= dropped
+
+            navigation_start = metrics.get('NavigationStart')
+            if not self._pages or self._pages[-1].navigation_start != navigation_start:
+                self._pages.append(_Page(navigation_start, sample_time))
+            page = self._pages[-1]
+            page.samples += 1
+            page.last_sample = sample_time
+            for index, name in enumerate(SUMMARY_METRICS):
+                value = metrics.get(name)
+                # Also true while the peak is still NaN.
+                if value is not None and not value <= page.peaks[index]:
+                    page.peaks[index] = value
+
+            self.times.append(sample_time)
+            self.pages.append(len(self._pages) - 1)
+            for name, value in metrics.items():
+                values = self._series.get(name)
+                if values is None:
+                    values = self._series[name] = array('d', [_NAN] * count)
+                values.append(value)
+            for name, values in self._series.items():
+                if len(values) == count:
+                    values.append(_NAN)
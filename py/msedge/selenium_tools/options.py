@@ -19,11 +19,162 @@
 # under the License.
 
 import base64
+import copy
 import os
 import platform
+import threading
 import warnings
+from collections import OrderedDict
+
+# Same as selenium's DesiredCapabilities.EDGE. Importing that module would
+# import the whole of selenium.webdriver, which building options does not need.
+_EDGE_CAPABILITIES = {
+    "browserName": "MicrosoftEdge",
+    "version": "",
+    "platform": "WINDOWS"
+}
+
+
+class _EncodedExtensionCache(object):
+    """
+    Process-wide LRU cache of base64 encoded extension files, keyed by
+    path, modification time and size, and bounded by the total length of
+    the encoded strings.
+    """
+
+    # Multiple of 3 so that encoded chunks concatenate without padding.
+    CHUNK_SIZE = 3 * 256 * 1024
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._keys_by_path = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        stat = os.stat(path)
+        key = (path, getattr(stat, 'st_mtime_ns', stat.st_mtime), stat.st_size)
+        with self._lock:
+            encoded = self._entries.pop(key, None)
+            if encoded is not None:
+                self._entries[key] = encoded
+                return encoded
+        encoded = self.encode(path)
+        with self._lock:
+            self._discard(self._keys_by_path.get(path))
+            if len(encoded) <= self.max_bytes:
+                self._entries[key] = encoded
+                self._keys_by_path[path] = key
+                self._size += len(encoded)
+                while self._size > self.max_bytes:
+                    self._discard(next(iter(self._entries)))
+        return encoded
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_path.clear()
+            self._size = 0
+
+    def _discard(self, key):
+        encoded = self._entries.pop(key, None)
+        if encoded is not None:
+            self._size -= len(encoded)
+            del self._keys_by_path[key[0]]
+
+    @classmethod
+    def encode(cls, path):
+        # Should not use base64.encodestring() which inserts newlines every
+        # 76 characters (per RFC 1521).  Edgedriver has to remove those
+        # unnecessary newlines before decoding, causing performance hit.
+        chunks = []
+        with open(path, 'rb') as file_:
+            while True:
+                data = file_.read(cls.CHUNK_SIZE)
+                if not data:
+                    break
+                chunks.append(base64.b64encode(data).decode('UTF-8'))
+        return ''.join(chunks)
+
+
+_extension_cache = _EncodedExtensionCache()
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return _FrozenDict((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, dict):
+        return dict((k, _thaw(v)) for k, v in value.items())
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+class _FrozenDict(dict):
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("Frozen capabilities can not be modified")
+
+    __setitem__ = __delitem__ = _immutable
+    clear = pop = popitem = setdefault = update = __ior__ = _immutable
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (_freeze, (_thaw(self),))
+
+
+class CapabilitiesSnapshot(_FrozenDict):
+    """
+    An immutable capabilities dictionary created by Options.freeze().
+
+    It can be passed to Edge(...) as options from any number of threads.
+    The new session request body is serialized once and then reused.
+    """
+
+    def __init__(self, capabilities, options):
+        _FrozenDict.__init__(self, _freeze(capabilities))
+        self._options = options
+        self._session_body = None
 
-from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
+    @property
+    def use_chromium(self):
+        return self._options.use_chromium
+
+    @property
+    def blocking_profile(self):
+        """
+        The BlockingProfile of the options, or None. Its rules are
+        compiled once and shared by every session using the snapshot.
+        """
+        return self._options.blocking_profile
+
+    def to_capabilities(self):
+        """
+        Returns a mutable copy of the capabilities
+        """
+        return _thaw(self)
+
+    def clone(self):
+        """
+        Returns a mutable Options instance with the settings of the
+        snapshot, for example to freeze a per-worker variant.
+        """
+        return self._options.clone()
+
+    def __reduce__(self):
+        return (CapabilitiesSnapshot, (_thaw(self), self._options))
 
 
 class Options(object):
@@ -37,9 +188,10 @@ class Options(object):
         self._extensions = []
         self._experimental_options = {}
         self._debugger_address = None
-        self._caps = DesiredCapabilities.EDGE.copy()
+        self._caps = _EDGE_CAPABILITIES.copy()
         self._use_chromium = False
         self._use_webview = False
+        self._blocking_profile = None
     
     @property
     def use_chromium(self):
@@ -81,8 +233,36 @@ class Options(object):
 
             returns a dictionary with everything
         """
+        return self._build_capabilities(self._caps)
+
+    def freeze(self):
+        """
+        Returns an immutable CapabilitiesSnapshot of the current options.
+
+        Later changes to these options do not affect the snapshot, and the
+        snapshot can be shared between threads launching sessions.
+        """
+        return CapabilitiesSnapshot(self._build_capabilities(copy.deepcopy(self._caps)), self.clone())
+
+    def clone(self):
+        """
+        Returns a copy of these options that can be changed independently.
+
+        Only the top-level containers are copied; values stored in them,
+        such as experimental option dictionaries, are shared until replaced.
+        """
+        clone = copy.copy(self)
+        clone._arguments = list(self._arguments)
+        clone._extension_files = list(self._extension_files)
+        clone._extensions = list(self._extensions)
+        clone._experimental_options = self._experimental_options.copy()
+        clone._caps = self._caps.copy()
+        if self._blocking_profile is not None:
+            clone._blocking_profile = self._blocking_profile.copy()
+        return clone
+
+    def _build_capabilities(self, caps):
         if self.use_chromium:
-            caps = self._caps
             if self._use_webview:
                 caps['browserName'] = 'webview2'
             edge_options = self.experimental_options.copy()
@@ -95,11 +275,82 @@ class Options(object):
 
             caps[self.KEY] = edge_options
         else:
-            caps = self._caps
             caps['pageLoadStrategy'] = self._page_load_strategy
         caps['ms:edgeChromium'] = self.use_chromium
         return caps
 
+    @property
+    def blocking_profile(self):
+        """
+        Returns the BlockingProfile applied to sessions after they are
+        created, or None
+        """
+        return self._blocking_profile
+
+    @blocking_profile.setter
+    def blocking_profile(self, value):
+        """
+        Sets the rules for blocking requests of the sessions
+
+        :Args:
+         - value: a BlockingProfile, or None
+        """
+        self._blocking_profile = value
+
+    def _blocking(self):
+        if self._blocking_profile is None:
+            from .blocking import BlockingProfile
+            self._blocking_profile = BlockingProfile()
+        return self._blocking_profile
+
+    def block_urls(self, *patterns):
+        """
+        Blocks requests to URLs matching any of the patterns. Edge applies
+        blocking rules with DevTools commands right after creating the
+        session; they cover the pages of its first window.
+
+        :Args:
+         - patterns: URL patterns, in which '*' matches any characters
+        """
+        self._blocking().block_urls(*patterns)
+
+    def block_resource_types(self, *resource_types):
+        """
+        Blocks requests of resource types such as 'Image', 'Media', 'Font'
+        or 'Script'
+
+        :Args:
+         - resource_types: names from blocking.RESOURCE_TYPES
+        """
+        self._blocking().block_resource_types(*resource_types)
+
+    def disable_images(self):
+        """
+        Blocks all image requests
+        """
+        self._blocking().disable_images()
+
+    def add_canned_response(self, url_pattern, body=b'', status=200, headers=None, content_type=None):
+        """
+        Answers requests for URLs matching url_pattern with a fixed
+        response instead of requesting them
+
+        :Args:
+         - url_pattern: URL pattern, in which '*' matches any characters and '?' exactly one
+         - body: the response body, bytes or text
+         - status: the HTTP status code
+         - headers: optional dict of response headers
+         - content_type: optional Content-Type header
+        """
+        self._blocking().add_response(url_pattern, body, status, headers, content_type)
+
+    def add_blocking_preset(self, name):
+        """
+        Adds a set of blocking rules: 'ads', 'analytics', 'images', 'media'
+        or 'fonts'
+        """
+        self._blocking().add_preset(name)
+
     @property
     def binary_location(self):
         """
@@ -160,16 +411,9 @@ class Options(object):
         """
         Returns a list of encoded extensions that will be loaded into edge
 
+        Encoded files are cached process-wide until they change on disk.
         """
-        encoded_extensions = []
-        for ext in self._extension_files:
-            file_ = open(ext, 'rb')
-            # Should not use base64.encodestring() which inserts newlines every
-            # 76 characters (per RFC 1521).  Edgedriver has to remove those
-            # unnecessary newlines before decoding, causing performance hit.
-            encoded_extensions.append(base64.b64encode(file_.read()).decode('UTF-8'))
-
-            file_.close()
+        encoded_extensions = [_extension_cache.get(ext) for ext in self._extension_files]
         return encoded_extensions + self._extensions
 
     def add_extension(self, extension):
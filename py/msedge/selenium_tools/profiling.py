@@ -0,0 +1,151 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+try:
+    _clock = time.perf_counter
+except AttributeError:  # above is available in py3.3+
+    _clock = time.time
+
+LOGGER = logging.getLogger(__name__)
+
+
+class PhaseTimer(object):
+    """
+    Records the seconds between consecutive mark() calls under the name
+    of the phase that just ended.
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self._started = self._last = _clock()
+
+    def mark(self, phase):
+        now = _clock()
+        self.timings[phase] = self.timings.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def add(self, timings):
+        for phase, seconds in timings.items():
+            self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+
+    def elapsed(self):
+        return _clock() - self._started
+
+
+class _NullPhaseTimer(object):
+
+    timings = None
+
+    def mark(self, phase):
+        pass
+
+    def add(self, timings):
+        pass
+
+
+NULL_TIMER = _NullPhaseTimer()
+
+
+class StartupProfiler(object):
+    """
+    Collects how long each phase of WebDriver construction takes.
+
+    Pass it to Edge(startup_profiler=...). Each launch stores its timings
+    in driver.startup_timings, passes them to callback and adds them to
+    the profiler, which summarizes them across launches.
+
+    Phases, in seconds:
+     - capabilities - resolving and encoding the capabilities
+     - binary_resolution - looking up the driver executable on the PATH
+     - process_spawn - starting the driver process
+     - port_readiness - waiting for the driver to accept connections
+     - connection - creating the EdgeRemoteConnection
+     - new_session - the new session HTTP round trip
+     - total - the whole construction
+
+    :Usage:
+        profiler = StartupProfiler()
+        for _ in range(20):
+            Edge(options=options, startup_profiler=profiler).quit()
+        print(profiler.summary()['port_readiness']['p90'])
+    """
+
+    PHASES = ('capabilities', 'binary_resolution', 'process_spawn',
+              'port_readiness', 'connection', 'new_session', 'total')
+
+    def __init__(self, callback=None, max_samples=10000):
+        """
+        :Args:
+         - callback - Optional callable receiving the timings dict of each launch.
+         - max_samples - Number of most recent launches kept for the summary.
+        """
+        self.callback = callback
+        self._samples = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def timer(self):
+        return PhaseTimer()
+
+    def record(self, timings):
+        """
+        Adds the timings of one launch and passes them to the callback.
+        """
+        with self._lock:
+            self._samples.append(dict(timings))
+        if self.callback is not None:
+            try:
+                self.callback(timings)
+            except Exception:
+                LOGGER.exception("Startup profiler callback failed")
+
+    @property
+    def count(self):
+        with self._lock:
+            return len(self._samples)
+
+    def summary(self, percentiles=(50, 90, 99)):
+        """
+        Returns a dict keyed by phase with the number of launches that went
+        through the phase, the mean, min and max, and a 'pN' entry for each
+        of the requested percentiles, all in seconds.
+        """
+        with self._lock:
+            samples = list(self._samples)
+        result = {}
+        for phase in self.PHASES:
+            values = sorted(sample[phase] for sample in samples if phase in sample)
+            if not values:
+                continue
+            summary = {
+                'count': len(values),
+                'mean': sum(values) / len(values),
+                'min': values[0],
+                'max': values[-1],
+            }
+            for q in percentiles:
+                # nearest-rank percentile
+                index = min(len(values), max(1, int(math.ceil(q * len(values) / 100.0)))) - 1
+                summary['p%g' % q] = values[index]
+            result[phase] = summary
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
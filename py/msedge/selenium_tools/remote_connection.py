@@ -18,14 +18,842 @@
 # specific language governing permissions and limitations
 # under the License.
 
+import logging
+import os
+import socket
+import string
+import tempfile
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from functools import partial
+
+import urllib3
+
+try:
+    from urllib import parse
+except ImportError:  # above is available in py3+, below is py2.7
+    import urlparse as parse
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.remote import utils
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.errorhandler import ErrorCode
 from selenium.webdriver.remote.remote_connection import RemoteConnection
 
+from . import watchdog
+from .codec import get_codec
+from .instrumentation import CommandEvent, CommandStats
+from .streaming import CHUNK_SIZE, Base64Decoder, CountingWriter, FieldExtractor
+
+try:
+    _clock = time.perf_counter
+except AttributeError:  # above is available in py3.3+
+    _clock = time.time
+
+try:
+    basestring
+except NameError:  # Python 3.x
+    basestring = str
+
+try:
+    _replace = os.replace
+except AttributeError:  # above is available in py3.3+, below is py2.7
+    def _replace(source, destination):
+        if os.name == 'nt' and os.path.exists(destination):
+            os.remove(destination)
+        os.rename(source, destination)
+
+LOGGER = logging.getLogger(__name__)
+
+
+class PoolStats(object):
+    """
+    Counters of the HTTP connection pool of an EdgeRemoteConnection.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self.connections_expired = 0
+        self._lock = threading.Lock()
+
+    def increment(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'connections_opened': self.connections_opened,
+                'connections_reused': self.connections_reused,
+                'connections_expired': self.connections_expired,
+            }
+
+
+class _HTTPConnection(urllib3.connection.HTTPConnection):
+    """
+    Counts every socket it opens, including when urllib3 reconnects a
+    pooled connection that was dropped or expired.
+    """
+
+    stats = None
+
+    def connect(self):
+        urllib3.connection.HTTPConnection.connect(self)
+        if self.stats is not None:
+            self.stats.increment('connections_opened')
+
+
+class _HTTPConnectionPool(urllib3.HTTPConnectionPool):
+    """
+    Connection pool that closes connections idle for longer than
+    idle_timeout and counts what it does into stats.
+    """
+
+    ConnectionCls = _HTTPConnection
+    idle_timeout = None
+    stats = None
+
+    def _new_conn(self):
+        conn = urllib3.HTTPConnectionPool._new_conn(self)
+        conn.stats = self.stats
+        return conn
+
+    def _get_conn(self, timeout=None):
+        conn = urllib3.HTTPConnectionPool._get_conn(self, timeout)
+        if conn is not None and conn.sock is not None:
+            idle_since = getattr(conn, '_idle_since', None)
+            if self.idle_timeout is not None and idle_since is not None \
+                    and time.time() - idle_since > self.idle_timeout:
+                conn.close()
+                self.stats.increment('connections_expired')
+            else:
+                self.stats.increment('connections_reused')
+        return conn
+
+    def _put_conn(self, conn):
+        if conn is not None:
+            conn._idle_since = time.time()
+        urllib3.HTTPConnectionPool._put_conn(self, conn)
+
+    def urlopen(self, method, url, *args, **kwargs):
+        # urllib3 calls urlopen again for retries and redirects, with the
+        # earlier attempts in the history of retries; those are not counted.
+        retries = args[2] if len(args) > 2 else kwargs.get('retries')
+        if not getattr(retries, 'history', None):
+            self.stats.increment('requests')
+        return urllib3.HTTPConnectionPool.urlopen(self, method, url, *args, **kwargs)
+
+
+class _PoolManager(urllib3.PoolManager):
+
+    def __init__(self, idle_timeout=None, **kwargs):
+        urllib3.PoolManager.__init__(self, **kwargs)
+        self.pool_classes_by_scheme = dict(self.pool_classes_by_scheme, http=_HTTPConnectionPool)
+        self.idle_timeout = idle_timeout
+        self.stats = PoolStats()
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        pool = urllib3.PoolManager._new_pool(self, scheme, host, port, request_context)
+        if isinstance(pool, _HTTPConnectionPool):
+            pool.idle_timeout = self.idle_timeout
+            pool.stats = self.stats
+        return pool
+
+
+class CommandTimeoutError(TimeoutException):
+    """
+    Raised when a command sent through an EdgeRemoteConnection did not
+    complete within its deadline.
+
+    :Attributes:
+     - command - The command name, or None for a raw request.
+     - timeout - The deadline in seconds.
+    """
+
+    def __init__(self, msg=None, screen=None, stacktrace=None, command=None, timeout=None):
+        TimeoutException.__init__(self, msg, screen, stacktrace)
+        self.command = command
+        self.timeout = timeout
+
+
+def _response_error(response):
+    # Returns the W3C error name or legacy status code of an error
+    # response, or None. Responses with a 4xx or 5xx status carry the
+    # driver's JSON as text.
+    value = response.get('value')
+    if response.get('status') and isinstance(value, basestring):
+        try:
+            value = utils.load_json(value)
+        except ValueError:
+            pass
+        else:
+            if isinstance(value, dict):
+                value = value.get('value', value)
+    if isinstance(value, dict) and 'error' in value:
+        return value['error']
+    return response.get('status') or None
+
+
+def _is_read_timeout(error):
+    if isinstance(error, urllib3.exceptions.MaxRetryError):
+        error = error.reason
+    return isinstance(error, (urllib3.exceptions.ReadTimeoutError, socket.timeout))
+
+
+class Endpoint(object):
+    """
+    One driver of a load-balanced EdgeRemoteConnection.
+
+    :Attributes:
+     - url - The driver's URL.
+     - healthy - False while the endpoint is ejected from session placement.
+     - sessions - Ids of the sessions placed on the endpoint.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.healthy = True
+        self.sessions = set()
+        self.pending = 0
+
+    def __repr__(self):
+        return '<Endpoint %s %s, %d sessions>' % (
+            self.url, 'healthy' if self.healthy else 'ejected', len(self.sessions))
+
+
+_EDGE_COMMANDS = {
+    'launchApp': ('POST', '/session/$sessionId/chromium/launch_app'),
+    'setNetworkConditions': ('POST', '/session/$sessionId/chromium/network_conditions'),
+    'getNetworkConditions': ('GET', '/session/$sessionId/chromium/network_conditions'),
+    'executeCdpCommand': ('POST', '/session/$sessionId/ms/cdp/execute'),
+}
+
+_command_table = None
+
+
+def command_table():
+    """
+    Returns a copy of the command table of EdgeRemoteConnection: a dict
+    of command names to (HTTP method, path template) tuples.
+    """
+    global _command_table
+    if _command_table is None:
+        # Selenium builds its table in RemoteConnection.__init__; without
+        # keep_alive that creates no connection pool.
+        commands = RemoteConnection('http://localhost', keep_alive=False, resolve_ip=False)._commands
+        commands.update(_EDGE_COMMANDS)
+        _command_table = commands
+    return dict(_command_table)
+
+
+def _health_check_loop(connection_ref, interval, stopped):
+    # Holds only a weak reference, so the connection can be collected.
+    while not stopped.wait(interval):
+        connection = connection_ref()
+        if connection is None:
+            return
+        try:
+            connection.check_health()
+        except Exception:
+            LOGGER.exception("Endpoint health check failed")
+        del connection
+
 
 class EdgeRemoteConnection(RemoteConnection):
 
-    def __init__(self, remote_server_addr, keep_alive=True):
-        RemoteConnection.__init__(self, remote_server_addr, keep_alive)
-        self._commands["launchApp"] = ('POST', '/session/$sessionId/chromium/launch_app')
-        self._commands["setNetworkConditions"] = ('POST', '/session/$sessionId/chromium/network_conditions')
-        self._commands["getNetworkConditions"] = ('GET', '/session/$sessionId/chromium/network_conditions')
-        self._commands['executeCdpCommand'] = ('POST', '/session/$sessionId/ms/cdp/execute')
+    # Defaults for the keep-alive connection pool, used when the
+    # corresponding constructor arguments are not given.
+    pool_maxsize = 10
+    pool_block = False
+    pool_idle_timeout = 60
+
+    PLACEMENTS = ('least_sessions', 'round_robin')
+    health_check_timeout = 5
+
+    def __init__(self, remote_server_addr, keep_alive=True, resolve_ip=True,
+                 pool_maxsize=None, pool_block=None, pool_idle_timeout=None,
+                 placement='least_sessions', health_check_interval=None,
+                 command_timeout=None, command_timeouts=None, json_codec=None):
+        """
+        Creates a connection to a driver, or to several drivers between
+        which new sessions are balanced.
+
+        :Args:
+         - remote_server_addr - URL of the driver, or a list of driver URLs.
+           With several, each new session is placed on one of the healthy
+           drivers and the session's commands are sent to that driver.
+         - keep_alive - Whether to keep connections open in a pool and reuse them.
+         - resolve_ip - Whether to resolve the host name to an IP address up front.
+         - pool_maxsize - Maximum number of connections kept per host. Threads
+           issuing commands concurrently each use their own connection.
+         - pool_block - Whether a thread waits for a free connection when
+           pool_maxsize connections are in use, rather than opening an extra one.
+         - pool_idle_timeout - Seconds after which an idle connection is closed
+           instead of reused.
+         - placement - How new sessions are placed on several drivers:
+           'least_sessions' picks the driver with the fewest active sessions,
+           'round_robin' takes the drivers in turn.
+         - health_check_interval - Seconds between /status checks of several
+           drivers. Drivers failing them are ejected from placement until
+           they pass again. Without it, only drivers that are unreachable or
+           refuse a new session are ejected, and check_health() can be
+           called to readmit them. A refused session is retried on the next
+           driver; if every driver refuses it, they are readmitted and the
+           last refusal is raised.
+         - command_timeout - Seconds every command may take, or None to wait
+           indefinitely. A command exceeding it raises CommandTimeoutError,
+           after calling on_timeout(command) if it is set.
+         - command_timeouts - Dict of deadlines for specific commands, e.g.
+           {'get': 300}, overriding command_timeout. None disables the
+           deadline of a command.
+         - json_codec - How command payloads and responses are (de)serialized:
+           a codec name such as 'orjson', 'auto' for the fastest installed
+           one, or a codec instance. See codec.get_codec(). Defaults to the
+           json module, through selenium.
+
+        :Usage:
+            executor = EdgeRemoteConnection(
+                ['http://edge1:9515', 'http://edge2:9515'], health_check_interval=10)
+            driver = webdriver.Remote(command_executor=executor, desired_capabilities=caps)
+        """
+        if placement not in self.PLACEMENTS:
+            raise ValueError("placement should be one of %s" % ', '.join(self.PLACEMENTS))
+        self._endpoints = None
+        if isinstance(remote_server_addr, (list, tuple, set, frozenset)):
+            addresses = list(remote_server_addr)
+            if not addresses:
+                raise ValueError("remote_server_addr should not be empty")
+            remote_server_addr = addresses[0]
+            if len(addresses) > 1:
+                self._endpoints = [Endpoint(
+                    RemoteConnection(address, keep_alive=False, resolve_ip=resolve_ip)._url)
+                    for address in addresses]
+        RemoteConnection.__init__(self, remote_server_addr, keep_alive, resolve_ip)
+        if keep_alive:
+            self._conn = _PoolManager(
+                timeout=self._timeout,
+                maxsize=self.pool_maxsize if pool_maxsize is None else pool_maxsize,
+                block=self.pool_block if pool_block is None else pool_block,
+                idle_timeout=self.pool_idle_timeout if pool_idle_timeout is None else pool_idle_timeout,
+                socket_options=[(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)])
+        self._observers = ()
+        self._stats = None
+        self.placement = placement
+        self.command_timeout = command_timeout
+        self.command_timeouts = dict(command_timeouts or {})
+        self._codec = get_codec(json_codec) if json_codec is not None else None
+        # Called with the command name, on the watchdog thread, when a
+        # command passes its deadline; e.g. to kill a hung driver.
+        self.on_timeout = None
+        self._placed = 0
+        self._session_endpoints = {}
+        self._endpoints_lock = threading.Lock()
+        self._health_check_stopped = threading.Event()
+        if self._endpoints is not None and health_check_interval:
+            thread = threading.Thread(
+                target=_health_check_loop,
+                args=(weakref.ref(self), health_check_interval, self._health_check_stopped),
+                name='msedge-endpoint-health-check')
+            thread.daemon = True
+            thread.start()
+        self._commands.update(_EDGE_COMMANDS)
+
+    def add_observer(self, callback):
+        """
+        Calls callback(event) with a CommandEvent after every command.
+
+        Observers run on the thread that sent the command. Without
+        observers, commands are not measured at all.
+        """
+        self._observers = self._observers + (callback,)
+
+    def remove_observer(self, callback):
+        """
+        Removes an observer added with add_observer().
+        """
+        self._observers = tuple(observer for observer in self._observers if observer != callback)
+
+    def enable_stats(self):
+        """
+        Starts aggregating per-command latency, payload size and error
+        statistics, and returns the CommandStats collecting them.
+        """
+        if self._stats is None:
+            self._stats = CommandStats()
+            self.add_observer(self._stats)
+        return self._stats
+
+    def disable_stats(self):
+        """
+        Stops aggregating statistics started with enable_stats().
+        """
+        if self._stats is not None:
+            self.remove_observer(self._stats)
+            self._stats = None
+
+    def stats(self):
+        """
+        Returns the per-command summary of CommandStats.summary(), or an
+        empty dict if enable_stats() was not called.
+        """
+        return self._stats.summary() if self._stats is not None else {}
+
+    def execute(self, command, params):
+        """
+        Send a command to the remote server.
+
+        Any path subtitutions required for the URL mapped to the command should be
+        included in the command parameters.
+
+        :Args:
+         - command - A string specifying the command to execute.
+         - params - A dictionary of named parameters to send with the command as
+           its JSON payload.
+        """
+        if not self._observers and self._endpoints is None and self._codec is None and \
+                self.command_timeout is None and not self.command_timeouts:
+            return RemoteConnection.execute(self, command, params)
+        method, path, data, session_id = self._prepare(command, params)
+        return self._dispatch(command, method, path, data, session_id)
+
+    def execute_to_file(self, command, params, out, field='value', decode='base64'):
+        """
+        Send a command and write one string field of its response to out
+        while the response is read, e.g. a base64 encoded screenshot.
+
+        Neither the response text nor the decoded field is held in memory
+        as a whole.
+
+        :Args:
+         - command - A string specifying the command to execute.
+         - params - A dictionary of named parameters to send with the command.
+         - out - A file name, opened for writing once the command succeeded,
+           or a binary file object.
+         - field - The name of the JSON string field to write. Its first
+           occurrence in the response is used.
+         - decode - 'base64' to write the decoded bytes, or None to write
+           the string UTF-8 encoded.
+
+        :Returns:
+          A tuple of the parsed response, with the field set to None, and
+          the number of bytes written. For an error response nothing is
+          written and the field is left in place.
+        """
+        method, path, data, session_id = self._prepare(command, params)
+        if self._endpoints is not None:
+            endpoint = self._session_endpoints.get(session_id) if session_id else None
+            url = endpoint.url if endpoint is not None else self._url
+        else:
+            url = self._url
+        written = [0]
+
+        def stream(resp):
+            if resp.status != 200:
+                return resp.status, resp.headers.get('Content-Type'), resp.data
+            with _output(out) as f:
+                sink = Base64Decoder(f) if decode == 'base64' else CountingWriter(f)
+                extractor = FieldExtractor(field, sink)
+                for chunk in resp.stream(CHUNK_SIZE):
+                    extractor.write(chunk)
+                rest = extractor.close()
+            written[0] = sink.written
+            return resp.status, resp.headers.get('Content-Type'), rest
+
+        if self._observers:
+            response = self._instrumented_request(command, method, url + path, data, stream)
+        else:
+            response = self._parse_response(*self._send(method, url + path, data, command, stream))
+        return response, written[0]
+
+    def _prepare(self, command, params):
+        # Returns the method, path, payload and session id of a command.
+        command_info = self._commands[command]
+        assert command_info is not None, 'Unrecognised command %s' % command
+        path = string.Template(command_info[1]).substitute(params)
+        session_id = params.get('sessionId') if isinstance(params, dict) else None
+        if hasattr(self, 'w3c') and self.w3c and isinstance(params, dict) and 'sessionId' in params:
+            del params['sessionId']
+        data = self._codec.dumps(params) if self._codec is not None else utils.dump_json(params)
+        return command_info[0], path, data, session_id
+
+    def execute_serialized(self, command, body, params=None):
+        """
+        Send a command whose JSON payload has already been serialized.
+
+        :Args:
+         - command - A string specifying the command to execute.
+         - body - The JSON payload as a string.
+         - params - Optional dictionary with the URL path substitutions.
+        """
+        command_info = self._commands[command]
+        path = string.Template(command_info[1]).substitute(params or {})
+        if not self._observers and self._endpoints is None:
+            return self._request(command_info[0], self._url + path, body=body, command=command)
+        return self._dispatch(command, command_info[0], path, body, (params or {}).get('sessionId'))
+
+    def pool_stats(self):
+        """
+        Returns a dict of connection pool counters: requests, connections
+        opened, reused and expired. All are zero unless keep_alive is set.
+        """
+        if not self.keep_alive:
+            return PoolStats().as_dict()
+        return self._conn.stats.as_dict()
+
+    def endpoints(self):
+        """
+        Returns the Endpoints new sessions are balanced between, or an
+        empty list for a connection to a single driver.
+        """
+        return list(self._endpoints or [])
+
+    def check_health(self):
+        """
+        Checks the /status of every endpoint, ejecting those that fail or
+        report that they are not ready, and readmitting those that pass.
+        """
+        for endpoint in self.endpoints():
+            healthy = self._probe(endpoint)
+            if healthy != endpoint.healthy:
+                LOGGER.warning("%s endpoint %s", 'Readmitting' if healthy else 'Ejecting', endpoint.url)
+                endpoint.healthy = healthy
+
+    def close(self):
+        """
+        Stops the endpoint health checks and closes pooled connections.
+        """
+        self._health_check_stopped.set()
+        if self.keep_alive:
+            self._conn.clear()
+
+    def _probe(self, endpoint):
+        http = self._conn if self.keep_alive else urllib3.PoolManager()
+        try:
+            resp = http.request('GET', endpoint.url + '/status', retries=False,
+                                timeout=self.health_check_timeout)
+            try:
+                if resp.status != 200:
+                    return False
+                value = utils.load_json(resp.data.decode('UTF-8')).get('value')
+                return not (isinstance(value, dict) and value.get('ready') is False)
+            finally:
+                resp.close()
+        except (urllib3.exceptions.HTTPError, socket.error, ValueError):
+            return False
+
+    def _dispatch(self, command, method, path, body, session_id):
+        if self._endpoints is None:
+            return self._perform(command, method, self._url + path, body)
+        if command == Command.NEW_SESSION:
+            return self._new_session(command, method, path, body)
+
+        endpoint = self._session_endpoints.get(session_id) if session_id else None
+        if endpoint is not None:
+            url = endpoint.url
+        else:
+            url = next((e.url for e in self._endpoints if e.healthy), self._url)
+        response = self._perform(command, method, url + path, body)
+        # Sessions that died or timed out on the driver are dropped too,
+        # so that they no longer count for placement.
+        if endpoint is not None and (command == Command.QUIT or
+                                     _response_error(response) in ErrorCode.INVALID_SESSION_ID):
+            with self._endpoints_lock:
+                self._session_endpoints.pop(session_id, None)
+                endpoint.sessions.discard(session_id)
+        return response
+
+    def _perform(self, command, method, url, body):
+        if self._observers:
+            return self._instrumented_request(command, method, url, body)
+        return self._request(method, url, body=body, command=command)
+
+    def _place(self, excluded):
+        with self._endpoints_lock:
+            candidates = [e for e in self._endpoints if e.healthy and e not in excluded]
+            if not candidates:
+                return None
+            # Rotating the candidates breaks ties between equally loaded endpoints.
+            offset = self._placed % len(candidates)
+            candidates = candidates[offset:] + candidates[:offset]
+            self._placed += 1
+            if self.placement == 'least_sessions':
+                endpoint = min(candidates, key=lambda e: len(e.sessions) + e.pending)
+            else:
+                endpoint = candidates[0]
+            endpoint.pending += 1
+            return endpoint
+
+    def _new_session(self, command, method, path, body):
+        tried = set()
+        error = None
+        refused = []
+        while True:
+            endpoint = self._place(tried)
+            if endpoint is None:
+                if refused:
+                    # Refused everywhere: more likely the capabilities than
+                    # every driver are at fault.
+                    for refusing_endpoint, _ in refused:
+                        refusing_endpoint.healthy = True
+                    return refused[-1][1]
+                if error is not None:
+                    raise error
+                raise WebDriverException("No healthy endpoint to create a session on")
+            try:
+                response = self._perform(command, method, endpoint.url + path, body)
+            except (urllib3.exceptions.HTTPError, socket.error) as e:
+                LOGGER.warning("Ejecting endpoint %s: %s", endpoint.url, e)
+                endpoint.healthy = False
+                tried.add(endpoint)
+                error = e
+                continue
+            finally:
+                with self._endpoints_lock:
+                    endpoint.pending -= 1
+            refusal = _response_error(response)
+            if refusal is not None:
+                LOGGER.warning("Ejecting endpoint %s, which refused a session: %s", endpoint.url, refusal)
+                endpoint.healthy = False
+                tried.add(endpoint)
+                refused.append((endpoint, response))
+                continue
+            value = response.get('value')
+            session_id = response.get('sessionId') or \
+                (value.get('sessionId') if isinstance(value, dict) else None)
+            if session_id:
+                with self._endpoints_lock:
+                    self._session_endpoints[session_id] = endpoint
+                    endpoint.sessions.add(session_id)
+            return response
+
+    def _instrumented_request(self, command, method, url, body, stream=None):
+        request_bytes = len(body) if body and method in ('POST', 'PUT') else 0
+        response_bytes = 0
+        error = None
+        started = _clock()
+        try:
+            statuscode, content_type, data = self._send(method, url, body, command, stream)
+            response_bytes = len(data)
+            response = self._parse_response(statuscode, content_type, data)
+            status = response.get('status')
+            if status:
+                error = status
+            elif isinstance(response.get('value'), dict) and 'error' in response['value']:
+                error = response['value']['error']
+            return response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            event = CommandEvent(command, _clock() - started, request_bytes, response_bytes, error)
+            for observer in self._observers:
+                try:
+                    observer(event)
+                except Exception:
+                    LOGGER.exception("Command observer failed")
+
+    def _request(self, method, url, body=None, command=None):
+        """
+        Send an HTTP request to the remote server.
+
+        :Args:
+         - method - A string for the HTTP method to send the request with.
+         - url - A string for the URL to send the request to.
+         - body - A string for request body. Ignored unless method is POST or PUT.
+         - command - The command name, which selects the deadline.
+
+        :Returns:
+          A dictionary with the server's parsed JSON response.
+        """
+        statuscode, content_type, data = self._send(method, url, body, command)
+        return self._parse_response(statuscode, content_type, data)
+
+    def _command_timeout(self, command):
+        if command in self.command_timeouts:
+            return self.command_timeouts[command]
+        return self.command_timeout
+
+    def _send(self, method, url, body=None, command=None, stream=None):
+        """
+        Sends an HTTP request and returns the status code, the content
+        type and the raw response body, following redirects.
+
+        If stream is given, it is called with the unread response and
+        returns that tuple instead.
+        """
+        timeout = self._command_timeout(command)
+        if timeout is None:
+            return self._send_request(method, url, body, stream=stream)
+
+        # The socket timeouts only bound each read, so the watchdog aborts
+        # a response still being received at the deadline, e.g. from a
+        # driver sending it a few bytes at a time.
+        request = _InFlightRequest()
+        watch = watchdog.watch(timeout, partial(self._expire, command, request))
+        result = error = None
+        try:
+            result = self._send_request(method, url, body, time.time() + timeout, stream, request)
+        except Exception as e:
+            error = e
+        timed_out = error is not None and _is_read_timeout(error)
+        if watchdog.cancel(watch):
+            if timed_out:
+                # The socket timed out just before the watchdog fired; the
+                # driver is hung all the same.
+                self._expire(command, request)
+        else:
+            # Also when the driver answered after the deadline passed.
+            # Let on_timeout finish killing the driver before reporting.
+            watchdog.wait(watch)
+            timed_out = True
+        if timed_out:
+            raise CommandTimeoutError(
+                "Command %s did not complete within %s seconds" % (command, timeout),
+                command=command, timeout=timeout)
+        if error is not None:
+            raise error
+        return result
+
+    def _expire(self, command, request):
+        # Runs on the watchdog thread once a command passed its deadline.
+        try:
+            if self.on_timeout is not None:
+                self.on_timeout(command)
+        finally:
+            request.abort()
+
+    def _send_request(self, method, url, body=None, deadline=None, stream=None, request=None):
+        LOGGER.debug('%s %s %s' % (method, url, body))
+
+        parsed_url = parse.urlparse(url)
+        headers = self.get_remote_connection_headers(parsed_url, self.keep_alive)
+        if body and method != 'POST' and method != 'PUT':
+            body = None
+
+        kwargs = {}
+        if deadline is not None:
+            # Read timeouts are not retried, so the deadline is not multiplied;
+            # redirects are followed below. The body is read once the
+            # response is known to the watchdog.
+            kwargs = {'timeout': urllib3.Timeout(total=max(deadline - time.time(), 0.001)),
+                      'retries': urllib3.Retry(read=0, redirect=0, raise_on_redirect=False),
+                      'preload_content': False}
+        if stream is not None:
+            kwargs['preload_content'] = False
+        if self.keep_alive:
+            resp = self._conn.request(method, url, body=body, headers=headers, **kwargs)
+        else:
+            http = urllib3.PoolManager(timeout=self._timeout)
+            resp = http.request(method, url, body=body, headers=headers, **kwargs)
+        if request is not None:
+            request.attach(resp)
+        complete = False
+        try:
+            statuscode = resp.status
+            if 300 <= statuscode < 304:
+                return self._send_request('GET', resp.headers.get('location'), deadline=deadline,
+                                          stream=stream, request=request)
+            if stream is not None:
+                result = stream(resp)
+            else:
+                result = statuscode, resp.headers.get('Content-Type'), resp.data
+            complete = request is None or not request.aborted
+            return result
+        finally:
+            LOGGER.debug("Finished Request")
+            if complete:
+                # Returns a fully read connection to the pool.
+                resp.release_conn()
+            else:
+                resp.close()
+
+    def _parse_response(self, statuscode, content_type, data):
+        raw = data
+        if 399 < statuscode <= 500:
+            return {'status': statuscode, 'value': raw.decode('UTF-8')}
+        content_type = content_type.split(';') if content_type is not None else []
+        if not any([x.startswith('image/png') for x in content_type]):
+
+            try:
+                if self._codec is not None:
+                    data = self._codec.loads(raw.strip())
+                else:
+                    data = utils.load_json(raw.decode('UTF-8').strip())
+            except ValueError:
+                if 199 < statuscode < 300:
+                    status = ErrorCode.SUCCESS
+                else:
+                    status = ErrorCode.UNKNOWN_ERROR
+                return {'status': status, 'value': raw.decode('UTF-8').strip()}
+
+            # Some of the drivers incorrectly return a response
+            # with no 'value' field when they should return null.
+            if 'value' not in data:
+                data['value'] = None
+            return data
+        else:
+            data = {'status': 0, 'value': raw.decode('UTF-8')}
+            return data
+
+
+class _InFlightRequest(object):
+    """
+    The response of a command with a deadline, which the watchdog aborts
+    by shutting down its socket.
+    """
+
+    def __init__(self):
+        self.aborted = False
+        self._response = None
+        self._lock = threading.Lock()
+
+    def attach(self, response):
+        with self._lock:
+            self._response = response
+            aborted = self.aborted
+        if aborted:
+            _shutdown(response)
+
+    def abort(self):
+        with self._lock:
+            self.aborted = True
+            response = self._response
+        if response is not None:
+            _shutdown(response)
+
+
+def _shutdown(response):
+    sock = getattr(getattr(response, '_connection', None), 'sock', None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except (socket.error, OSError):
+            pass
+
+
+@contextmanager
+def _output(out):
+    # Opens out if it is a file name, so that nothing is created for a
+    # failed command. The file is written under a temporary name and
+    # renamed once complete, so that a failed transfer leaves no
+    # truncated file behind.
+    if hasattr(out, 'write'):
+        yield out
+        return
+    directory, name = os.path.split(os.path.abspath(out))
+    fd, path = tempfile.mkstemp(prefix='.%s.' % name, suffix='.part', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+        _replace(path, out)
+    except BaseException:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        raise
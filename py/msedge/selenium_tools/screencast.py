@@ -0,0 +1,301 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import mmap
+import os
+import threading
+import time
+from array import array
+
+try:
+    import queue
+except ImportError:  # above is available in py3+, below is py2.7
+    import Queue as queue
+
+from .cdp import CdpError
+from .streaming import Base64Decoder
+
+LOGGER = logging.getLogger(__name__)
+
+# Characters of base64 text decoded at a time, a multiple of 4.
+_DECODE_CHUNK = 16 * 1024
+
+
+class FrameRing(object):
+    """
+    Keeps the latest capacity frames in one preallocated buffer of
+    capacity slots of slot_size bytes, in memory or in a memory-mapped
+    file. Storing a frame never allocates a new buffer; frames larger
+    than a slot are skipped.
+
+    With a path, the frames are in a file that outlives the process, e.g.
+    a job killed because it hung.
+
+    :Attributes:
+     - stored - Number of frames stored so far, including overwritten ones.
+     - skipped - Number of frames skipped because they did not fit a slot
+       or were not valid base64.
+    """
+
+    def __init__(self, capacity=100, slot_size=256 * 1024, path=None):
+        if capacity < 1 or slot_size < 1:
+            raise ValueError("capacity and slot_size must be at least 1")
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self.path = path
+        self.stored = 0
+        self.skipped = 0
+        self.lengths = array('l', [0] * capacity)
+        self.timestamps = array('d', [0.0] * capacity)
+        self._lock = threading.Lock()
+        self._file = None
+        if path is not None:
+            self._file = open(path, 'w+b')
+            self._file.truncate(capacity * slot_size)
+            self._buffer = mmap.mmap(self._file.fileno(), capacity * slot_size)
+        else:
+            self._buffer = bytearray(capacity * slot_size)
+        self._view = memoryview(self._buffer)
+
+    def __len__(self):
+        return min(self.stored, self.capacity)
+
+    def put(self, data, timestamp=None):
+        """
+        Stores a frame, overwriting the oldest one once the ring is full.
+        Returns False if the frame was skipped.
+        """
+        length = len(data)
+        with self._lock:
+            if length > self.slot_size:
+                self.skipped += 1
+                return False
+            slot, offset = self._next_slot()
+            self._view[offset:offset + length] = data
+            self._commit(slot, length, timestamp)
+        return True
+
+    def put_base64(self, data, timestamp=None):
+        """
+        Decodes a base64 encoded frame into the ring, a chunk at a time
+        straight into its slot. See put(). Raises ValueError for malformed
+        base64, after counting the frame as skipped.
+        """
+        # An upper bound of the decoded size, exact for text without line
+        # breaks; a frame that can not fit is skipped without being decoded.
+        tail = data[-2:]
+        if not isinstance(tail, bytes):
+            tail = tail.encode('ascii')
+        length = len(data) // 4 * 3 + len(data) % 4 * 3 // 4 - tail.count(b'=')
+        with self._lock:
+            if length > self.slot_size:
+                self.skipped += 1
+                return False
+            slot, offset = self._next_slot()
+            writer = _SlotWriter(self._view, offset)
+            decoder = Base64Decoder(writer)
+            try:
+                for start in range(0, len(data), _DECODE_CHUNK):
+                    chunk = data[start:start + _DECODE_CHUNK]
+                    if not isinstance(chunk, bytes):
+                        chunk = chunk.encode('ascii')
+                    decoder.write(chunk)
+                decoder.close()
+            except ValueError:
+                # Malformed base64. The frame in the slot, if any, was
+                # partly overwritten, so it is dropped as well.
+                self.lengths[slot] = 0
+                self.skipped += 1
+                raise
+            self._commit(slot, decoder.written, timestamp)
+        return True
+
+    def _next_slot(self):
+        slot = self.stored % self.capacity
+        return slot, slot * self.slot_size
+
+    def _commit(self, slot, length, timestamp):
+        self.lengths[slot] = length
+        self.timestamps[slot] = time.time() if timestamp is None else timestamp
+        self.stored += 1
+
+    def frames(self):
+        """
+        Yields (timestamp, frame bytes) of the stored frames, oldest first.
+        """
+        with self._lock:
+            first = max(0, self.stored - self.capacity)
+            last = self.stored
+        for number in range(first, last):
+            with self._lock:
+                if number < self.stored - self.capacity:
+                    continue  # overwritten meanwhile
+                slot = number % self.capacity
+                if not self.lengths[slot]:
+                    continue  # dropped by a malformed frame
+                offset = slot * self.slot_size
+                frame = bytes(self._view[offset:offset + self.lengths[slot]])
+                timestamp = self.timestamps[slot]
+            yield timestamp, frame
+
+    def latest(self):
+        """
+        Returns (timestamp, frame bytes) of the newest frame, or None.
+        """
+        with self._lock:
+            if not self.stored:
+                return None
+            slot = (self.stored - 1) % self.capacity
+            if not self.lengths[slot]:
+                return None  # dropped by a malformed frame
+            offset = slot * self.slot_size
+            return self.timestamps[slot], bytes(self._view[offset:offset + self.lengths[slot]])
+
+    def save(self, directory, extension='jpg'):
+        """
+        Writes the stored frames to numbered files in directory, oldest
+        first, and returns their paths.
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        paths = []
+        for index, (timestamp, frame) in enumerate(self.frames()):
+            path = os.path.join(directory, 'frame-%05d.%s' % (index, extension))
+            with open(path, 'wb') as f:
+                f.write(frame)
+            paths.append(path)
+        return paths
+
+    def close(self):
+        """
+        Releases the buffer, and the memory-mapped file if there is one.
+        """
+        with self._lock:
+            if self._view is None:
+                return
+            self._view.release()
+            self._view = None
+            if self._file is not None:
+                self._buffer.close()
+                self._file.close()
+
+
+class _SlotWriter(object):
+    """
+    Writes decoded bytes into the ring's buffer from offset on.
+    """
+
+    def __init__(self, view, offset):
+        self.view = view
+        self.offset = offset
+
+    def write(self, data):
+        end = self.offset + len(data)
+        self.view[self.offset:end] = data
+        self.offset = end
+
+
+class ScreencastRecorder(object):
+    """
+    Records the frames of Page.startScreencast into a FrameRing.
+
+    The browser sends the next frame only once the previous one is
+    acknowledged. Frames are stored off the DevTools reader thread and
+    acknowledged after that, so a slow consumer slows the browser's
+    screencast rather than queuing frames. With max_fps, acknowledging
+    is further delayed so that the browser does not encode frames that
+    would be thrown away.
+
+    :Attributes:
+     - ring - The FrameRing the frames are stored in.
+     - received - Number of frames received.
+    """
+
+    def __init__(self, cdp, ring, format='jpeg', quality=60, max_width=None,
+                 max_height=None, every_nth_frame=1, max_fps=None):
+        """
+        :Args:
+         - cdp - A CdpConnection to the page.
+         - ring - The FrameRing to store frames in.
+         - format - 'jpeg' or 'png'.
+         - quality - JPEG quality from 0 to 100.
+         - max_width, max_height - Optional maximum frame size in pixels.
+         - every_nth_frame - Makes the browser send only every n-th frame.
+         - max_fps - Optional maximum number of frames per second.
+        """
+        if format not in ('jpeg', 'png'):
+            raise ValueError("format should be 'jpeg' or 'png'")
+        self.cdp = cdp
+        self.ring = ring
+        self.received = 0
+        self.max_fps = max_fps
+        self._params = {'format': format, 'everyNthFrame': every_nth_frame}
+        if format == 'jpeg':
+            self._params['quality'] = quality
+        if max_width is not None:
+            self._params['maxWidth'] = max_width
+        if max_height is not None:
+            self._params['maxHeight'] = max_height
+        self._frames = queue.Queue()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='msedge-screencast')
+        self._thread.daemon = True
+        self._thread.start()
+        self.cdp.on('Page.screencastFrame', self._frames.put)
+        self.cdp.execute('Page.startScreencast', self._params)
+        return self
+
+    def stop(self):
+        if self._thread is None:
+            return
+        try:
+            self.cdp.execute('Page.stopScreencast')
+        except CdpError:
+            LOGGER.debug("Could not stop the screencast", exc_info=True)
+        finally:
+            self.cdp.off('Page.screencastFrame', self._frames.put)
+            self._stopped.set()
+            self._frames.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        interval = 1.0 / self.max_fps if self.max_fps else 0
+        next_ack = 0
+        while True:
+            params = self._frames.get()
+            if params is None:
+                return
+            self.received += 1
+            metadata = params.get('metadata', {})
+            try:
+                self.ring.put_base64(params.get('data', ''), metadata.get('timestamp'))
+            except Exception:
+                # Acknowledged all the same, or the browser sends no more frames.
+                LOGGER.warning("Could not store a screencast frame", exc_info=True)
+            delay = next_ack - time.time()
+            if delay > 0 and self._stopped.wait(delay):
+                continue
+            next_ack = time.time() + interval
+            try:
+                self.cdp.send('Page.screencastFrameAck', {'sessionId': params.get('sessionId')})
+            except CdpError:
+                LOGGER.debug("Could not acknowledge a screencast frame", exc_info=True)
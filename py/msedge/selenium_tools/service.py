@@ -18,13 +18,41 @@
 # specific language governing permissions and limitations
 # under the License.
 
+import errno
+import logging
+import os
+import platform
+import re
+import signal
+import subprocess
+import threading
+import time
+
+try:
+    from http import client as http_client
+except ImportError:  # above is available in py3+, below is py2.7
+    import httplib as http_client
+
+from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.common import service
 
+LOGGER = logging.getLogger(__name__)
+
+_STARTED_LINE = re.compile(br'was started successfully')
+
+try:
+    _clock = time.perf_counter
+except AttributeError:  # above is available in py3.3+
+    _clock = time.time
+
 
 class Service(service.Service):
 
+    READINESS_MODES = ('poll', 'stdout', 'status')
+
     def __init__(self, executable_path, port=0, verbose=False, log_path=None,
-                service_args=None, env=None):
+                service_args=None, env=None, readiness='poll', start_timeout=30,
+                process_group=False):
         """
         Creates a new instance of the EdgeDriver service.
 
@@ -40,8 +68,26 @@ class Service(service.Service):
         :param log_path: Optional path for the webdriver binary to log to.
             Defaults to None which disables logging.
         :param service_args : List of args to pass to the edgedriver service
+        :param readiness: How start() detects that the driver is ready:
+            'poll' connects to the port once a second, 'stdout' waits for
+            the driver to print that it started successfully, and 'status'
+            probes /status with exponential backoff starting at 5ms.
+        :param start_timeout: Seconds start() waits for the driver to become ready.
+        :param process_group: Whether to start the driver in a new process
+            group on POSIX, so that kill() also kills the browsers it started.
+            Edge sets it on the services it creates with a command_timeout;
+            set it on a service passed to Edge with a command_timeout, or
+            killing a hung driver leaves its browsers running.
         
         """
+        if readiness not in self.READINESS_MODES:
+            raise ValueError("readiness should be one of %s" % ', '.join(self.READINESS_MODES))
+        self.readiness = readiness
+        self.readiness_mode = None
+        self.start_timings = None
+        self.start_timeout = start_timeout
+        self.process_group = process_group
+        self.process = None
         self.service_args = service_args or []
         if verbose:
             self.service_args.append("--verbose")
@@ -60,3 +106,172 @@ class Service(service.Service):
 
     def command_line_args(self):
         return ["--port=%d" % self.port] + self.service_args
+
+    def start(self):
+        """
+        Starts the Service and waits until it is ready, using the readiness
+        mode given to the constructor. The mode used is reported in
+        readiness_mode, and the seconds spent in 'process_spawn' and
+        'port_readiness' in start_timings.
+
+        :Exceptions:
+         - WebDriverException : Raised either when it can't start the service
+           or when it does not become ready within start_timeout
+        """
+        deadline = time.time() + self.start_timeout
+        started = _clock()
+        self._start_process()
+        spawned = _clock()
+        try:
+            self._wait_until_ready(deadline)
+        except Exception:
+            self.stop()
+            raise
+        self.start_timings = {
+            'process_spawn': spawned - started,
+            'port_readiness': _clock() - spawned,
+        }
+        self.readiness_mode = self.readiness
+        LOGGER.debug("Service %s ready on port %d (readiness: %s)",
+                     self.path, self.port, self.readiness_mode)
+
+    def _start_process(self):
+        stdout = subprocess.PIPE if self.readiness == 'stdout' else self.log_file
+        cmd = [self.path]
+        cmd.extend(self.command_line_args())
+        kwargs = {}
+        if self.process_group and os.name != 'nt':
+            kwargs['start_new_session'] = True
+        try:
+            self.process = subprocess.Popen(cmd, env=self.env,
+                                            close_fds=platform.system() != 'Windows',
+                                            stdout=stdout,
+                                            stderr=self.log_file,
+                                            stdin=subprocess.PIPE,
+                                            **kwargs)
+        except TypeError:
+            raise
+        except OSError as err:
+            if err.errno == errno.ENOENT:
+                raise WebDriverException(
+                    "'%s' executable needs to be in PATH. %s" % (
+                        os.path.basename(self.path), self.start_error_message)
+                )
+            elif err.errno == errno.EACCES:
+                raise WebDriverException(
+                    "'%s' executable may have wrong permissions. %s" % (
+                        os.path.basename(self.path), self.start_error_message)
+                )
+            else:
+                raise
+        except Exception as e:
+            raise WebDriverException(
+                "The executable %s needs to be available in the path. %s\n%s" %
+                (os.path.basename(self.path), self.start_error_message, str(e)))
+
+    def kill(self):
+        """
+        Kills the driver process without asking it to shut down, along with
+        the browsers it started: on Windows the whole process tree, on
+        POSIX its process group if the service was created with
+        process_group=True. stop() still needs to be called afterwards.
+        """
+        if self.process is None or self.process.poll() is not None:
+            return
+        LOGGER.warning("Killing service %s (pid %d)", self.path, self.process.pid)
+        kill_process_tree(self.process.pid, self.process_group)
+        self.process.wait()
+
+    def _wait_until_ready(self, deadline):
+        if self.readiness == 'stdout':
+            self._wait_for_stdout(deadline)
+        elif self.readiness == 'status':
+            self._wait_for_status(deadline)
+        else:
+            self._wait_for_port(deadline)
+
+    def _wait_for_port(self, deadline):
+        while True:
+            self.assert_process_still_running()
+            if self.is_connectable():
+                return
+            if time.time() > deadline:
+                raise WebDriverException("Can not connect to the Service %s" % self.path)
+            time.sleep(1)
+
+    def _wait_for_status(self, deadline):
+        delay = 0.005
+        while True:
+            self.assert_process_still_running()
+            if self._is_status_ready():
+                return
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise WebDriverException("Can not connect to the Service %s" % self.path)
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.25)
+
+    def _is_status_ready(self):
+        connection = http_client.HTTPConnection('localhost', self.port, timeout=1)
+        try:
+            connection.request('GET', '/status')
+            return connection.getresponse().status == 200
+        except (http_client.HTTPException, IOError):
+            return False
+        finally:
+            connection.close()
+
+    def _wait_for_stdout(self, deadline):
+        started = threading.Event()
+        log_file = self.log_file if hasattr(self.log_file, 'write') else None
+        # The reader thread owns the pipe from here on and closes it at EOF;
+        # stop() closing it while a read is blocked would wait for the read.
+        stdout, self.process.stdout = self.process.stdout, None
+        thread = threading.Thread(target=self._read_stdout,
+                                  args=(stdout, log_file, started))
+        thread.daemon = True
+        thread.start()
+        while not started.wait(min(0.05, max(deadline - time.time(), 0))):
+            self.assert_process_still_running()
+            if time.time() > deadline:
+                raise WebDriverException(
+                    "Service %s did not report that it started successfully" % self.path)
+
+    @staticmethod
+    def _read_stdout(stdout, log_file, started):
+        # Keeps draining the pipe after startup so the driver never blocks
+        # on a full stdout buffer.
+        try:
+            for line in iter(stdout.readline, b''):
+                if not started.is_set() and _STARTED_LINE.search(line):
+                    started.set()
+                if log_file is not None:
+                    try:
+                        log_file.write(line.decode('UTF-8', 'replace'))
+                        log_file.flush()
+                    except (IOError, ValueError):
+                        log_file = None
+        except (IOError, ValueError):
+            pass
+        finally:
+            stdout.close()
+
+
+def kill_process_tree(pid, process_group=False):
+    """
+    Kills a process and its descendants: with taskkill /T on Windows, and
+    on POSIX by killing the process group pid leads if process_group is
+    set, or only the process otherwise.
+    """
+    try:
+        if os.name == 'nt':
+            with open(os.devnull, 'wb') as devnull:
+                subprocess.call(['taskkill', '/F', '/T', '/PID', str(pid)],
+                                stdout=devnull, stderr=devnull)
+        elif process_group:
+            os.killpg(pid, signal.SIGKILL)
+        else:
+            os.kill(pid, signal.SIGKILL)
+    except OSError as err:
+        if err.errno != errno.ESRCH:
+            raise
@@ -0,0 +1,196 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import threading
+from collections import deque
+
+from .service import Service
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ServicePool(object):
+    """
+    Keeps a number of started EdgeDriver services ready to be handed out,
+    so that a new session does not have to wait for the driver process to
+    start and accept connections.
+
+    :Usage:
+        pool = ServicePool(size=4)
+        pool.start()
+        driver = Edge(options=options, service=pool.acquire())
+        ...
+        driver.quit()
+        pool.close()
+    """
+
+    def __init__(self, size=2, executable_path='msedgedriver', verbose=False,
+                 log_path=None, service_args=None, env=None,
+                 health_check_interval=5, readiness='status'):
+        """
+        Creates a new pool of EdgeDriver services.
+
+        :Args:
+         - size - Number of started services to keep idle in the pool.
+         - executable_path - Path to the driver executable.
+         - verbose - Whether to set verbose logging in the services.
+         - log_path - Where the services should log to.
+         - service_args - List of args to pass to each driver service.
+         - env - Environment for the driver processes.
+         - health_check_interval - Seconds between health checks of idle services.
+         - readiness - How services detect that the driver is ready; see EdgeService.
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.size = size
+        self.executable_path = executable_path
+        self.verbose = verbose
+        self.log_path = log_path
+        self.service_args = service_args
+        self.env = env
+        self.health_check_interval = health_check_interval
+        self.readiness = readiness
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._closed = False
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def idle_count(self):
+        """
+        Returns the number of started services waiting in the pool
+        """
+        with self._lock:
+            return len(self._idle)
+
+    def create_service(self):
+        """
+        Creates a new, not yet started, service with the pool's settings.
+        """
+        return Service(
+            self.executable_path,
+            verbose=self.verbose,
+            log_path=self.log_path,
+            service_args=list(self.service_args or []),
+            env=self.env,
+            readiness=self.readiness)
+
+    def start(self):
+        """
+        Starts the background thread that fills the pool and checks idle services.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ServicePool has been closed")
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='msedge-service-pool')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def acquire(self):
+        """
+        Returns a started service. The caller owns the service from then on
+        and is responsible for stopping it, which WebDriver.quit() does.
+
+        When no healthy service is idle, a new one is started inline.
+        """
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("ServicePool has been closed")
+                service = self._idle.popleft() if self._idle else None
+                self._wakeup.notify()
+            if service is None:
+                service = self.create_service()
+                service.start()
+                return service
+            if self._is_healthy(service):
+                return service
+            self._discard(service)
+
+    def close(self):
+        """
+        Stops the background thread and every idle service.
+        """
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._wakeup.notify_all()
+            thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        for service in idle:
+            self._discard(service)
+
+    def _is_healthy(self, service):
+        process = getattr(service, 'process', None)
+        return process is not None and process.poll() is None and service.is_connectable()
+
+    def _discard(self, service):
+        try:
+            service.stop()
+        except Exception:
+            LOGGER.debug("Failed to stop pooled service", exc_info=True)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                missing = self.size - len(self._idle)
+                if missing <= 0:
+                    self._wakeup.wait(self.health_check_interval)
+                    if self._closed:
+                        return
+                    idle = list(self._idle)
+                else:
+                    idle = []
+
+            for service in idle:
+                if not self._is_healthy(service):
+                    with self._lock:
+                        try:
+                            self._idle.remove(service)
+                        except ValueError:
+                            continue
+                    LOGGER.info("Discarding unhealthy service on port %d", service.port)
+                    self._discard(service)
+
+            if missing > 0:
+                service = self.create_service()
+                try:
+                    service.start()
+                except Exception:
+                    LOGGER.warning("Failed to start pooled service", exc_info=True)
+                    self._discard(service)
+                    with self._lock:
+                        if not self._closed:
+                            self._wakeup.wait(self.health_check_interval)
+                    continue
+                with self._lock:
+                    if not self._closed:
+                        self._idle.append(service)
+                        continue
+                self._discard(service)
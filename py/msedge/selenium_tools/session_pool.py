@@ -0,0 +1,223 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    from urllib import parse
+except ImportError:  # above is available in py3+, below is py2.7
+    import urlparse as parse
+
+from .options import Options
+from .webdriver import WebDriver
+
+LOGGER = logging.getLogger(__name__)
+
+
+class _Lease(object):
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.created = time.time()
+        self.uses = 0
+
+
+class SessionPool(object):
+    """
+    Leases live Edge (Chromium) sessions and resets them between leases
+    instead of quitting the browser after every job.
+
+    Between leases every window but the first is closed, cookies, cache
+    and storage of the visited origins are cleared through
+    execute_cdp_cmd, and the remaining window navigates to about:blank.
+    The visited origins are those in the navigation history and frames
+    of the windows open at release; windows the job closed itself are
+    not known.
+
+    :Usage:
+        pool = SessionPool(options, max_uses=50, max_age=600)
+        with pool.lease() as driver:
+            driver.get('https://www.bing.com')
+        pool.close()
+    """
+
+    def __init__(self, options=None, max_idle=4, max_uses=None, max_age=None,
+                 service_pool=None, **driver_kwargs):
+        """
+        Creates a new pool of Edge sessions.
+
+        :Args:
+         - options - An EdgeOptions instance with use_chromium set; sessions
+           are reset through DevTools, which only Edge (Chromium) supports.
+         - max_idle - Maximum number of sessions kept between leases.
+         - max_uses - Number of leases after which a session is quit, or None.
+         - max_age - Seconds after which a session is quit, or None.
+         - service_pool - Optional EdgeServicePool to start sessions from.
+         - driver_kwargs - Further keyword arguments passed to Edge(...).
+        """
+        if options is None:
+            options = Options()
+            options.use_chromium = True
+        elif not options.use_chromium:
+            raise ValueError("SessionPool requires options with use_chromium set")
+        self.options = options
+        self.max_idle = max_idle
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.service_pool = service_pool
+        self.driver_kwargs = driver_kwargs
+        self._idle = []
+        self._leased = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def create_driver(self):
+        """
+        Starts a new session with the pool's settings.
+        """
+        kwargs = dict(self.driver_kwargs)
+        if self.service_pool is not None:
+            kwargs['service'] = self.service_pool.acquire()
+        return WebDriver(options=self.options, **kwargs)
+
+    def acquire(self):
+        """
+        Returns a reset session, starting a new one if none is idle.
+        Every acquired driver must be handed back with release().
+        """
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("SessionPool has been closed")
+                lease = self._idle.pop() if self._idle else None
+            if lease is None:
+                lease = _Lease(self.create_driver())
+            elif self._expired(lease):
+                self._quit(lease)
+                continue
+            lease.uses += 1
+            with self._lock:
+                self._leased[id(lease.driver)] = lease
+            return lease.driver
+
+    def release(self, driver, discard=False):
+        """
+        Hands a driver back to the pool.
+
+        :Args:
+         - driver - A driver returned by acquire().
+         - discard - Quit the session instead of reusing it, for example
+           after the job left the browser in an unknown state.
+        """
+        with self._lock:
+            lease = self._leased.pop(id(driver))
+        if discard or self._expired(lease) or not self._reset(lease):
+            self._quit(lease)
+            return
+        with self._lock:
+            if not self._closed and len(self._idle) < self.max_idle:
+                self._idle.append(lease)
+                return
+        self._quit(lease)
+
+    @contextmanager
+    def lease(self):
+        """
+        Context manager around acquire() and release(). The session is
+        discarded if the block raises.
+        """
+        driver = self.acquire()
+        try:
+            yield driver
+        except Exception:
+            self.release(driver, discard=True)
+            raise
+        self.release(driver)
+
+    def close(self):
+        """
+        Quits every idle session. Leased sessions are quit when released.
+        """
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for lease in idle:
+            self._quit(lease)
+
+    def _expired(self, lease):
+        if self.max_uses is not None and lease.uses >= self.max_uses:
+            return True
+        if self.max_age is not None and time.time() - lease.created >= self.max_age:
+            return True
+        return False
+
+    def _reset(self, lease):
+        driver = lease.driver
+        try:
+            handles = driver.window_handles
+            origins = set()
+            for handle in reversed(handles):
+                driver.switch_to.window(handle)
+                origins.update(_visited_origins(driver))
+                if handle != handles[0]:
+                    driver.close()
+            driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+            driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+            for origin in sorted(origins):
+                driver.execute_cdp_cmd('Storage.clearDataForOrigin',
+                                       {'origin': origin, 'storageTypes': 'all'})
+            driver.get('about:blank')
+            driver.execute_cdp_cmd('Page.resetNavigationHistory', {})
+        except Exception:
+            LOGGER.info("Failed to reset session, discarding it", exc_info=True)
+            return False
+        return True
+
+    def _quit(self, lease):
+        try:
+            lease.driver.quit()
+        except Exception:
+            LOGGER.debug("Failed to quit pooled session", exc_info=True)
+
+
+def _visited_origins(driver):
+    # The origins of the current window's history and of its frames.
+    history = driver.execute_cdp_cmd('Page.getNavigationHistory', {})
+    urls = [entry.get('url') for entry in history.get('entries', [])]
+    urls.append(driver.current_url)
+    frames = [driver.execute_cdp_cmd('Page.getFrameTree', {}).get('frameTree')]
+    while frames:
+        tree = frames.pop()
+        if tree:
+            urls.append(tree.get('frame', {}).get('url'))
+            frames.extend(tree.get('childFrames', []))
+    return set(origin for origin in map(_origin, urls) if origin)
+
+
+def _origin(url):
+    if not url:
+        return None
+    parsed = parse.urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.netloc:
+        return None
+    return '%s://%s' % (parsed.scheme, parsed.netloc)
@@ -0,0 +1,202 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Decodes one large string field of a JSON response while the response is
+being read, writing it to a file instead of holding the JSON text, the
+parsed string and the decoded bytes in memory at once.
+"""
+
+import binascii
+import re
+
+CHUNK_SIZE = 256 * 1024
+
+_SIMPLE_ESCAPES = {
+    b'"': b'"', b'\\': b'\\', b'/': b'/', b'b': b'\b',
+    b'f': b'\f', b'n': b'\n', b'r': b'\r', b't': b'\t',
+}
+
+_NEEDS_QUOTE_OR_ESCAPE = re.compile(br'["\\]')
+_WHITESPACE = b' \t\r\n'
+
+try:
+    _chr = unichr
+except NameError:  # above is py2.7, below is available in py3+
+    _chr = chr
+
+
+class CountingWriter(object):
+    """
+    Writes to out and counts the bytes written.
+    """
+
+    def __init__(self, out):
+        self.out = out
+        self.written = 0
+
+    def write(self, data):
+        if data:
+            self.out.write(data)
+            self.written += len(data)
+
+    def close(self):
+        pass
+
+
+class Base64Decoder(object):
+    """
+    Decodes base64 text given in pieces of any size and writes the
+    decoded bytes to out.
+    """
+
+    def __init__(self, out):
+        self.out = out
+        self.written = 0
+        self._pending = b''
+
+    def write(self, data):
+        if self._pending:
+            data = self._pending + data
+        if any(c in data for c in (b'\n', b'\r')):
+            data = data.translate(None, _WHITESPACE)
+        usable = len(data) - len(data) % 4
+        if usable:
+            self._decode(data[:usable] if usable < len(data) else data)
+        self._pending = data[usable:]
+
+    def close(self):
+        if self._pending:
+            pending, self._pending = self._pending, b''
+            self._decode(pending + b'=' * (-len(pending) % 4))
+
+    def _decode(self, data):
+        decoded = binascii.a2b_base64(data)
+        self.out.write(decoded)
+        self.written += len(decoded)
+
+
+class FieldExtractor(object):
+    """
+    Finds the first string value of key in JSON text given in pieces,
+    passes its unescaped UTF-8 bytes to sink, and keeps the rest of the
+    JSON text with the value replaced by null.
+
+    :Usage:
+        extractor = FieldExtractor('data', Base64Decoder(f))
+        for chunk in chunks:
+            extractor.write(chunk)
+        rest = json.loads(extractor.close())
+    """
+
+    def __init__(self, key, sink):
+        self.sink = sink
+        self.found = False
+        self._pattern = re.compile(br'"' + re.escape(key.encode('UTF-8')) + br'"\s*:\s*"')
+        self._head = b''
+        self._tail = []
+        self._carry = b''
+        self._high_surrogate = None
+        self._state = 'search'
+
+    def write(self, data):
+        if self._state == 'search':
+            start = max(0, len(self._head) - len(self._pattern.pattern) - 32)
+            self._head += data
+            match = self._pattern.search(self._head, start)
+            if match is None:
+                return
+            data = self._head[match.end():]
+            self._head = self._head[:match.end() - 1]
+            self._state = 'value'
+            self.found = True
+        if self._state == 'value':
+            data = self._value(self._carry + data if self._carry else data)
+            if data is None:
+                return
+            self._state = 'tail'
+        if data:
+            self._tail.append(data)
+
+    def close(self):
+        """
+        Returns the JSON text without the value, as bytes.
+        """
+        if self._state == 'value':
+            raise ValueError("The JSON text ended inside the string value")
+        self.sink.close()
+        if self._state == 'search':
+            return self._head
+        return self._head + b'null' + b''.join(self._tail)
+
+    def _value(self, data):
+        # Writes the string value in data to the sink, and returns what
+        # follows its closing quote, or None if it has not ended yet.
+        self._carry = b''
+        position = 0
+        length = len(data)
+        while position < length:
+            match = _NEEDS_QUOTE_OR_ESCAPE.search(data, position)
+            if match is None:
+                self._emit(data[position:] if position else data)
+                return None
+            index = match.start()
+            if index > position:
+                self._emit(data[position:index])
+            if data[index:index + 1] == b'"':
+                self._flush_surrogate()
+                return data[index + 1:]
+            consumed = self._escape(data, index)
+            if consumed is None:
+                self._carry = data[index:]
+                return None
+            position = index + consumed
+        return None
+
+    def _escape(self, data, index):
+        # Decodes the escape sequence at index and returns its length, or
+        # None if data ends before the sequence does.
+        kind = data[index + 1:index + 2]
+        if not kind:
+            return None
+        if kind != b'u':
+            self._flush_surrogate()
+            if kind not in _SIMPLE_ESCAPES:
+                raise ValueError("Invalid escape sequence in JSON string")
+            self.sink.write(_SIMPLE_ESCAPES[kind])
+            return 2
+        digits = data[index + 2:index + 6]
+        if len(digits) < 4:
+            return None
+        code = int(digits, 16)
+        if 0xD800 <= code < 0xDC00:
+            self._flush_surrogate()
+            self._high_surrogate = code
+        elif 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+            self._high_surrogate = None
+            self.sink.write(_chr(code).encode('UTF-8'))
+        else:
+            self._flush_surrogate()
+            self.sink.write(_chr(code).encode('UTF-8', 'replace'))
+        return 6
+
+    def _emit(self, data):
+        self._flush_surrogate()
+        self.sink.write(data)
+
+    def _flush_surrogate(self):
+        if self._high_surrogate is not None:
+            self._high_surrogate = None
+            self.sink.write(u'\ufffd'.encode('UTF-8'))
@@ -0,0 +1,248 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import psutil
+except ImportError:  # optional, /proc is used on Linux without it
+    psutil = None
+
+from .service import kill_process_tree
+
+LOGGER = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Threads of the shared executor quit drivers in the background.
+MAX_BACKGROUND_TEARDOWNS = 16
+
+
+class TeardownReport(object):
+    """
+    How quitting a driver went.
+
+    :Attributes:
+     - pid - The driver process id, or None if it had no process.
+     - graceful - Whether quit() finished within the deadline.
+     - killed - Whether the driver process tree had to be killed.
+     - leaked - Ids of processes started by the driver that were still
+       running after the teardown. They are reported as warnings too.
+     - duration - Seconds the teardown took.
+     - error - The exception quit() raised, if any.
+    """
+
+    def __init__(self, pid, graceful, killed, leaked, duration, error=None):
+        self.pid = pid
+        self.graceful = graceful
+        self.killed = killed
+        self.leaked = leaked
+        self.duration = duration
+        self.error = error
+
+    def __repr__(self):
+        return '<TeardownReport pid=%s graceful=%s killed=%s leaked=%s %.3fs>' % (
+            self.pid, self.graceful, self.killed, self.leaked, self.duration)
+
+
+def _shared_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_BACKGROUND_TEARDOWNS)
+        return _executor
+
+
+def quit_async(driver, timeout=10):
+    """
+    Quits driver on a background thread and returns immediately.
+
+    The driver is asked to delete its session and stop. If that has not
+    finished within timeout seconds, the driver and the processes it
+    started are killed.
+
+    :Returns:
+        A concurrent.futures.Future resolving to a TeardownReport.
+    """
+    return _shared_executor().submit(teardown, driver, timeout)
+
+
+def close_all(drivers, timeout=10, max_parallel=32):
+    """
+    Quits every driver in parallel and waits until all are torn down.
+
+    :Args:
+     - drivers - The drivers to quit.
+     - timeout - Seconds each driver gets to quit before it is killed.
+     - max_parallel - Maximum number of drivers quitting at once.
+
+    :Returns:
+        A list of TeardownReports, in the order of drivers.
+    """
+    drivers = list(drivers)
+    if not drivers:
+        return []
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_parallel, len(drivers))))
+    try:
+        futures = [executor.submit(teardown, driver, timeout) for driver in drivers]
+        return [future.result() for future in futures]
+    finally:
+        executor.shutdown(wait=True)
+
+
+def teardown(driver, timeout=10):
+    """
+    Quits driver, escalating to killing its process tree after timeout
+    seconds, and returns a TeardownReport. Blocks until done.
+    """
+    started = time.time()
+    service = getattr(driver, 'service', None)
+    process = getattr(service, 'process', None)
+    pid = getattr(process, 'pid', None)
+    descendants = _descendants(pid) if pid is not None else []
+
+    outcome = {}
+
+    def graceful_quit():
+        try:
+            driver.quit()
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=graceful_quit, name='msedge-quit')
+    thread.daemon = True
+    thread.start()
+    thread.join(timeout)
+    graceful = not thread.is_alive()
+
+    killed = False
+    if not graceful:
+        LOGGER.warning("Driver %s did not quit within %s seconds, killing it", pid, timeout)
+        killed = True
+        _kill(service, pid, descendants)
+        # Killing the driver unblocks quit(), which then stops the service.
+        thread.join(timeout)
+
+    survivors = _still_running(descendants, 1)
+    leaked = [child for child, _ in survivors]
+    if leaked:
+        LOGGER.warning("Processes %s of driver %s survived its teardown, killing them", leaked, pid)
+        for child, child_started in survivors:
+            _kill_pid(child, child_started)
+        killed = True
+    return TeardownReport(pid, graceful, killed, leaked, time.time() - started, outcome.get('error'))
+
+
+def _still_running(processes, grace):
+    # Gives killed processes up to grace seconds to go away.
+    deadline = time.time() + grace
+    while True:
+        running = [(pid, started) for pid, started in processes if _is_running(pid, started)]
+        if not running or time.time() >= deadline:
+            return running
+        time.sleep(0.01)
+
+
+def _kill(service, pid, descendants):
+    kill = getattr(service, 'kill', None)
+    try:
+        if kill is not None:
+            kill()
+        elif pid is not None:
+            kill_process_tree(pid)
+    except Exception:
+        LOGGER.debug("Failed to kill driver %s", pid, exc_info=True)
+    for child, child_started in descendants:
+        _kill_pid(child, child_started)
+
+
+def _kill_pid(pid, started):
+    # The process may have exited since it was listed and its id been
+    # reused, so it is only killed if it is still the same process.
+    if not _is_running(pid, started):
+        return
+    try:
+        kill_process_tree(pid)
+    except OSError:
+        LOGGER.debug("Failed to kill process %d", pid, exc_info=True)
+
+
+def _descendants(pid):
+    """
+    Returns (id, start time) pairs of every process below pid, using
+    psutil if it is installed and /proc otherwise. Returns an empty list
+    if neither is available.
+    """
+    if psutil is not None:
+        try:
+            result = []
+            for child in psutil.Process(pid).children(recursive=True):
+                try:
+                    result.append((child.pid, child.create_time()))
+                except psutil.Error:
+                    pass
+            return result
+        except psutil.Error:
+            return []
+    if not os.path.isdir('/proc'):
+        return []
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        stat = _read_stat(int(entry))
+        if stat is not None:
+            children.setdefault(stat[1], []).append((int(entry), stat[2]))
+    result = []
+    pending = [pid]
+    while pending:
+        for child in children.get(pending.pop(), []):
+            result.append(child)
+            pending.append(child[0])
+    return result
+
+
+def _read_stat(pid):
+    # Returns (state, parent pid, start time in clock ticks since boot)
+    # from /proc/<pid>/stat, or None.
+    try:
+        with open('/proc/%d/stat' % pid) as f:
+            stat = f.read()
+    except (IOError, OSError):
+        return None
+    # The command name is in parentheses and may contain spaces.
+    fields = stat[stat.rfind(')') + 2:].split()
+    return fields[0], int(fields[1]), int(fields[19])
+
+
+def _is_running(pid, started=None):
+    # With started, from _descendants(), a process that reuses the id is
+    # not the one that was listed.
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            if started is not None and process.create_time() != started:
+                return False
+            return process.status() != psutil.STATUS_ZOMBIE
+        except psutil.Error:
+            return False
+    stat = _read_stat(pid)
+    if stat is None or started is not None and stat[2] != started:
+        return False
+    return stat[0] != 'Z'
@@ -0,0 +1,218 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Records Chromium traces over a DevTools connection. The browser keeps
+the trace and hands it out as a stream, which is read in chunks with
+IO.read and written to a file, so a trace of any size never has to fit
+in memory.
+"""
+
+import logging
+
+from .cdp import CdpError, Future, FutureTimeoutError
+from .streaming import Base64Decoder, CountingWriter
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# Category sets for trace_config(), from small to large traces.
+PRESETS = {
+    # What the Performance panel of DevTools records, without screenshots.
+    'default': (
+        '-*', 'devtools.timeline', 'v8.execute', 'disabled-by-default-devtools.timeline',
+        'disabled-by-default-devtools.timeline.frame', 'toplevel', 'blink.console',
+        'blink.user_timing', 'latencyInfo', 'disabled-by-default-devtools.timeline.stack',
+        'disabled-by-default-v8.cpu_profiler',
+    ),
+    # Page loading milestones and network activity only.
+    'loading': (
+        '-*', 'loading', 'navigation', 'netlog', 'blink.user_timing', 'devtools.timeline',
+    ),
+    # JavaScript execution with sampled stacks.
+    'javascript': (
+        '-*', 'v8', 'v8.execute', 'devtools.timeline', 'disabled-by-default-v8.cpu_profiler',
+        'disabled-by-default-devtools.timeline.stack',
+    ),
+    # Style, layout and paint work.
+    'rendering': (
+        '-*', 'devtools.timeline', 'disabled-by-default-devtools.timeline',
+        'disabled-by-default-devtools.timeline.frame', 'blink', 'cc', 'gpu', 'viz',
+    ),
+}
+
+
+def trace_config(categories=None, exclude=None, preset='default', record_mode='recordUntilFull',
+                 buffer_size_kb=None):
+    """
+    Builds the traceConfig of Tracing.start.
+
+    Only the listed categories are recorded, so that traces stay small.
+    A category starting with '-' is excluded, and '-*' excludes every
+    category not included explicitly.
+
+    :Args:
+     - categories - Categories to record in addition to the preset.
+     - exclude - Categories not to record, e.g. from the preset.
+     - preset - A PRESETS name, or None to record only categories.
+     - record_mode - 'recordUntilFull', 'recordContinuously' (a ring
+       buffer keeping the latest events) or 'recordAsMuchAsPossible'.
+     - buffer_size_kb - Optional size of the browser's trace buffer.
+
+    :Usage:
+        config = trace_config(preset='loading', categories=['v8'], exclude=['netlog'])
+    """
+    if preset is not None and preset not in PRESETS:
+        raise ValueError("preset should be one of %s" % ', '.join(sorted(PRESETS)))
+    included = []
+    excluded = []
+    for category in list(PRESETS[preset] if preset else ()) + list(categories or ()):
+        if category.startswith('-'):
+            if category[1:] not in excluded:
+                excluded.append(category[1:])
+        elif category not in included:
+            included.append(category)
+    for category in exclude or ():
+        if category in included:
+            included.remove(category)
+        if category not in excluded:
+            excluded.append(category)
+    config = {
+        'recordMode': record_mode,
+        'includedCategories': included,
+        'excludedCategories': excluded,
+    }
+    if buffer_size_kb is not None:
+        config['traceBufferSizeInKb'] = buffer_size_kb
+    return config
+
+
+class Tracer(object):
+    """
+    Starts and stops a trace on a CdpConnection.
+
+    :Usage:
+        with driver.connect_cdp() as cdp:
+            tracer = Tracer(cdp)
+            tracer.start(trace_config(preset='loading'))
+            ...
+            tracer.stop('trace.json')
+    """
+
+    def __init__(self, cdp, chunk_size=DEFAULT_CHUNK_SIZE, compression='none'):
+        """
+        :Args:
+         - cdp - A CdpConnection to the page.
+         - chunk_size - Maximum number of bytes requested per IO.read.
+         - compression - 'none' for a JSON trace, 'gzip' for a gzipped one.
+        """
+        if compression not in ('none', 'gzip'):
+            raise ValueError("compression should be 'none' or 'gzip'")
+        self.cdp = cdp
+        self.chunk_size = chunk_size
+        self.compression = compression
+        self.written = 0
+        self.data_loss = False
+        self._tracing = False
+
+    @property
+    def tracing(self):
+        return self._tracing
+
+    def start(self, config=None):
+        """
+        Starts recording with a traceConfig, by default trace_config().
+        """
+        if self._tracing:
+            raise CdpError("Tracing has already been started")
+        self.cdp.execute('Tracing.start', {
+            'transferMode': 'ReturnAsStream',
+            'streamFormat': 'json',
+            'streamCompression': self.compression,
+            'traceConfig': config if config is not None else trace_config(),
+        })
+        self._tracing = True
+
+    def stop(self, out, timeout=None):
+        """
+        Stops recording and writes the trace to out.
+
+        :Args:
+         - out - A file name, or a binary file object such as an open file
+           or an mmap.
+         - timeout - Seconds to wait for the browser to finish the trace.
+           Defaults to the connection's timeout.
+
+        :Returns:
+            The number of bytes written.
+        """
+        if not self._tracing:
+            raise CdpError("Tracing has not been started")
+        complete = Future()
+
+        def listener(params):
+            if not complete.done():
+                complete.set_result(params)
+
+        # Subscribed first, as the event may arrive before the reply.
+        self.cdp.on('Tracing.tracingComplete', listener)
+        try:
+            self.cdp.execute('Tracing.end', timeout=timeout)
+            self._tracing = False
+            timeout = self.cdp.timeout if timeout is None else timeout
+            try:
+                params = complete.result(timeout)
+            except FutureTimeoutError:
+                raise CdpError("The browser did not finish the trace in %s seconds" % timeout)
+        finally:
+            self.cdp.off('Tracing.tracingComplete', listener)
+        self.data_loss = params.get('dataLossOccurred', False)
+        if self.data_loss:
+            LOGGER.warning("The trace buffer overflowed, the trace is missing events")
+        handle = params.get('stream')
+        if handle is None:
+            raise CdpError("The browser did not return the trace as a stream")
+        if hasattr(out, 'write'):
+            self.written = self._read(handle, out)
+        else:
+            with open(out, 'wb') as f:
+                self.written = self._read(handle, f)
+        return self.written
+
+    def _read(self, handle, out):
+        writer = CountingWriter(out)
+        # Every chunk goes through writer, so that written counts both kinds.
+        decoder = Base64Decoder(writer)
+        try:
+            while True:
+                chunk = self.cdp.execute('IO.read', {'handle': handle, 'size': self.chunk_size})
+                data = chunk.get('data', '')
+                if data:
+                    if chunk.get('base64Encoded'):
+                        decoder.write(data.encode('ascii'))
+                    else:
+                        decoder.close()
+                        writer.write(data.encode('UTF-8'))
+                if chunk.get('eof'):
+                    break
+        finally:
+            try:
+                decoder.close()
+            finally:
+                try:
+                    self.cdp.execute('IO.close', {'handle': handle})
+                except CdpError:
+                    LOGGER.debug("Could not close trace stream %s", handle, exc_info=True)
+        return writer.written
@@ -0,0 +1,162 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Watch(object):
+    """
+    A deadline armed with Watchdog.watch(). expired is set just before
+    the callback is called, and done once it has returned.
+    """
+
+    __slots__ = ('deadline', 'callback', 'expired', 'done')
+
+    def __init__(self, deadline, callback):
+        self.deadline = deadline
+        self.callback = callback
+        self.expired = False
+        self.done = False
+
+
+class Watchdog(object):
+    """
+    Calls the callbacks of deadlines that pass before they are cancelled,
+    from a single background thread shared by every deadline.
+
+    :Usage:
+        watch = watchdog.watch(30, on_hang)
+        try:
+            ...
+        finally:
+            watchdog.cancel(watch)
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._cancelled = 0
+        self._sequence = itertools.count()
+        self._condition = threading.Condition(threading.Lock())
+        self._thread = None
+
+    def watch(self, timeout, callback):
+        """
+        Calls callback() once timeout seconds have passed, unless the
+        returned Watch is cancelled first.
+        """
+        watch = Watch(time.time() + timeout, callback)
+        with self._condition:
+            heapq.heappush(self._heap, (watch.deadline, next(self._sequence), watch))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='msedge-watchdog')
+                self._thread.daemon = True
+                self._thread.start()
+            elif self._heap[0][2] is watch:
+                self._condition.notify()
+        return watch
+
+    def cancel(self, watch):
+        """
+        Cancels a Watch. Returns False if its callback has already been called.
+        """
+        with self._condition:
+            if watch.expired or watch.callback is None:
+                return not watch.expired
+            watch.callback = None
+            self._cancelled += 1
+            # Cancelled watches are left in the heap; rebuild it once they
+            # make up most of it.
+            if self._cancelled > 64 and self._cancelled * 2 > len(self._heap):
+                self._heap = [entry for entry in self._heap if entry[2].callback is not None]
+                heapq.heapify(self._heap)
+                self._cancelled = 0
+            return True
+
+    def wait(self, watch, timeout=None):
+        """
+        Waits until the callback of an expired Watch has returned. Returns
+        whether it has.
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        with self._condition:
+            while watch.expired and not watch.done:
+                remaining = deadline - time.time() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return watch.done or not watch.expired
+
+    def pending(self):
+        """
+        Returns the number of armed watches.
+        """
+        with self._condition:
+            return len(self._heap) - self._cancelled
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    while self._heap and self._heap[0][2].callback is None:
+                        heapq.heappop(self._heap)
+                        self._cancelled -= 1
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+                    delay = self._heap[0][0] - time.time()
+                    if delay <= 0:
+                        break
+                    self._condition.wait(delay)
+                watch = heapq.heappop(self._heap)[2]
+                callback, watch.callback = watch.callback, None
+                watch.expired = True
+            try:
+                callback()
+            except Exception:
+                LOGGER.exception("Watchdog callback failed")
+            finally:
+                with self._condition:
+                    watch.done = True
+                    self._condition.notify_all()
+
+
+_watchdog = Watchdog()
+
+
+def watch(timeout, callback):
+    """
+    Arms a deadline on the process-wide Watchdog. See Watchdog.watch().
+    """
+    return _watchdog.watch(timeout, callback)
+
+
+def cancel(watch):
+    """
+    Cancels a Watch of the process-wide Watchdog. See Watchdog.cancel().
+    """
+    return _watchdog.cancel(watch)
+
+
+def wait(watch, timeout=None):
+    """
+    Waits for the callback of an expired Watch of the process-wide
+    Watchdog. See Watchdog.wait().
+    """
+    return _watchdog.wait(watch, timeout)
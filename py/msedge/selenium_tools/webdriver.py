@@ -17,22 +17,113 @@
 # KIND, either express or implied.  See the License for the
 # specific language governing permissions and limitations
 # under the License.
+import logging
+import os
+import shutil
+import tempfile
+import time
 import warnings
+from contextlib import contextmanager
 
+try:
+    from shutil import which
+except ImportError:  # above is available in py3.3+
+    which = None
+
+from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.common import utils
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.command import Command
 from selenium.webdriver.remote.webdriver import WebDriver as RemoteWebDriver
 from selenium.webdriver.remote.remote_connection import RemoteConnection
+from selenium.webdriver.remote import utils as remote_utils
 from .remote_connection import EdgeRemoteConnection
 from .service import Service
-from .options import Options
+from .options import Options, CapabilitiesSnapshot
+from .profiling import NULL_TIMER
+from .streaming import CHUNK_SIZE, Base64Decoder
+
+LOGGER = logging.getLogger(__name__)
+
+class IsolatedContext(object):
+    """
+    A browser context created by WebDriver.isolated_context().
+
+    :Attributes:
+     - browser_context_id - The DevTools id of the browser context.
+     - target_id - The DevTools id of the context's page.
+     - window_handle - The WebDriver window handle of that page.
+    """
+
+    def __init__(self, browser_context_id, target_id, window_handle):
+        self.browser_context_id = browser_context_id
+        self.target_id = target_id
+        self.window_handle = window_handle
+
+
+# Collects the requested properties of every matching element into one
+# array per property, so that a single command returns all of them.
+_EXTRACT_ELEMENTS_SCRIPT = '''
+var selector = arguments[0], by = arguments[1], properties = arguments[2],
+    limit = arguments[3], root = arguments[4] || document;
+var nodes = [];
+if (by === 'xpath') {
+  var result = document.evaluate(selector, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+  for (var i = 0; i < result.snapshotLength && (limit === null || nodes.length < limit); i++) {
+    nodes.push(result.snapshotItem(i));
+  }
+} else {
+  var matches = root.querySelectorAll(selector);
+  for (var i = 0; i < matches.length && (limit === null || nodes.length < limit); i++) {
+    nodes.push(matches[i]);
+  }
+}
+function read(node, property) {
+  // XPath may also select text and attribute nodes, which have no
+  // markup, box or attributes of their own.
+  var element = node.nodeType === 1;
+  switch (property) {
+    case 'text': return element && node.innerText !== undefined ? node.innerText : node.textContent;
+    case 'text_content': return node.textContent;
+    case 'html': return element ? node.outerHTML : null;
+    case 'inner_html': return element ? node.innerHTML : null;
+    case 'tag_name': return element ? node.tagName.toLowerCase() : node.nodeName;
+    case 'rect':
+      if (!element) return null;
+      var rect = node.getBoundingClientRect();
+      return [rect.x, rect.y, rect.width, rect.height];
+    case 'visible':
+      if (!element) return null;
+      return !!(node.offsetWidth || node.offsetHeight || node.getClientRects().length);
+  }
+  if (property.charAt(0) === '@') return element ? node.getAttribute(property.substring(1)) : null;
+  var value = node[property];
+  if (value === undefined) return null;
+  if (value !== null && typeof value === 'object' && !Array.isArray(value)) return String(value);
+  return value;
+}
+var columns = {};
+for (var p = 0; p < properties.length; p++) {
+  var column = new Array(nodes.length);
+  for (var n = 0; n < nodes.length; n++) column[n] = read(nodes[n], properties[p]);
+  columns[properties[p]] = column;
+}
+return columns;
+'''
 
 
 class WebDriver(RemoteWebDriver):
 
+    # The snapshot of the session start_session() is creating, if any.
+    _starting_snapshot = None
+    _startup_timer = NULL_TIMER
+
     def __init__(self, executable_path='',
                  capabilities=None, port=0, verbose=False, service_log_path=None,
                  log_path=None, keep_alive=None,
-                 desired_capabilities=None, service_args=None, options=None):
+                 desired_capabilities=None, service_args=None, options=None,
+                 service=None, startup_profiler=None, command_timeout=None,
+                 command_timeouts=None, json_codec=None):
         """
         Creates a new instance of the edge driver.
 
@@ -50,7 +141,28 @@ class WebDriver(RemoteWebDriver):
          - desired_capabilities - Dictionary object with non-browser specific
            capabilities only, such as "proxy" or "loggingPref".
          - service_args - List of args to pass to the driver service
-         - options - this takes an instance of EdgeOptions
+         - options - this takes an instance of EdgeOptions, or a snapshot
+           created with EdgeOptions.freeze()
+         - service - An EdgeService to use instead of starting a new one, for
+           example one acquired from an EdgeServicePool. It is started if it
+           is not running yet, and stopped by quit().
+         - startup_profiler - An optional EdgeStartupProfiler. When given, the
+           time spent in each startup phase is stored in startup_timings and
+           recorded by the profiler.
+         - command_timeout - Seconds a command may take before the driver is
+           considered hung. Its driver and browser processes are then killed
+           and the command raises CommandTimeoutError, a TimeoutException.
+           The browsers are killed only if the service runs in its own
+           process group, which a given service needs process_group=True for.
+         - command_timeouts - Dict of deadlines for specific commands,
+           overriding command_timeout, e.g. {'get': 300}.
+         - json_codec - JSON codec for command payloads and responses, e.g.
+           'orjson' or 'auto' for the fastest installed one. Defaults to
+           the json module.
+
+         The blocking rules of options, see EdgeOptions.block_urls(), are
+         applied right after the session is created; resource_blocker then
+         holds the ResourceBlocker applying them.
 
          """
 
@@ -58,12 +170,20 @@ class WebDriver(RemoteWebDriver):
             "Selenium Tools for Microsoft Edge is deprecated. Please upgrade to Selenium 4 which has built-in support for Microsoft Edge (Chromium): https://docs.microsoft.com/en-us/microsoft-edge/webdriver-chromium/#upgrading-from-selenium-3",
             DeprecationWarning, stacklevel=2)
 
+        timer = startup_profiler.timer() if startup_profiler is not None else NULL_TIMER
+        self._startup_timer = timer
+        self.startup_timings = None
+
         use_chromium = False
         if (options and options.use_chromium) or \
             (desired_capabilities and 'ms:edgeChromium' in desired_capabilities \
                 and desired_capabilities['ms:edgeChromium']):
             use_chromium = True
 
+        profile = getattr(options, 'blocking_profile', None)
+        if profile and not use_chromium:
+            raise ValueError("Blocking rules need Microsoft Edge (Chromium), set options.use_chromium")
+
         if keep_alive is None:
             if use_chromium: 
                 keep_alive = True
@@ -82,6 +202,8 @@ class WebDriver(RemoteWebDriver):
             # desired_capabilities stays as passed in
             if desired_capabilities is None:
                 desired_capabilities = self.create_options().to_capabilities()
+        elif isinstance(options, CapabilitiesSnapshot) and desired_capabilities is None:
+            desired_capabilities = options
         else:
             if desired_capabilities is None:
                 desired_capabilities = options.to_capabilities()
@@ -92,29 +214,120 @@ class WebDriver(RemoteWebDriver):
             warnings.warn('use service_log_path instead of log_path',
                           DeprecationWarning, stacklevel=2)
             service_log_path = log_path
+        timer.mark('capabilities')
+
+        if service is None:
+            if which is not None:
+                executable_path = which(executable_path) or executable_path
+                timer.mark('binary_resolution')
+            self.service = Service(
+                    executable_path,
+                    port=port,
+                    verbose=verbose,
+                    service_args=service_args,
+                    log_path=service_log_path,
+                    process_group=command_timeout is not None or bool(command_timeouts))
+            self.service.start()
+            timer.add(self.service.start_timings)
+        else:
+            self.service = service
+            if (command_timeout is not None or command_timeouts) and os.name != 'nt' and \
+                    getattr(service, 'process_group', None) is False:
+                LOGGER.warning("The service was not created with process_group=True, so the "
+                               "browsers of a hung driver are not killed")
+            if getattr(self.service, 'process', None) is None:
+                self.service.start()
+                timer.add(getattr(self.service, 'start_timings', None) or {})
+        self.port = self.service.port
+
+        if isinstance(desired_capabilities, CapabilitiesSnapshot):
+            self._capabilities_snapshot = desired_capabilities
+        else:
+            self._capabilities_snapshot = None
 
-        self.port = port
-
-        self.service = Service(
-                executable_path,
-                port=self.port,
-                verbose=verbose,
-                service_args=service_args,
-                log_path=service_log_path)
-        self.service.start()
-
+        self.resource_blocker = None
         try:
+            timer.mark('service')
+            command_executor = EdgeRemoteConnection(
+                remote_server_addr=self.service.service_url,
+                keep_alive=keep_alive,
+                command_timeout=command_timeout,
+                command_timeouts=command_timeouts,
+                json_codec=json_codec)
+            if command_timeout is not None or command_timeouts:
+                command_executor.on_timeout = self._on_command_timeout
+            timer.mark('connection')
             RemoteWebDriver.__init__(
                 self,
-                command_executor = EdgeRemoteConnection(
-                remote_server_addr=self.service.service_url,
-                keep_alive=keep_alive),
+                command_executor=command_executor,
                 desired_capabilities=desired_capabilities)
+            timer.mark('new_session')
+            if profile:
+                from .blocking import ResourceBlocker
+                self.resource_blocker = ResourceBlocker(self, profile.compile())
+                self.resource_blocker.apply()
         except Exception:
             self.quit()
             raise
+        finally:
+            self._startup_timer = NULL_TIMER
         self._is_remote = False
 
+        if startup_profiler is not None:
+            timings = timer.timings
+            timings.pop('service', None)
+            timings['total'] = timer.elapsed()
+            self.startup_timings = timings
+            startup_profiler.record(timings)
+
+    @classmethod
+    def launch_many(cls, n, options=None, max_parallel=8, **kwargs):
+        """
+        Starts n drivers concurrently. See launcher.launch_many().
+
+        :Usage:
+            result = Edge.launch_many(50, options, max_parallel=10)
+            for driver in result.drivers:
+                ...
+            result.quit_all()
+        """
+        from .launcher import launch_many
+        return launch_many(n, options, max_parallel=max_parallel, **kwargs)
+
+    def start_session(self, capabilities, browser_profile=None):
+        """
+        Creates a new session. When the driver was created from a frozen
+        options snapshot, the request body serialized for the snapshot's
+        first session is sent as is.
+        """
+        snapshot = self._capabilities_snapshot
+        if snapshot is None:
+            return RemoteWebDriver.start_session(self, capabilities, browser_profile)
+        # Selenium encodes the W3C capabilities and then sends the new
+        # session command through execute().
+        self._starting_snapshot = snapshot
+        try:
+            RemoteWebDriver.start_session(self, snapshot.to_capabilities(), browser_profile)
+        finally:
+            self._starting_snapshot = None
+
+    def execute(self, driver_command, params=None):
+        if driver_command == Command.NEW_SESSION:
+            return self._execute_new_session(params)
+        return RemoteWebDriver.execute(self, driver_command, params)
+
+    def _execute_new_session(self, params):
+        snapshot = self._starting_snapshot
+        if snapshot is None:
+            self._startup_timer.mark('capabilities')
+            return RemoteWebDriver.execute(self, Command.NEW_SESSION, params)
+        if snapshot._session_body is None:
+            snapshot._session_body = remote_utils.dump_json(params)
+        self._startup_timer.mark('capabilities')
+        response = self.command_executor.execute_serialized(Command.NEW_SESSION, snapshot._session_body)
+        self.error_handler.check_response(response)
+        return response
+
     def launch_app(self, id):
         """Launches Edge app specified by id."""
         return self.execute("launchApp", {'id': id})
@@ -175,12 +388,372 @@ class WebDriver(RemoteWebDriver):
         """
         return self.execute("executeCdpCommand", {'cmd': cmd, 'params': cmd_args})['value']
 
+    def execute_cdp_cmd_to_file(self, cmd, cmd_args, out, field='data'):
+        """
+        Executes an Edge Devtools Protocol command returning a base64
+        encoded field, and writes the decoded field to out while the
+        response is read.
+
+        :Args:
+         - cmd: A str, command name
+         - cmd_args: A dict, command args
+         - out: A file name or a binary file object
+         - field: The name of the base64 encoded result field
+
+        :Usage:
+            driver.execute_cdp_cmd_to_file('Page.printToPDF', {}, 'page.pdf')
+
+        :Returns:
+            The number of bytes written.
+        """
+        return self._execute_to_file(
+            "executeCdpCommand", {'cmd': cmd, 'params': cmd_args}, out, field, 'base64')[1]
+
+    def save_response_body(self, request_id, out):
+        """
+        Writes the body of a network response to out, decoding it if the
+        browser returns it base64 encoded. See Network.getResponseBody.
+
+        :Args:
+         - request_id: The requestId of the response
+         - out: A file name or a binary file object
+
+        :Returns:
+            The number of bytes written.
+        """
+        # Whether the body is base64 encoded may only be known after it,
+        # so it is spooled first, to disk once it grows large.
+        with tempfile.SpooledTemporaryFile(max_size=4 * CHUNK_SIZE) as spool:
+            response, written = self._execute_to_file(
+                "executeCdpCommand",
+                {'cmd': 'Network.getResponseBody', 'params': {'requestId': request_id}},
+                spool, 'body', None)
+            spool.seek(0)
+            if not response['value'].get('base64Encoded'):
+                if hasattr(out, 'write'):
+                    shutil.copyfileobj(spool, out, CHUNK_SIZE)
+                else:
+                    with open(out, 'wb') as f:
+                        shutil.copyfileobj(spool, f, CHUNK_SIZE)
+                return written
+            if hasattr(out, 'write'):
+                return _decode_base64(spool, out)
+            with open(out, 'wb') as f:
+                return _decode_base64(spool, f)
+
+    def get_screenshot_as_file(self, filename):
+        """
+        Saves a screenshot of the current window to a PNG image file,
+        decoding it while it is received. Returns False if there is any
+        IOError, else returns True. Use full paths in your filename.
+
+        :Args:
+         - filename: The full path you wish to save your screenshot to. This
+           should end with a `.png` extension.
+
+        :Usage:
+            driver.get_screenshot_as_file('/Screenshots/foo.png')
+        """
+        if not filename.lower().endswith('.png'):
+            warnings.warn("name used for saved screenshot does not match file "
+                          "type. It should end with a `.png` extension", UserWarning)
+        try:
+            self._execute_to_file(Command.SCREENSHOT, {}, filename, 'value', 'base64')
+        except (IOError, OSError):  # creating the temporary file raises OSError on py2.7
+            return False
+        return True
+
+    def _execute_to_file(self, driver_command, params, out, field, decode):
+        params = self._wrap_value(params)
+        if self.session_id is not None:
+            params['sessionId'] = self.session_id
+        response, written = self.command_executor.execute_to_file(
+            driver_command, params, out, field, decode)
+        self.error_handler.check_response(response)
+        return response, written
+
+    @contextmanager
+    def record_har(self, out, source='log', max_pending=10000):
+        """
+        Writes the network activity of the session to a HAR file, entry by
+        entry as requests complete, without holding the whole log.
+
+        With source 'log' the events are read from the performance log,
+        which needs the session to be created with the 'ms:loggingPrefs'
+        capability set to {'performance': 'ALL'}; call collect() on the
+        recorder regularly, e.g. after every page, to keep the batches
+        small. With source 'cdp' they are received over a DevTools
+        connection as they happen.
+
+        :Args:
+         - out - A file name or a binary file object.
+         - source - 'log' or 'cdp'.
+         - max_pending - Maximum number of requests in flight that are
+           tracked. Beyond it the oldest are written as incomplete.
+
+        :Usage:
+            with driver.record_har('crawl.har') as har:
+                for url in urls:
+                    driver.get(url)
+                    har.collect()
+
+        :Returns:
+            A HarRecorder.
+        """
+        from .har import HarRecorder
+        recorder = HarRecorder(self, out, source, max_pending)
+        try:
+            yield recorder
+        finally:
+            recorder.close()
+
+    def sample_metrics(self, interval=1.0, max_samples=100000):
+        """
+        Starts sampling the Performance.getMetrics of the current page on a
+        background thread. See metrics.MetricsSampler.
+
+        :Args:
+         - interval - Seconds between samples.
+         - max_samples - Number of samples kept.
+
+        :Usage:
+            with driver.sample_metrics(interval=0.5) as sampler:
+                driver.get(url)
+                sampler.capture_page()
+            print(sampler.summaries())
+
+        :Returns:
+            The started MetricsSampler. Stop it with stop(), or use it as
+            a context manager.
+        """
+        from .metrics import MetricsSampler
+        return MetricsSampler(self, interval, max_samples).start()
+
+    @contextmanager
+    def trace(self, out, categories=None, exclude=None, preset='default', compression='none',
+              chunk_size=None, timeout=60):
+        """
+        Records a Chromium trace of what happens in the block and writes it
+        to out, in chunks read from the browser, so that traces of hundreds
+        of megabytes do not have to fit in memory. The trace is written
+        also when the block raises; errors writing it are then logged, and
+        the block's exception is propagated.
+
+        :Args:
+         - out - A file name, or a binary file object such as an mmap.
+         - categories - Trace categories to record in addition to the
+           preset. See tracing.trace_config().
+         - exclude - Trace categories not to record.
+         - preset - A tracing.PRESETS name: 'default', 'loading',
+           'javascript' or 'rendering', or None.
+         - compression - 'none' for a JSON trace, 'gzip' for a gzipped one.
+         - chunk_size - Bytes read per IO.read. Defaults to 1 MiB.
+         - timeout - Seconds to wait for the browser to finish the trace.
+
+        :Usage:
+            with driver.trace('load.json', preset='loading') as tracer:
+                driver.get(url)
+            print(tracer.written)
+
+        :Returns:
+            A tracing.Tracer.
+        """
+        from .tracing import DEFAULT_CHUNK_SIZE, Tracer, trace_config
+        config = trace_config(categories, exclude, preset)
+        cdp = self.connect_cdp()
+        try:
+            tracer = Tracer(cdp, chunk_size or DEFAULT_CHUNK_SIZE, compression)
+            tracer.start(config)
+            try:
+                yield tracer
+            except BaseException:
+                # Failing to write the trace must not hide the block's error.
+                try:
+                    tracer.stop(out, timeout)
+                except Exception:
+                    LOGGER.warning("Could not write the trace", exc_info=True)
+                raise
+            tracer.stop(out, timeout)
+        finally:
+            cdp.close()
+
+    @contextmanager
+    def record_screencast(self, capacity=100, slot_size=256 * 1024, path=None, format='jpeg',
+                          quality=60, max_width=None, max_height=None, every_nth_frame=1,
+                          max_fps=None):
+        """
+        Records the frames the browser paints while in the block into a
+        ring buffer of the latest capacity frames, without a command round
+        trip per frame. See screencast.ScreencastRecorder.
+
+        :Args:
+         - capacity - Number of frames kept.
+         - slot_size - Maximum size of a frame in bytes. Larger frames are skipped.
+         - path - Optional file to memory-map the ring buffer to.
+         - format - 'jpeg' or 'png'.
+         - quality - JPEG quality from 0 to 100.
+         - max_width, max_height - Optional maximum frame size in pixels.
+         - every_nth_frame - Makes the browser send only every n-th frame.
+         - max_fps - Optional maximum number of frames per second.
+
+        :Usage:
+            with driver.record_screencast(max_fps=5) as recorder:
+                run_job(driver)
+            if failed:
+                recorder.ring.save('artifacts/frames')
+
+        :Returns:
+            A ScreencastRecorder. Its ring stays readable after the block.
+        """
+        from .screencast import FrameRing, ScreencastRecorder
+        ring = FrameRing(capacity, slot_size, path)
+        cdp = self.connect_cdp()
+        try:
+            recorder = ScreencastRecorder(cdp, ring, format, quality, max_width, max_height,
+                                          every_nth_frame, max_fps)
+            recorder.start()
+            try:
+                yield recorder
+            finally:
+                recorder.stop()
+        finally:
+            cdp.close()
+
+    def extract_elements(self, selector, properties, by=By.CSS_SELECTOR, root=None, limit=None):
+        """
+        Reads properties of every element matching selector with a single
+        command, instead of one command per element and property.
+
+        :Args:
+         - selector - A CSS selector, or an XPath expression if by is By.XPATH.
+         - properties - List of the properties to read from each element:
+           'text' (rendered text), 'text_content', 'html' (outer HTML),
+           'inner_html', 'tag_name', 'rect' ([x, y, width, height] in CSS
+           pixels), 'visible', '@name' for the attribute name, or the name
+           of any other DOM property, e.g. 'value' or 'checked'. For text
+           and attribute nodes selected by XPath, 'html', 'inner_html',
+           'rect', 'visible' and attributes are None.
+         - by - By.CSS_SELECTOR or By.XPATH.
+         - root - Optional WebElement to search within instead of the document.
+         - limit - Optional maximum number of elements to read.
+
+        :Usage:
+            columns = driver.extract_elements('a', ['text', '@href'])
+            for text, href in zip(columns['text'], columns['@href']):
+                ...
+
+        :Returns:
+            A dict with one list per property, each holding the values of
+            the matching elements in document order.
+        """
+        if by not in (By.CSS_SELECTOR, By.XPATH):
+            raise ValueError("by should be By.CSS_SELECTOR or By.XPATH")
+        if isinstance(properties, str):
+            raise TypeError("properties should be a list of property names")
+        properties = list(properties)
+        return self.execute_script(_EXTRACT_ELEMENTS_SCRIPT, selector, by, properties, limit, root)
+
+    @contextmanager
+    def isolated_context(self, url='about:blank', timeout=10):
+        """
+        Opens a page in a new browser context, which shares no cookies,
+        storage or cache with the rest of the browser, and switches to it.
+        On exit the context and its pages are disposed and the session
+        switches back to the previous window.
+
+        Many isolated jobs can so share one browser process.
+
+        :Args:
+         - url - The URL the new page is opened with.
+         - timeout - Seconds to wait for the driver to list the new page.
+
+        :Usage:
+            with driver.isolated_context('https://example.com') as context:
+                driver.add_cookie({'name': 'user', 'value': 'a'})
+                ...
+
+        :Returns:
+            An IsolatedContext.
+        """
+        original_handle = self.current_window_handle
+        context_id = self.execute_cdp_cmd('Target.createBrowserContext', {})['browserContextId']
+        try:
+            target_id = self.execute_cdp_cmd('Target.createTarget', {
+                'url': url, 'browserContextId': context_id})['targetId']
+            handle = self._wait_for_window_handle(target_id, timeout)
+            self.switch_to.window(handle)
+            try:
+                yield IsolatedContext(context_id, target_id, handle)
+            finally:
+                try:
+                    self.switch_to.window(original_handle)
+                except WebDriverException:
+                    LOGGER.warning("Could not switch back to window %s", original_handle, exc_info=True)
+        finally:
+            try:
+                self.execute_cdp_cmd('Target.disposeBrowserContext', {'browserContextId': context_id})
+            except WebDriverException:
+                LOGGER.warning("Could not dispose browser context %s", context_id, exc_info=True)
+
+    def _wait_for_window_handle(self, target_id, timeout):
+        # Depending on the driver version, window handles are the target id
+        # or 'CDwindow-' followed by it.
+        deadline = time.time() + timeout
+        delay = 0.005
+        while True:
+            for handle in self.window_handles:
+                if handle == target_id or handle == 'CDwindow-' + target_id:
+                    return handle
+            if time.time() > deadline:
+                raise WebDriverException("No window handle found for target %s" % target_id)
+            time.sleep(delay)
+            delay = min(delay * 2, 0.25)
+
+    def connect_cdp(self, timeout=30):
+        """
+        Opens a direct DevTools WebSocket connection to the current window,
+        using the debuggerAddress reported in the session capabilities.
+
+        Commands sent over the connection are pipelined rather than sent as
+        one HTTP request each, and DevTools events can be subscribed to.
+
+        :Usage:
+            with driver.connect_cdp() as cdp:
+                results = cdp.execute_many([('DOM.getDocument', {}), ('Page.getFrameTree', {})])
+
+        :Returns:
+            A connected CdpConnection. The caller is responsible for closing it.
+        """
+        from .cdp import CdpConnection, CdpError
+        edge_options = self.capabilities.get('ms:edgeOptions') or {}
+        debugger_address = edge_options.get('debuggerAddress')
+        if not debugger_address:
+            raise WebDriverException("The session did not report a DevTools debuggerAddress")
+        handle = self.current_window_handle
+        target_id = handle[len('CDwindow-'):] if handle.startswith('CDwindow-') else handle
+        for target in CdpConnection.targets(debugger_address, timeout):
+            if target.get('type') == 'page' and target['id'] == target_id:
+                return CdpConnection(target['webSocketDebuggerUrl'], timeout)
+        raise CdpError("No DevTools page target found at %s for window %s" % (debugger_address, handle))
+
+    def _on_command_timeout(self, command):
+        # Runs on the watchdog thread while the command is still blocked;
+        # killing the driver makes it fail right away.
+        LOGGER.warning("Command %s timed out, killing the driver and browser", command)
+        kill = getattr(self.service, 'kill', None)
+        if kill is not None:
+            kill()
+        else:
+            self.service.stop()
+
     def quit(self):
         """
         Closes the browser and shuts down the EdgeDriver executable
         that is started when starting the EdgeDriver
         """
         try:
+            if getattr(self, 'resource_blocker', None) is not None:
+                self.resource_blocker.close()
             RemoteWebDriver.quit(self)
         except Exception:
             # We don't care about the message because something probably has gone wrong
@@ -188,5 +761,25 @@ class WebDriver(RemoteWebDriver):
         finally:
             self.service.stop()
 
+    def quit_async(self, timeout=10):
+        """
+        Quits the driver on a background thread, killing the driver and
+        browser processes if quitting takes longer than timeout seconds.
+        See teardown.quit_async().
+
+        :Returns:
+            A concurrent.futures.Future resolving to a TeardownReport.
+        """
+        from .teardown import quit_async
+        return quit_async(self, timeout)
+
     def create_options(self):
         return Options()
+
+
+def _decode_base64(source, out):
+    decoder = Base64Decoder(out)
+    for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+        decoder.write(chunk)
+    decoder.close()
+    return decoder.written
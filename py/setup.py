@@ -33,7 +33,8 @@ setup(
         'msedge.selenium_tools'
     ],
     install_requires = [
-        'selenium==3.141'
+        'selenium==3.141',
+        'futures; python_version < "3.2"'
     ],
     classifiers = [
         'Development Status :: 5 - Production/Stable',
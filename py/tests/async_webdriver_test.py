@@ -0,0 +1,121 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+from selenium.common.exceptions import WebDriverException
+from msedge.selenium_tools import AsyncEdge, EdgeOptions
+from msedge.selenium_tools import async_webdriver
+from msedge.selenium_tools.async_remote_connection import AsyncEdgeRemoteConnection
+from fake_msedgedriver import FakeDriverServer, make_executable
+
+
+class AsyncEdgeRemoteConnectionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeDriverServer().start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_many_sessions_on_one_loop(self):
+        options = EdgeOptions()
+        options.use_chromium = True
+        capabilities = options.freeze()
+
+        async def job(i):
+            driver = AsyncEdge(AsyncEdgeRemoteConnection(self.server.url))
+            await driver.start_session(capabilities)
+            await driver.get('https://example.com/%d' % i)
+            await driver.set_network_conditions(latency=i)
+            conditions = await driver.get_network_conditions()
+            await driver.execute_cdp_cmd('Browser.getVersion', {})
+            url = await driver.current_url()
+            await driver.quit()
+            return url, conditions['latency']
+
+        async def main():
+            return await asyncio.gather(*[job(i) for i in range(50)])
+
+        results = asyncio.run(main())
+        self.assertEqual([('https://example.com/%d' % i, i) for i in range(50)], results)
+        self.assertEqual({}, self.server.sessions)
+
+    def test_errors_are_raised(self):
+        async def main():
+            driver = AsyncEdge(AsyncEdgeRemoteConnection(self.server.url))
+            await driver.start_session(EdgeOptions().to_capabilities())
+            try:
+                await driver.get_network_conditions()
+            finally:
+                await driver.quit()
+
+        self.assertRaises(WebDriverException, asyncio.run, main())
+
+
+@unittest.skipIf(os.name == 'nt', reason="The fake driver launcher is a POSIX shell script.")
+class AsyncEdgeTest(unittest.TestCase):
+
+    def test_create_starts_service_and_session(self):
+        tmpdir = tempfile.mkdtemp()
+        options = EdgeOptions()
+        options.use_chromium = True
+
+        async def main():
+            async with await AsyncEdge.create(make_executable(tmpdir), options=options) as driver:
+                self.assertEqual('msedge', driver.capabilities['browserName'])
+                process = driver.service.process
+            return process
+
+        try:
+            process = asyncio.run(main())
+            self.assertIsNotNone(process.returncode)
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_cancelled_create_stops_the_service(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        options = EdgeOptions()
+        options.use_chromium = True
+        silent = os.path.join(tmpdir, 'silent')
+        with open(silent, 'w') as f:
+            f.write('#!/bin/sh\nexec sleep 30\n')
+        os.chmod(silent, 0o755)
+        services = []
+        start = async_webdriver.AsyncService.start
+
+        def record(service, *args, **kwargs):
+            services.append(service)
+            return start(service, *args, **kwargs)
+        async_webdriver.AsyncService.start = record
+        self.addCleanup(setattr, async_webdriver.AsyncService, 'start', start)
+
+        for executable, service_args in ((silent, None), (make_executable(tmpdir), ['--hang=POST /session'])):
+            async def main():
+                await asyncio.wait_for(AsyncEdge.create(executable, options=options,
+                                                        service_args=service_args), 1)
+            with self.assertRaises(asyncio.TimeoutError):
+                asyncio.run(main())
+            self.assertIsNone(services[-1].process)
+        self.assertEqual(2, len(services))
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import copy
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks'))
+import run_benchmarks
+
+
+class BenchmarkSuiteTest(unittest.TestCase):
+
+    def test_suite_produces_comparable_results(self):
+        current = run_benchmarks.run(scale=0.001)
+        self.assertEqual(set(name for name, _, _ in run_benchmarks.BENCHMARKS),
+                         set(current['results']))
+        for result in current['results'].values():
+            self.assertGreaterEqual(result['iterations'], 1)
+            self.assertLessEqual(result['min'], result['median'])
+        current = json.loads(json.dumps(current))
+
+        self.assertEqual([], run_benchmarks.compare(current, current, 1.0))
+        baseline = copy.deepcopy(current)
+        baseline['results']['quit']['median'] /= 2
+        regressions = run_benchmarks.compare(current, baseline, 1.5)
+        self.assertEqual(['quit'], [name for name, _, _, _ in regressions])
+
+if __name__=='__main__':
+    unittest.main()
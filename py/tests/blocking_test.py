@@ -0,0 +1,167 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import os
+import pickle
+import sys
+import time
+import unittest
+import warnings
+
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+from msedge.selenium_tools import Edge, EdgeOptions
+from msedge.selenium_tools.blocking import BlockingProfile
+from fake_devtools import FakeDevTools
+from fake_msedgedriver import FakeService
+
+
+class BlockingProfileTest(unittest.TestCase):
+
+    def test_first_matching_response_wins(self):
+        profile = BlockingProfile()
+        profile.add_response('*://example.com/api/*', '1')
+        profile.add_response('*://*.example.com/*', '2')
+        profile.add_response('*/config.json', '3')
+        profile.add_response('http://example.com/?', '4')
+        compiled = profile.compile()
+        self.assertEqual(0, compiled.match('https://example.com/api/users'))
+        self.assertEqual(1, compiled.match('https://cdn.example.com/config.json'))
+        self.assertEqual(2, compiled.match('https://example.com/config.json'))
+        self.assertEqual(3, compiled.match('http://example.com/a'))
+        self.assertIsNone(compiled.match('http://example.com/ab'))
+        self.assertIsNone(compiled.match('https://example.org/'))
+
+    def test_many_rules(self):
+        profile = BlockingProfile()
+        for i in range(5000):
+            profile.add_response('*://host%d.example.com/*' % i, str(i))
+        compiled = profile.compile()
+        self.assertIs(compiled, profile.compile())
+        self.assertEqual(4321, compiled.match('https://host4321.example.com/index.html'))
+        self.assertEqual(5000, len(compiled.fetch_patterns))
+
+    def test_more_rules_than_regex_groups(self):
+        profile = BlockingProfile()
+        for i in range(250):
+            profile.add_response('*/other/%d' % i, str(i))
+        for i in range(250):
+            profile.add_response('*://example.com/%d/*' % i, str(i))
+        profile.add_response('*://example.com/*', 'any')
+        compiled = profile.compile()
+        self.assertEqual(201, compiled.match('https://example.net/other/201'))
+        self.assertEqual(420, compiled.match('https://example.com/170/index.html'))
+        self.assertEqual(500, compiled.match('https://example.com/index.html'))
+
+    def test_presets_and_validation(self):
+        profile = BlockingProfile().add_preset('analytics').add_preset('images')
+        self.assertIn('*://*.google-analytics.com/*', profile.url_patterns)
+        self.assertEqual(['Image'], profile.resource_types)
+        with self.assertRaises(ValueError):
+            profile.block_resource_types('Picture')
+        with self.assertRaises(ValueError):
+            profile.add_preset('everything')
+        self.assertFalse(BlockingProfile())
+
+
+class OptionsBlockingTest(unittest.TestCase):
+
+    def test_clone_and_freeze_carry_the_profile(self):
+        options = EdgeOptions()
+        options.use_chromium = True
+        options.block_urls('*.mp4')
+        snapshot = options.freeze()
+        clone = options.clone()
+        options.disable_images()
+        self.assertEqual(['*.mp4'], snapshot.blocking_profile.url_patterns)
+        self.assertEqual([], snapshot.blocking_profile.resource_types)
+        self.assertEqual([], clone.blocking_profile.resource_types)
+        self.assertNotIn('blocking', str(snapshot.to_capabilities()))
+
+        snapshot.blocking_profile.compile()
+        restored = pickle.loads(pickle.dumps(snapshot))
+        self.assertEqual(['*.mp4'], restored.blocking_profile.url_patterns)
+
+    def test_no_profile_by_default(self):
+        self.assertIsNone(EdgeOptions().blocking_profile)
+        self.assertIsNone(EdgeOptions().freeze().blocking_profile)
+
+
+class ApplyBlockingTest(unittest.TestCase):
+
+    def setUp(self):
+        warnings.simplefilter('ignore', DeprecationWarning)
+        self.devtools = FakeDevTools().start()
+        self.service = FakeService()
+        self.service.server.debugger_address = self.devtools.address
+        self.service.server.target_id = self.devtools.target_id
+        self.options = EdgeOptions()
+        self.options.use_chromium = True
+        self.driver = None
+
+    def tearDown(self):
+        if self.driver is not None:
+            self.driver.quit()
+        self.devtools.stop()
+
+    def start(self, options):
+        self.driver = Edge(options=options, service=self.service)
+        session, = self.service.server.sessions.values()
+        return session
+
+    def test_legacy_edge_is_refused(self):
+        options = EdgeOptions()
+        options.block_urls('*.mp4')
+        with self.assertRaises(ValueError):
+            Edge(options=options, service=self.service)
+        self.assertEqual([], self.service.server.requests)
+
+    def test_url_patterns_are_blocked_by_the_browser(self):
+        self.options.add_blocking_preset('ads')
+        session = self.start(self.options.freeze())
+        commands = dict(session.cdp_commands)
+        self.assertIn('*://*.doubleclick.net/*', commands['Network.setBlockedURLs']['urls'])
+        self.assertEqual([], self.devtools.commands)
+
+    def test_requests_are_intercepted(self):
+        self.options.disable_images()
+        self.options.add_canned_response('*://example.com/config.json', '{"beta": false}',
+                                         content_type='application/json')
+        self.start(self.options)
+        enable, = [params for method, params in self.devtools.commands if method == 'Fetch.enable']
+        self.assertEqual([{'urlPattern': '*', 'resourceType': 'Image', 'requestStage': 'Request'},
+                          {'urlPattern': '*://example.com/config.json', 'requestStage': 'Request'}],
+                         enable['patterns'])
+
+        for request_id, url, resource_type in [('1', 'https://example.com/config.json', 'XHR'),
+                                               ('2', 'https://example.com/logo.png', 'Image'),
+                                               ('3', 'https://example.com/app.js', 'Script')]:
+            self.devtools.emit('Fetch.requestPaused', {
+                'requestId': request_id, 'request': {'url': url}, 'resourceType': resource_type})
+        deadline = time.time() + 5
+        while len(self.devtools.commands) < 4 and time.time() < deadline:
+            time.sleep(0.01)
+        replies = self.devtools.commands[1:]
+        self.assertEqual(['Fetch.fulfillRequest', 'Fetch.failRequest', 'Fetch.continueRequest'],
+                         [method for method, _ in replies])
+        fulfill = replies[0][1]
+        self.assertEqual(('1', 200, b'{"beta": false}'),
+                         (fulfill['requestId'], fulfill['responseCode'], base64.b64decode(fulfill['body'])))
+        self.assertEqual([{'name': 'Content-Type', 'value': 'application/json'}], fulfill['responseHeaders'])
+        self.assertEqual('BlockedByClient', replies[1][1]['errorReason'])
+        blocker = self.driver.resource_blocker
+        self.assertEqual((1, 1, 1), (blocker.fulfilled, blocker.blocked, blocker.continued))
+
+if __name__=='__main__':
+    unittest.main()
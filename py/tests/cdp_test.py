@@ -0,0 +1,161 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+from msedge.selenium_tools import Edge, EdgeOptions
+from msedge.selenium_tools.cdp import CdpConnection, CdpError, _WebSocket
+from fake_devtools import FakeDevTools, FakeCdpError
+from fake_msedgedriver import FakeService
+
+
+class CdpConnectionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.devtools = FakeDevTools().start()
+        self.cdp = CdpConnection(self.devtools.websocket_url, timeout=10)
+
+    def tearDown(self):
+        self.cdp.close()
+        self.devtools.stop()
+
+    def test_pipelined_commands_are_correlated(self):
+        self.devtools.handlers['Runtime.evaluate'] = lambda params: {'result': {'value': params['expression']}}
+        commands = [('Runtime.evaluate', {'expression': str(i)}) for i in range(200)]
+        results = self.cdp.execute_many(commands)
+        self.assertEqual([str(i) for i in range(200)], [r['result']['value'] for r in results])
+
+    def test_large_messages(self):
+        body = 'x' * (1024 * 1024)
+        self.devtools.handlers['Network.getResponseBody'] = lambda params: {'body': body}
+        result = self.cdp.execute('Network.getResponseBody', {'requestId': '1', 'padding': body})
+        self.assertEqual(body, result['body'])
+
+    def test_errors_are_raised(self):
+        def fail(params):
+            raise FakeCdpError("'Foo.bar' wasn't found", -32601)
+        self.devtools.handlers['Foo.bar'] = fail
+        with self.assertRaises(CdpError) as context:
+            self.cdp.execute('Foo.bar')
+        self.assertEqual(-32601, context.exception.code)
+
+    def test_events_are_delivered(self):
+        received = []
+        done = threading.Event()
+
+        def listener(params):
+            received.append(params['requestId'])
+            if len(received) == 3:
+                done.set()
+
+        def enable(params):
+            for i in range(3):
+                self.devtools.emit('Network.requestWillBeSent', {'requestId': str(i)})
+            return {}
+
+        self.cdp.on('Network.requestWillBeSent', listener)
+        self.devtools.handlers['Network.enable'] = enable
+        self.cdp.execute('Network.enable')
+        self.assertTrue(done.wait(10))
+        self.assertEqual(['0', '1', '2'], received)
+
+    def test_pending_commands_fail_when_connection_drops(self):
+        self.devtools.handlers['Page.navigate'] = lambda params: self.devtools.stop()
+        with self.assertRaises(CdpError):
+            self.cdp.execute('Page.navigate', {'url': 'about:blank'})
+
+
+    def test_socket_is_closed_after_the_connection_dropped(self):
+        self.devtools.stop()
+        self.cdp._thread.join(10)
+        self.assertTrue(self.cdp.closed)
+        self.cdp.close()
+        self.assertEqual(-1, self.cdp._socket._sock.fileno())
+
+    def test_timed_out_commands_are_forgotten(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        self.devtools.handlers['Runtime.evaluate'] = lambda params: release.wait(10) and {}
+        with self.assertRaises(Exception):
+            self.cdp.execute('Runtime.evaluate', {'expression': '1'}, timeout=0.1)
+        with self.assertRaises(Exception):
+            self.cdp.execute_many([('Runtime.evaluate', {})] * 2, timeout=0.1)
+        self.assertEqual({}, self.cdp._pending)
+
+class WebSocketTest(unittest.TestCase):
+
+    def setUp(self):
+        self.devtools = FakeDevTools().start()
+
+    def tearDown(self):
+        self.devtools.stop()
+
+    def test_frames_sent_with_the_handshake_are_read(self):
+        self.devtools.greeting = b'\x81\x02{}' + b'\x81\x7e\x00\x80' + b'x' * 128
+        websocket = _WebSocket(self.devtools.websocket_url)
+        try:
+            self.assertEqual(b'{}', websocket.recv())
+            self.assertEqual(b'x' * 128, websocket.recv())
+        finally:
+            websocket.close()
+
+    def test_truncated_frame_closes_the_connection(self):
+        self.devtools.greeting = b'\x81\x7f\x00'
+        websocket = _WebSocket(self.devtools.websocket_url)
+        try:
+            self.devtools.stop()
+            self.assertIsNone(websocket.recv())
+        finally:
+            websocket.close()
+
+
+class ConnectCdpTest(unittest.TestCase):
+
+    def test_driver_connects_to_debugger_address(self):
+        devtools = FakeDevTools().start()
+        service = FakeService()
+        service.server.debugger_address = devtools.address
+        service.server.target_id = devtools.target_id
+        options = EdgeOptions()
+        options.use_chromium = True
+        driver = Edge(options=options, service=service)
+        try:
+            with driver.connect_cdp() as cdp:
+                cdp.execute('Browser.getVersion')
+            self.assertEqual([('Browser.getVersion', {})], devtools.commands)
+        finally:
+            driver.quit()
+            devtools.stop()
+
+    def test_unknown_window_is_not_attached_to(self):
+        devtools = FakeDevTools().start()
+        service = FakeService()
+        service.server.debugger_address = devtools.address
+        options = EdgeOptions()
+        options.use_chromium = True
+        driver = Edge(options=options, service=service)
+        try:
+            with self.assertRaises(CdpError):
+                driver.connect_cdp()
+            self.assertEqual([], devtools.clients)
+        finally:
+            driver.quit()
+            devtools.stop()
+
+if __name__=='__main__':
+    unittest.main()
@@ -12,12 +12,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import base64
+import pickle
 import unittest
+import shutil
 import sys
+import json
 import os
+import tempfile
 
 sys.path.insert(1, os.path.join(sys.path[0], '..'))
 from msedge.selenium_tools import Edge, EdgeOptions, EdgeService
+from fake_msedgedriver import FakeService
 
 class EdgeDriverTest(unittest.TestCase):
 
@@ -114,5 +120,100 @@ class EdgeDriverTest(unittest.TestCase):
         cap = options.to_capabilities()
         self.assertEqual('webview2', cap['browserName'])
 
+    def test_extensions_are_encoded_and_cached(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'extension.crx')
+            data = os.urandom(1024 * 1024 + 1)
+            with open(path, 'wb') as f:
+                f.write(data)
+
+            options = EdgeOptions()
+            options.add_extension(path)
+            encoded = options.extensions[0]
+            self.assertEqual(base64.b64encode(data).decode('UTF-8'), encoded)
+
+            other = EdgeOptions()
+            other.add_extension(path)
+            self.assertIs(encoded, other.extensions[0])
+
+            with open(path, 'ab') as f:
+                f.write(b'changed')
+            self.assertEqual(base64.b64encode(data + b'changed').decode('UTF-8'),
+                             other.extensions[0])
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_frozen_options_are_immutable_snapshots(self):
+        options = EdgeOptions()
+        options.use_chromium = True
+        options.add_argument('--headless')
+        options.add_experimental_option('prefs', {'download.default_directory': '/tmp'})
+
+        frozen = options.freeze()
+        options.add_argument('--mute-audio')
+        self.assertEqual(('--headless',), frozen['ms:edgeOptions']['args'])
+        self.assertRaises(TypeError, frozen.__setitem__, 'browserName', 'webview2')
+        self.assertRaises(TypeError, frozen['ms:edgeOptions']['prefs'].update, {})
+        with self.assertRaises(TypeError):
+            frozen['ms:edgeOptions'] |= {'args': []}
+
+        caps = frozen.to_capabilities()
+        caps['ms:edgeOptions']['args'].append('--mute-audio')
+        self.assertEqual(['--headless', '--mute-audio'], caps['ms:edgeOptions']['args'])
+        self.assertEqual(frozen, pickle.loads(pickle.dumps(frozen)))
+
+        clone = frozen.clone()
+        clone.add_argument('--inprivate')
+        self.assertEqual(['--headless', '--inprivate'], clone.arguments)
+        self.assertEqual(['--headless', '--mute-audio'], options.arguments)
+
+    def test_frozen_options_launch_session(self):
+        options = EdgeOptions()
+        options.use_chromium = True
+        options.add_argument('--headless')
+        frozen = options.freeze()
+
+        for _ in range(2):
+            service = FakeService()
+            driver = Edge(options=frozen, service=service)
+            try:
+                session = service.server.sessions[driver.session_id]
+                self.assertEqual(['--headless'], session.capabilities['ms:edgeOptions']['args'])
+                self.assertTrue(session.capabilities['ms:edgeChromium'])
+            finally:
+                driver.quit()
+        self.assertIsNotNone(frozen._session_body)
+
+    def test_frozen_options_with_subclass(self):
+        options = EdgeOptions()
+        options.use_chromium = True
+        frozen = options.freeze()
+        started = []
+
+        class Driver(Edge):
+            def start_session(self, capabilities, browser_profile=None):
+                started.append(capabilities['browserName'])
+                Edge.start_session(self, capabilities, browser_profile)
+
+        driver = Driver(options=frozen, service=FakeService())
+        try:
+            self.assertEqual(['MicrosoftEdge'], started)
+            self.assertIsNotNone(driver.session_id)
+            self.assertNotIn('execute', vars(driver))
+            self.assertIsNone(driver._starting_snapshot)
+        finally:
+            driver.quit()
+
+    def test_frozen_options_with_proxy(self):
+        options = EdgeOptions()
+        options.use_chromium = True
+        options.set_capability('proxy', {'proxyType': 'MANUAL', 'httpProxy': 'proxy:8080'})
+        frozen = options.freeze()
+        Edge(options=frozen, service=FakeService()).quit()
+        body = json.loads(frozen._session_body)
+        self.assertEqual('manual', body['capabilities']['alwaysMatch']['proxy']['proxyType'])
+        self.assertEqual('MANUAL', frozen['proxy']['proxyType'])
+
 if __name__=='__main__':
     unittest.main()
\ No newline at end of file
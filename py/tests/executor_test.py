@@ -0,0 +1,165 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+import warnings
+
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+from selenium.common.exceptions import WebDriverException
+from msedge.selenium_tools import Edge, EdgeExecutor, EdgeOptions
+from msedge.selenium_tools.executor import TaskTimeoutError, WorkerCrashedError
+from fake_msedgedriver import FakeService
+
+
+def fake_driver(options):
+    warnings.simplefilter('ignore', DeprecationWarning)
+    return Edge(options=options, service=FakeService())
+
+
+def visit(driver, url):
+    driver.get(url)
+    return os.getpid(), driver.session_id, driver.current_url
+
+
+def fail(driver, item):
+    raise ValueError(item)
+
+
+def sleep(driver, seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def crash_driver_once(driver, marker):
+    if not os.path.exists(marker):
+        open(marker, 'w').close()
+        driver.service.stop()
+        raise WebDriverException("driver is gone")
+    return driver.session_id
+
+
+def crash_driver_always(driver, log):
+    with open(log, 'a') as f:
+        f.write('attempt\n')
+    driver.service.stop()
+    raise WebDriverException("driver is gone")
+
+
+def crash_worker_once(driver, marker):
+    if not os.path.exists(marker):
+        open(marker, 'w').close()
+        os._exit(1)
+    return os.getpid()
+
+
+@unittest.skipIf(os.name == 'nt', reason="The tests rely on fork and process groups.")
+class EdgeExecutorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.options = EdgeOptions()
+        self.options.use_chromium = True
+        self.tmpdir = tempfile.mkdtemp()
+        self.executor = EdgeExecutor(self.options, max_workers=2, task_timeout=10,
+                                     driver_factory=fake_driver)
+
+    def tearDown(self):
+        self.executor.shutdown(timeout=5)
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_map_reuses_long_lived_sessions(self):
+        urls = ['http://example.com/%d' % i for i in range(20)]
+        results = list(self.executor.map(visit, urls))
+        self.assertEqual(urls, [url for _, _, url in results])
+        self.assertLessEqual(len(set((pid, session) for pid, session, _ in results)), 2)
+
+        pids = set(pid for pid, _, _ in self.executor.map(visit, urls[:4]))
+        self.assertTrue(pids <= set(pid for pid, _, _ in results))
+
+    def test_unordered(self):
+        results = list(self.executor.map(sleep, [0.5, 0], ordered=False))
+        self.assertEqual([0, 0.5], results)
+
+    def test_items_are_consumed_lazily(self):
+        consumed = []
+
+        def items():
+            for i in range(100):
+                consumed.append(i)
+                yield 'http://example.com/%d' % i
+
+        results = self.executor.map(visit, items())
+        next(results)
+        self.assertLess(len(consumed), 10)
+        results.close()
+
+    def test_exceptions(self):
+        results = self.executor.map(fail, ['a', 'b'], return_exceptions=True)
+        self.assertEqual([('a',), ('b',)], [e.args for e in results])
+        with self.assertRaises(ValueError):
+            list(self.executor.map(fail, ['c']))
+
+    def test_task_timeout(self):
+        self.executor.task_timeout = 0.5
+        started = time.time()
+        results = list(self.executor.map(sleep, [30, 0], return_exceptions=True))
+        self.assertLess(time.time() - started, 10)
+        self.assertIsInstance(results[0], TaskTimeoutError)
+        self.assertEqual(0, results[1])
+        self.assertEqual([0], list(self.executor.map(sleep, [0])))
+
+    def test_retry_on_fresh_session_after_driver_crash(self):
+        marker = os.path.join(self.tmpdir, 'driver')
+        results = list(self.executor.map(crash_driver_once, [marker]))
+        self.assertTrue(os.path.exists(marker))
+        self.assertIsNotNone(results[0])
+
+    def test_retries_are_bounded(self):
+        log = os.path.join(self.tmpdir, 'attempts')
+        self.executor.max_retries = 2
+        results = list(self.executor.map(crash_driver_always, [log], return_exceptions=True))
+        self.assertIsInstance(results[0], WebDriverException)
+        with open(log) as f:
+            self.assertEqual(3, len(f.readlines()))
+
+    def test_retry_after_worker_crash(self):
+        marker = os.path.join(self.tmpdir, 'worker')
+        self.assertEqual(1, len(list(self.executor.map(crash_worker_once, [marker]))))
+
+        self.executor.max_retries = 0
+        os.remove(marker)
+        results = list(self.executor.map(crash_worker_once, [marker], return_exceptions=True))
+        self.assertIsInstance(results[0], WorkerCrashedError)
+
+    def test_one_map_at_a_time(self):
+        first = self.executor.map(visit, ['http://example.com'])
+        with self.assertRaises(RuntimeError):
+            self.executor.map(visit, ['http://example.com'])
+        first.close()
+        self.assertEqual(1, len(list(self.executor.map(visit, ['http://example.com']))))
+
+    def test_shutdown(self):
+        list(self.executor.map(visit, ['http://example.com']))
+        processes = [worker.process for worker in self.executor._workers]
+        self.executor.shutdown()
+        self.assertEqual([0, 0], [process.exitcode for process in processes])
+        with self.assertRaises(RuntimeError):
+            self.executor.map(visit, [])
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+import warnings
+from distutils.spawn import find_executable
+
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+from selenium.webdriver.common.by import By
+from msedge.selenium_tools import Edge, EdgeOptions
+from msedge.selenium_tools.webdriver import _EXTRACT_ELEMENTS_SCRIPT
+from fake_msedgedriver import FakeService
+
+
+class ExtractElementsTest(unittest.TestCase):
+
+    def setUp(self):
+        warnings.simplefilter('ignore', DeprecationWarning)
+        options = EdgeOptions()
+        options.use_chromium = True
+        self.service = FakeService()
+        self.driver = Edge(options=options, service=self.service)
+        self.calls = []
+
+        def script_handler(script, args):
+            self.calls.append(args)
+            return dict((name, ['%s%d' % (name, i) for i in range(3)]) for name in args[2])
+        self.service.server.script_handler = script_handler
+
+    def tearDown(self):
+        self.driver.quit()
+
+    def test_single_round_trip(self):
+        requests = len(self.service.server.requests)
+        columns = self.driver.extract_elements('a.result', ['text', '@href', 'rect'])
+        self.assertEqual(['text0', 'text1', 'text2'], columns['text'])
+        self.assertEqual(['@href0', '@href1', '@href2'], columns['@href'])
+        self.assertEqual(1, len(self.service.server.requests) - requests)
+        self.assertEqual([['a.result', 'css selector', ['text', '@href', 'rect'], None, None]], self.calls)
+
+    def test_xpath_and_limit(self):
+        self.driver.extract_elements('//a', ('text',), by=By.XPATH, limit=10)
+        self.assertEqual(['//a', 'xpath', ['text'], 10, None], self.calls[0])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            self.driver.extract_elements('a', ['text'], by=By.ID)
+        with self.assertRaises(TypeError):
+            self.driver.extract_elements('a', 'text')
+        self.assertEqual([], self.calls)
+
+
+# A minimal DOM: two elements and, through XPath, a text and an attribute node.
+_DOM_STUB = '''
+function element(tag, text, attributes, rect) {
+  return {nodeType: 1, nodeName: tag.toUpperCase(), tagName: tag.toUpperCase(),
+          innerText: text, textContent: text, innerHTML: text,
+          outerHTML: '<' + tag + '>' + text + '</' + tag + '>', value: attributes.value,
+          offsetWidth: rect[2], offsetHeight: rect[3],
+          getAttribute: function(name) { return name in attributes ? attributes[name] : null; },
+          getBoundingClientRect: function() { return {x: rect[0], y: rect[1], width: rect[2], height: rect[3]}; },
+          getClientRects: function() { return []; }};
+}
+var elements = [element('a', 'first', {href: '/1'}, [0, 0, 10, 20]),
+                element('input', '', {value: 'v'}, [0, 20, 0, 0])];
+var others = [{nodeType: 3, nodeName: '#text', textContent: 'text'},
+              {nodeType: 2, nodeName: 'href', textContent: '/1', value: '/1'}];
+var XPathResult = {ORDERED_NODE_SNAPSHOT_TYPE: 7};
+var document = {
+  querySelectorAll: function(selector) { return elements; },
+  evaluate: function(expression, root, resolver, type, result) {
+    var nodes = elements.concat(others);
+    return {snapshotLength: nodes.length, snapshotItem: function(i) { return nodes[i]; }};
+  }
+};
+'''
+
+
+@unittest.skipIf(find_executable('node') is None, 'needs node to run the script')
+class ExtractElementsScriptTest(unittest.TestCase):
+
+    def run_script(self, *args):
+        source = '%s\nconsole.log(JSON.stringify((function() {%s}).apply(null, %s)));' % (
+            _DOM_STUB, _EXTRACT_ELEMENTS_SCRIPT, json.dumps(list(args)))
+        output = subprocess.check_output(['node', '-e', source])
+        return json.loads(output.decode('utf-8'))
+
+    def test_columns(self):
+        columns = self.run_script('a', 'css selector', ['text', 'tag_name', '@href', 'rect', 'visible', 'value'],
+                                  None, None)
+        self.assertEqual({
+            'text': ['first', ''],
+            'tag_name': ['a', 'input'],
+            '@href': ['/1', None],
+            'rect': [[0, 0, 10, 20], [0, 20, 0, 0]],
+            'visible': [True, False],
+            'value': [None, 'v'],
+        }, columns)
+
+    def test_limit(self):
+        self.assertEqual({'text': ['first']}, self.run_script('a', 'css selector', ['text'], 1, None))
+
+    def test_xpath_text_and_attribute_nodes(self):
+        properties = ['text', 'html', 'tag_name', 'rect', 'visible', '@href']
+        columns = self.run_script('//a | //a/text() | //a/@href', 'xpath', properties, None, None)
+        self.assertEqual(['first', '', 'text', '/1'], columns['text'])
+        self.assertEqual(['a', 'input', '#text', 'href'], columns['tag_name'])
+        for name in ('html', 'rect', 'visible', '@href'):
+            self.assertEqual([None, None], columns[name][2:])
+
+if __name__=='__main__':
+    unittest.main()
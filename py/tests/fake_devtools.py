@@ -0,0 +1,197 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+A local stand-in for the browser's DevTools endpoint: serves /json/list
+and answers DevTools commands over a WebSocket.
+"""
+
+import base64
+import hashlib
+import json
+import socket
+import struct
+import threading
+
+_WEBSOCKET_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+
+class FakeCdpError(Exception):
+
+    def __init__(self, message, code=-32000):
+        Exception.__init__(self, message)
+        self.code = code
+
+
+class _Client(object):
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.reader = sock.makefile('rb')
+        self.lock = threading.Lock()
+
+    def send(self, message, opcode=0x1):
+        data = json.dumps(message).encode('UTF-8') if opcode == 0x1 else message
+        length = len(data)
+        if length < 126:
+            header = struct.pack('!BB', 0x80 | opcode, length)
+        elif length < 1 << 16:
+            header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+        with self.lock:
+            try:
+                self.sock.sendall(header + data)
+            except socket.error:
+                # The client went away; the server's read loop ends next.
+                self.close()
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+
+    def recv(self):
+        header = self.reader.read(2)
+        if len(header) < 2:
+            return None
+        first, second = struct.unpack('!BB', header)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack('!H', self.reader.read(2))[0]
+        elif length == 127:
+            length = struct.unpack('!Q', self.reader.read(8))[0]
+        mask = self.reader.read(4)
+        payload = bytearray(self.reader.read(length))
+        for i in range(length):
+            payload[i] ^= mask[i % 4]
+        if first & 0x0F == 0x8:
+            return None
+        return json.loads(bytes(payload).decode('UTF-8'))
+
+
+class FakeDevTools(object):
+    """
+    Answers commands with handlers[method](params), or {} when there is no
+    handler, and records every command received in self.commands.
+    """
+
+    def __init__(self):
+        self.handlers = {}
+        self.commands = []
+        self.clients = []
+        self.target_id = 'FAKE-TARGET'
+        # Raw bytes sent right after the handshake response, in the same write.
+        self.greeting = b''
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.bind(('127.0.0.1', 0))
+        self._sock.listen(16)
+        self._thread = None
+
+    @property
+    def address(self):
+        return '127.0.0.1:%d' % self._sock.getsockname()[1]
+
+    @property
+    def websocket_url(self):
+        return 'ws://%s/devtools/page/%s' % (self.address, self.target_id)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._accept)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        try:
+            self._sock.close()
+        except socket.error:
+            pass
+        for client in list(self.clients):
+            client.close()
+
+    def emit(self, method, params=None, session_id=None):
+        message = {'method': method, 'params': params or {}}
+        if session_id is not None:
+            message['sessionId'] = session_id
+        for client in list(self.clients):
+            client.send(message)
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _ = self._sock.accept()
+            except (socket.error, OSError):
+                return
+            thread = threading.Thread(target=self._serve, args=(sock,))
+            thread.daemon = True
+            thread.start()
+
+    def _serve(self, sock):
+        # A client that disconnects just ends its connection, without
+        # errors escaping the server thread.
+        try:
+            self._handle(sock)
+        except socket.error:
+            pass
+        finally:
+            sock.close()
+
+    def _handle(self, sock):
+        head = b''
+        while b'\r\n\r\n' not in head:
+            data = sock.recv(4096)
+            if not data:
+                return
+            head += data
+        lines = head.split(b'\r\n\r\n')[0].decode('latin-1').split('\r\n')
+        path = lines[0].split(' ')[1]
+        headers = dict((name.strip().lower(), value.strip())
+                       for name, _, value in (line.partition(':') for line in lines[1:]))
+        if path.startswith('/json'):
+            body = json.dumps([{'id': self.target_id, 'type': 'page', 'url': 'about:blank',
+                                'webSocketDebuggerUrl': self.websocket_url}]).encode('UTF-8')
+            sock.sendall(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                         b'Content-Length: ' + str(len(body)).encode('ascii') +
+                         b'\r\nConnection: close\r\n\r\n' + body)
+            return
+
+        accept = base64.b64encode(hashlib.sha1(
+            headers['sec-websocket-key'].encode('ascii') + _WEBSOCKET_GUID).digest())
+        client = _Client(sock)
+        self.clients.append(client)
+        try:
+            sock.sendall(b'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n'
+                         b'Connection: Upgrade\r\nSec-WebSocket-Accept: ' + accept + b'\r\n\r\n' +
+                         self.greeting)
+            while True:
+                try:
+                    message = client.recv()
+                except (socket.error, ValueError, struct.error):
+                    message = None
+                if message is None:
+                    break
+                self.commands.append((message['method'], message.get('params', {})))
+                reply = {'id': message['id']}
+                if 'sessionId' in message:
+                    reply['sessionId'] = message['sessionId']
+                handler = self.handlers.get(message['method'])
+                try:
+                    reply['result'] = handler(message.get('params', {})) if handler else {}
+                except FakeCdpError as e:
+                    reply['error'] = {'code': e.code, 'message': str(e)}
+                client.send(reply)
+        finally:
+            self.clients.remove(client)
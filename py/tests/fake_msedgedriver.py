@@ -0,0 +1,307 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+A minimal stand-in for msedgedriver used by the tests.
+
+It can run in-process (FakeDriverServer) or as an executable
+(python fake_msedgedriver.py --port=N) so that Service can spawn it.
+"""
+
+import json
+import os
+import re
+import stat
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+STARTED_MESSAGE = 'Microsoft Edge WebDriver was started successfully.'
+
+_SESSION_PATH = re.compile(r'^/session/([^/]+)(/.*)?$')
+
+
+class _Session(object):
+
+    def __init__(self, capabilities, target_id=None):
+        self.id = uuid.uuid4().hex
+        self.capabilities = capabilities
+        self.url = 'about:blank'
+        self.handles = ['CDwindow-%s' % (target_id or uuid.uuid4().hex.upper())]
+        self.current_handle = self.handles[0]
+        self.cookies = []
+        self.network_conditions = None
+        self.cdp_commands = []
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        data = self.rfile.read(length)
+        return json.loads(data.decode('UTF-8')) if data else {}
+
+    def _reply(self, value, status=200):
+        data = json.dumps({'value': value}).encode('UTF-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        fake = self.server.fake
+        if fake.trickle and re.search(fake.trickle, '%s %s' % (self.command, self.path)):
+            # A byte at a time, so that no single read times out.
+            for i in range(len(data)):
+                self.wfile.write(data[i:i + 1])
+                self.wfile.flush()
+                time.sleep(0.05)
+        elif fake.stall and re.search(fake.stall, '%s %s' % (self.command, self.path)):
+            # Half of the body, then nothing until the server stops.
+            self.wfile.write(data[:len(data) // 2])
+            self.wfile.flush()
+            fake.delay_event.wait()
+        else:
+            self.wfile.write(data)
+
+    def _error(self, error, message, status=404):
+        self._reply({'error': error, 'message': message, 'stacktrace': ''}, status)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def _dispatch(self, method):
+        fake = self.server.fake
+        body = self._body() if method == 'POST' else {}
+        fake.requests.append((method, self.path))
+        if fake.delay:
+            fake.delay_event.wait(fake.delay)
+        if fake.hang and re.search(fake.hang, '%s %s' % (method, self.path)):
+            fake.delay_event.wait()
+        if self.path == '/status':
+            return self._reply({'ready': fake.ready, 'message': 'ready'})
+        if self.path == '/shutdown':
+            self._reply(None)
+            return threading.Thread(target=fake.stop).start()
+        if self.path == '/session' and method == 'POST':
+            if fake.refuse_sessions:
+                return self._error('session not created', 'Too many sessions', 500)
+            caps = body.get('desiredCapabilities', {}).copy()
+            caps['browserName'] = 'msedge'
+            caps['ms:edgeOptions'] = dict(caps.get('ms:edgeOptions', {}),
+                                          debuggerAddress=fake.debugger_address)
+            session = _Session(caps, fake.target_id)
+            fake.sessions[session.id] = session
+            return self._reply({'sessionId': session.id, 'capabilities': caps})
+
+        match = _SESSION_PATH.match(self.path)
+        if not match or match.group(1) not in fake.sessions:
+            return self._error('invalid session id', 'No such session')
+        session = fake.sessions[match.group(1)]
+        route = (method, match.group(2) or '')
+
+        if route == ('DELETE', ''):
+            del fake.sessions[session.id]
+            return self._reply(None)
+        if route == ('POST', '/url'):
+            session.url = body['url']
+            return self._reply(None)
+        if route == ('GET', '/url'):
+            return self._reply(session.url)
+        if route == ('GET', '/window'):
+            return self._reply(session.current_handle)
+        if route == ('GET', '/window/handles'):
+            return self._reply(list(session.handles))
+        if route == ('POST', '/window'):
+            session.current_handle = body['handle']
+            return self._reply(None)
+        if route == ('POST', '/window/new'):
+            handle = 'CDwindow-%s' % uuid.uuid4().hex.upper()
+            session.handles.append(handle)
+            return self._reply({'handle': handle, 'type': 'tab'})
+        if route == ('DELETE', '/window'):
+            session.handles.remove(session.current_handle)
+            return self._reply(list(session.handles))
+        if route == ('DELETE', '/cookie'):
+            session.cookies = []
+            return self._reply(None)
+        if route == ('POST', '/chromium/network_conditions'):
+            session.network_conditions = body['network_conditions']
+            return self._reply(None)
+        if route == ('GET', '/chromium/network_conditions'):
+            if session.network_conditions is None:
+                return self._error('unknown error', 'network conditions must be set before it can be retrieved', 500)
+            return self._reply(session.network_conditions)
+        if route == ('POST', '/chromium/launch_app'):
+            return self._error('unknown error', 'unable to launch app %s' % body.get('id'), 500)
+        if route == ('POST', '/ms/cdp/execute'):
+            session.cdp_commands.append((body['cmd'], body['params']))
+            handler = fake.cdp_handlers.get(body['cmd'])
+            return self._reply(handler(body['params']) if handler else {})
+        if route == ('GET', '/screenshot'):
+            if fake.screenshot is None:
+                return self._error('unknown error', 'cannot take screenshot', 500)
+            return self._reply(fake.screenshot)
+        if route == ('POST', '/log'):
+            # Returns up to log_batch_size of the entries logged so far.
+            entries = fake.logs.setdefault(body.get('type'), [])
+            batch = entries[:fake.log_batch_size]
+            del entries[:fake.log_batch_size]
+            return self._reply(batch)
+        if route == ('POST', '/execute/sync'):
+            handler = fake.script_handler
+            return self._reply(handler(body['script'], body['args']) if handler else None)
+        return self._reply(None)
+
+
+class _ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeDriverServer(object):
+    """
+    In-process HTTP server speaking enough of the W3C and msedgedriver
+    protocol for the tools to create, drive and quit sessions.
+    """
+
+    def __init__(self, port=0, host='127.0.0.1'):
+        self.sessions = {}
+        self.requests = []
+        self.cdp_handlers = {}
+        self.script_handler = None
+        self.screenshot = None
+        self.logs = {}
+        self.log_batch_size = 1000
+        self.debugger_address = 'localhost:9222'
+        # DevTools target id of the first window of new sessions.
+        self.target_id = None
+        self.delay = 0
+        self.ready = True
+        self.refuse_sessions = False
+        self.hang = None
+        self.trickle = None
+        self.stall = None
+        self.delay_event = threading.Event()
+        self._server = _ThreadingServer((host, port), _Handler)
+        self._server.fake = self
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%d' % self.port
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.01,))
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.delay_event.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeService(object):
+    """
+    Duck-types EdgeService on top of an in-process FakeDriverServer, so that
+    Edge(service=FakeService()) runs without spawning a process.
+    """
+
+    def __init__(self):
+        self.server = FakeDriverServer()
+        self.port = self.server.port
+        self.process = None
+
+    @property
+    def service_url(self):
+        return self.server.url
+
+    def start(self):
+        self.server.start()
+        self.process = self.server
+
+    def is_connectable(self):
+        return self.process is not None
+
+    def stop(self):
+        if self.process is not None:
+            self.process = None
+            self.server.stop()
+
+
+def make_executable(directory):
+    """
+    Writes a launcher script into directory that runs this module as a
+    driver executable, and returns its path. POSIX only.
+    """
+    path = os.path.join(directory, 'msedgedriver')
+    with open(path, 'w') as f:
+        f.write('#!/bin/sh\nexec "%s" "%s" "$@"\n' % (sys.executable, os.path.abspath(__file__)))
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+
+def main(argv):
+    port = 0
+    hang = None
+    browser_pid_file = None
+    for arg in argv:
+        if arg.startswith('--port='):
+            port = int(arg.split('=', 1)[1])
+        elif arg.startswith('--hang='):
+            hang = arg.split('=', 1)[1]
+        elif arg.startswith('--browser-pid-file='):
+            browser_pid_file = arg.split('=', 1)[1]
+    server = FakeDriverServer(port)
+    server.hang = hang
+    if browser_pid_file:
+        # Stands in for the browser the driver would start.
+        browser = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(600)'])
+        with open(browser_pid_file, 'w') as f:
+            f.write(str(browser.pid))
+    print('Starting Microsoft Edge WebDriver on port %d' % server.port)
+    print(STARTED_MESSAGE)
+    sys.stdout.flush()
+    server._server.serve_forever()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,191 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+import warnings
+
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+from msedge.selenium_tools import Edge, EdgeOptions
+from msedge.selenium_tools.har import HarBuilder, HarWriter, performance_log_events
+from fake_devtools import FakeDevTools
+from fake_msedgedriver import FakeService
+
+
+def request_events(request_id, url, timestamp=100.0, type='Script', frame='F1', status=200):
+    return [
+        ('Network.requestWillBeSent', {
+            'requestId': request_id, 'loaderId': 'L%s' % request_id, 'frameId': frame, 'type': type,
+            'timestamp': timestamp, 'wallTime': 1600000000.5 + timestamp,
+            'request': {'method': 'GET', 'url': url, 'headers': {'Accept': '*/*'}}}),
+        ('Network.responseReceived', {
+            'requestId': request_id, 'timestamp': timestamp + 0.05,
+            'response': {'url': url, 'status': status, 'statusText': 'OK', 'protocol': 'h2',
+                         'mimeType': 'text/html', 'headers': {'Set-Cookie': 'a=1\nb=2'},
+                         'remoteIPAddress': '10.0.0.1',
+                         'timing': {'requestTime': timestamp, 'dnsStart': 1, 'dnsEnd': 5,
+                                    'connectStart': 5, 'connectEnd': 20, 'sslStart': 10,
+                                    'sslEnd': 20, 'sendStart': 21, 'sendEnd': 22,
+                                    'receiveHeadersEnd': 50}}}),
+        ('Network.dataReceived', {'requestId': request_id, 'dataLength': 700}),
+        ('Network.dataReceived', {'requestId': request_id, 'dataLength': 300}),
+        ('Network.loadingFinished', {'requestId': request_id, 'timestamp': timestamp + 0.08,
+                                     'encodedDataLength': 600}),
+    ]
+
+
+def document_events(request_id, url, timestamp=100.0):
+    events = request_events(request_id, url, timestamp, type='Document')
+    events[0][1]['loaderId'] = request_id
+    return events
+
+
+class HarBuilderTest(unittest.TestCase):
+
+    def test_entry_after_loading_finished(self):
+        builder = HarBuilder()
+        events = request_events('1', 'http://example.com/app.js?v=2&x=')
+        for method, params in events[:-1]:
+            self.assertEqual([], builder.feed(method, params))
+        entry, = builder.feed(*events[-1])
+        self.assertEqual('2020-09-13T12:28:20.500Z', entry['startedDateTime'])
+        self.assertEqual('http://example.com/app.js?v=2&x=', entry['request']['url'])
+        self.assertEqual([{'name': 'v', 'value': '2'}, {'name': 'x', 'value': ''}],
+                         entry['request']['queryString'])
+        self.assertEqual('HTTP/2.0', entry['response']['httpVersion'])
+        self.assertEqual([{'name': 'Set-Cookie', 'value': 'a=1'}, {'name': 'Set-Cookie', 'value': 'b=2'}],
+                         entry['response']['headers'])
+        self.assertEqual(1000, entry['response']['content']['size'])
+        self.assertEqual(600, entry['response']['bodySize'])
+        self.assertEqual({'blocked': 1, 'dns': 4, 'connect': 15, 'ssl': 10, 'send': 1,
+                          'wait': 28, 'receive': 30}, entry['timings'])
+        self.assertEqual(79, entry['time'])
+        self.assertEqual('10.0.0.1', entry['serverIPAddress'])
+        self.assertEqual([], builder.flush())
+
+    def test_pages_redirects_and_failures(self):
+        builder = HarBuilder()
+        entries = builder.feed(*document_events('D1', 'http://example.com/')[0])
+        redirected = document_events('D1', 'https://example.com/', 100.1)
+        redirected[0][1]['redirectResponse'] = {'status': 301, 'headers': {'Location': 'https://example.com/'}}
+        entries += builder.entries(redirected)
+        entries += builder.feed('Page.loadEventFired', {'timestamp': 100.5})
+        entries += builder.entries(request_events('2', 'http://example.com/x.css', 100.2)[:1])
+        entries += builder.feed('Network.loadingFailed', {'requestId': '2', 'timestamp': 100.3,
+                                                          'errorText': 'net::ERR_BLOCKED_BY_CLIENT'})
+        self.assertEqual(['http://example.com/', 'https://example.com/', 'http://example.com/x.css'],
+                         [entry['request']['url'] for entry in entries])
+        self.assertEqual(301, entries[0]['response']['status'])
+        self.assertEqual('https://example.com/', entries[0]['response']['redirectURL'])
+        self.assertEqual(200, entries[1]['response']['status'])
+        self.assertEqual('net::ERR_BLOCKED_BY_CLIENT', entries[2]['response']['_error'])
+        self.assertEqual(['page_1'], [page.id for page in builder.pages])
+        self.assertEqual(set(['page_1']), set(entry['pageref'] for entry in entries))
+        self.assertEqual(500, builder.pages[0].on_load)
+
+    def test_pending_requests_are_bounded(self):
+        builder = HarBuilder(max_pending=2)
+        completed = []
+        for i in range(5):
+            completed += builder.feed(*request_events(str(i), 'http://example.com/%d' % i)[0])
+        self.assertEqual(['0', '1', '2'], [entry['_requestId'] for entry in completed])
+        self.assertTrue(all(entry['_incomplete'] for entry in completed))
+        self.assertEqual(3, builder.dropped)
+        self.assertEqual(['3', '4'], [entry['_requestId'] for entry in builder.flush()])
+
+    def test_writer_produces_valid_har(self):
+        out = io.BytesIO()
+        builder = HarBuilder()
+        writer = HarWriter(out)
+        for entry in builder.entries(document_events('D1', u'http://example.com/é')):
+            writer.write(entry)
+        writer.close(builder.pages)
+        log = json.loads(out.getvalue().decode('UTF-8'))['log']
+        self.assertEqual('1.2', log['version'])
+        self.assertEqual([u'http://example.com/é'], [entry['request']['url'] for entry in log['entries']])
+        self.assertEqual(['page_1'], [page['id'] for page in log['pages']])
+
+
+def log_entries(events):
+    entries = [{'level': 'INFO', 'timestamp': 0, 'message': json.dumps(
+        {'message': {'method': 'Tracing.dataCollected', 'params': {}}, 'webview': 'W'})}]
+    for method, params in events:
+        entries.append({'level': 'INFO', 'timestamp': 0, 'message': json.dumps(
+            {'message': {'method': method, 'params': params}, 'webview': 'W'})})
+    return entries
+
+
+class RecordHarTest(unittest.TestCase):
+
+    def setUp(self):
+        warnings.simplefilter('ignore', DeprecationWarning)
+        options = EdgeOptions()
+        options.use_chromium = True
+        options.set_capability('ms:loggingPrefs', {'performance': 'ALL'})
+        self.devtools = FakeDevTools().start()
+        self.service = FakeService()
+        self.service.server.debugger_address = self.devtools.address
+        self.service.server.target_id = self.devtools.target_id
+        self.service.server.log_batch_size = 3
+        self.driver = Edge(options=options, service=self.service)
+
+    def tearDown(self):
+        self.driver.quit()
+        self.devtools.stop()
+
+    def test_performance_log_events(self):
+        self.service.server.logs['performance'] = log_entries(request_events('1', 'http://example.com/'))
+        events = list(performance_log_events(self.driver))
+        self.assertEqual(5, len(events))
+        self.assertEqual('Network.requestWillBeSent', events[0][0])
+        self.assertEqual([], self.service.server.logs['performance'])
+
+    def test_record_from_log(self):
+        self.service.server.logs['performance'] = log_entries(request_events('0', 'http://old/'))
+        out = io.BytesIO()
+        with self.driver.record_har(out) as har:
+            self.service.server.logs['performance'] = log_entries(
+                document_events('D1', 'http://example.com/') + request_events('2', 'http://example.com/a.js'))
+            har.collect()
+            self.assertEqual(2, har.entries_written)
+            self.service.server.logs['performance'] = log_entries(request_events('3', 'http://example.com/b.js')[:2])
+        log = json.loads(out.getvalue().decode('UTF-8'))['log']
+        self.assertEqual(['http://example.com/', 'http://example.com/a.js', 'http://example.com/b.js'],
+                         [entry['request']['url'] for entry in log['entries']])
+        self.assertTrue(log['entries'][2]['_incomplete'])
+
+    def test_record_from_cdp(self):
+        handle, path = tempfile.mkstemp(suffix='.har')
+        os.close(handle)
+        try:
+            with self.driver.record_har(path, source='cdp') as har:
+                for method, params in request_events('1', 'http://example.com/'):
+                    self.devtools.emit(method, params)
+                deadline = time.time() + 5
+                while har.entries_written < 1 and time.time() < deadline:
+                    time.sleep(0.01)
+            self.assertIn(('Network.enable', {}), self.devtools.commands)
+            with open(path, 'rb') as f:
+                log = json.loads(f.read().decode('UTF-8'))['log']
+            self.assertEqual(1, len(log['entries']))
+        finally:
+            os.remove(path)
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(1, ROOT)
+import msedge.selenium_tools
+
+
+def _imported_modules(statements):
+    # Runs in a fresh interpreter so that sys.modules is not shared with the tests.
+    script = statements + '\nimport json, sys\nprint(json.dumps(sorted(sys.modules)))'
+    output = subprocess.check_output([sys.executable, '-W', 'ignore', '-c', script], cwd=ROOT)
+    return json.loads(output.decode('UTF-8').splitlines()[-1])
+
+
+class PublicNamesTest(unittest.TestCase):
+
+    def test_every_public_name_imports(self):
+        for name in msedge.selenium_tools.__all__:
+            namespace = {}
+            exec('from msedge.selenium_tools import %s' % name, namespace)
+            self.assertIsNotNone(namespace[name], name)
+
+    def test_submodules_are_package_attributes(self):
+        modules = _imported_modules('\n'.join([
+            'import msedge.selenium_tools',
+            'assert msedge.selenium_tools.webdriver.WebDriver is msedge.selenium_tools.Edge',
+            'assert msedge.selenium_tools.service_pool.ServicePool is msedge.selenium_tools.EdgeServicePool']))
+        self.assertIn('msedge.selenium_tools.service_pool', modules)
+
+
+@unittest.skipIf(sys.version_info < (3, 7), reason="Lazy imports need module __getattr__.")
+class LazyImportTest(unittest.TestCase):
+
+    def test_package_import_does_not_import_selenium(self):
+        modules = _imported_modules('import msedge.selenium_tools')
+        self.assertEqual([], [m for m in modules if m.startswith('selenium')])
+
+    def test_options_do_not_import_selenium(self):
+        modules = _imported_modules('\n'.join([
+            'from msedge.selenium_tools import EdgeOptions',
+            'options = EdgeOptions()',
+            'options.use_chromium = True',
+            'options.add_argument("--headless")',
+            'options.to_capabilities()',
+            'options.freeze()']))
+        self.assertEqual([], [m for m in modules if m.startswith('selenium')])
+        self.assertNotIn('msedge.selenium_tools.webdriver', modules)
+
+    def test_edge_imports_the_driver(self):
+        modules = _imported_modules('from msedge.selenium_tools import Edge')
+        self.assertIn('msedge.selenium_tools.webdriver', modules)
+        self.assertIn('selenium.webdriver.remote.webdriver', modules)
+        self.assertNotIn('msedge.selenium_tools.cdp', modules)
+
+    def test_public_names(self):
+        for name in msedge.selenium_tools.__all__:
+            self.assertIn(name, dir(msedge.selenium_tools))
+            self.assertIsNotNone(getattr(msedge.selenium_tools, name))
+        self.assertEqual('WebDriver', msedge.selenium_tools.Edge.__name__)
+        with self.assertRaises(AttributeError):
+            msedge.selenium_tools.EdgeUnknown
+
+    def test_default_capabilities_match_selenium(self):
+        from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
+        from msedge.selenium_tools.options import _EDGE_CAPABILITIES
+        self.assertEqual(DesiredCapabilities.EDGE, _EDGE_CAPABILITIES)
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+import unittest
+import uuid
+import warnings
+
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+from selenium.common.exceptions import WebDriverException
+from msedge.selenium_tools import Edge, EdgeOptions
+from fake_msedgedriver import FakeService
+
+
+class IsolatedContextTest(unittest.TestCase):
+
+    def setUp(self):
+        warnings.simplefilter('ignore', DeprecationWarning)
+        options = EdgeOptions()
+        options.use_chromium = True
+        self.service = FakeService()
+        self.driver = Edge(options=options, service=self.service)
+        self.session, = self.service.server.sessions.values()
+        self.contexts = {}
+        self.handle_prefix = 'CDwindow-'
+        self.service.server.cdp_handlers.update({
+            'Target.createBrowserContext': self.create_browser_context,
+            'Target.createTarget': self.create_target,
+            'Target.disposeBrowserContext': self.dispose_browser_context,
+        })
+
+    def tearDown(self):
+        self.driver.quit()
+
+    def create_browser_context(self, params):
+        context_id = uuid.uuid4().hex.upper()
+        self.contexts[context_id] = []
+        return {'browserContextId': context_id}
+
+    def create_target(self, params):
+        target_id = uuid.uuid4().hex.upper()
+        handle = self.handle_prefix + target_id
+        self.contexts[params['browserContextId']].append(handle)
+        self.session.handles.append(handle)
+        return {'targetId': target_id}
+
+    def dispose_browser_context(self, params):
+        for handle in self.contexts.pop(params['browserContextId']):
+            self.session.handles.remove(handle)
+        return {}
+
+    def test_switches_to_the_context_and_back(self):
+        original = self.driver.current_window_handle
+        with self.driver.isolated_context('https://example.com') as context:
+            self.assertEqual(context.window_handle, self.driver.current_window_handle)
+            self.assertEqual('CDwindow-' + context.target_id, context.window_handle)
+            self.assertEqual([context.browser_context_id], list(self.contexts))
+        self.assertEqual(original, self.driver.current_window_handle)
+        self.assertEqual({}, self.contexts)
+        self.assertEqual([original], self.driver.window_handles)
+        self.assertIn(('Target.createTarget', {'url': 'https://example.com',
+                                               'browserContextId': context.browser_context_id}),
+                      self.session.cdp_commands)
+
+    def test_window_handle_may_be_the_target_id(self):
+        self.handle_prefix = ''
+        with self.driver.isolated_context() as context:
+            self.assertEqual(context.target_id, self.driver.current_window_handle)
+
+    def test_disposed_after_an_error(self):
+        original = self.driver.current_window_handle
+        with self.assertRaises(ValueError):
+            with self.driver.isolated_context():
+                raise ValueError()
+        self.assertEqual({}, self.contexts)
+        self.assertEqual(original, self.driver.current_window_handle)
+
+    def test_missing_window_handle(self):
+        self.service.server.cdp_handlers['Target.createTarget'] = lambda params: {'targetId': 'unknown'}
+        with self.assertRaises(WebDriverException):
+            with self.driver.isolated_context(timeout=0.05):
+                pass
+        self.assertEqual({}, self.contexts)
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+from selenium.common.exceptions import WebDriverException
+from msedge.selenium_tools import Edge, EdgeOptions
+from fake_msedgedriver import FakeService
+
+
+class LaunchManyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.options = EdgeOptions()
+        self.options.use_chromium = True
+        self.services = []
+        self.lock = threading.Lock()
+
+    def service_factory(self):
+        service = FakeService()
+        with self.lock:
+            self.services.append(service)
+        return service
+
+    def test_launches_drivers_concurrently(self):
+        result = Edge.launch_many(6, self.options, max_parallel=3,
+                                  service_factory=self.service_factory)
+        try:
+            self.assertEqual(6, len(result))
+            self.assertEqual(6, len(set(driver.session_id for driver in result)))
+            for timing in result.timings:
+                self.assertGreaterEqual(timing['total'], timing['new_session'])
+            self.assertGreater(result.wall_time, 0)
+        finally:
+            result.quit_all()
+        self.assertTrue(all(service.process is None for service in self.services))
+
+    def test_partial_failure_quits_started_drivers(self):
+        def service_factory():
+            service = self.service_factory()
+            if len(self.services) == 3:
+                raise WebDriverException('driver failed to start')
+            return service
+
+        with self.assertRaises(WebDriverException):
+            Edge.launch_many(8, self.options, max_parallel=2, service_factory=service_factory)
+        self.assertTrue(all(service.process is None for service in self.services))
+        self.assertTrue(all(not service.server.sessions for service in self.services))
+
+if __name__=='__main__':
+    unittest.main()
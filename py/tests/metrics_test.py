@@ -0,0 +1,117 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+import os
+import sys
+import time
+import unittest
+import warnings
+
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+from msedge.selenium_tools import Edge, EdgeOptions
+from msedge.selenium_tools.metrics import MetricsSampler
+from fake_msedgedriver import FakeService
+
+
+class MetricsSamplerTest(unittest.TestCase):
+
+    def setUp(self):
+        warnings.simplefilter('ignore', DeprecationWarning)
+        options = EdgeOptions()
+        options.use_chromium = True
+        self.service = FakeService()
+        self.driver = Edge(options=options, service=self.service)
+        self.navigation_start = 1.0
+        self.heap = [5.0, 9.0, 7.0]
+        self.calls = 0
+        self.service.server.cdp_handlers['Performance.getMetrics'] = self.get_metrics
+        self.service.server.cdp_handlers['Page.addScriptToEvaluateOnNewDocument'] = \
+            lambda params: {'identifier': '3'}
+        self.service.server.script_handler = lambda script, args: {
+            'url': 'http://example.com/%d' % self.navigation_start, 'ttfb': 12.5,
+            'largest_contentful_paint': 340.0}
+
+    def tearDown(self):
+        self.driver.quit()
+
+    def get_metrics(self, params):
+        heap = self.heap[self.calls % len(self.heap)]
+        self.calls += 1
+        metrics = [{'name': 'NavigationStart', 'value': self.navigation_start},
+                   {'name': 'JSHeapUsedSize', 'value': heap},
+                   {'name': 'LayoutCount', 'value': self.calls}]
+        if self.navigation_start > 1:
+            metrics.append({'name': 'Nodes', 'value': 42})
+        return {'metrics': metrics}
+
+    def cdp_commands(self):
+        return list(self.service.server.sessions.values())[0].cdp_commands
+
+    def test_samples_and_page_summaries(self):
+        sampler = MetricsSampler(self.driver)
+        for _ in range(3):
+            sampler.sample()
+        sampler.capture_page()
+        self.navigation_start = 2.0
+        sampler.sample()
+        sampler.capture_page()
+
+        times, heap = sampler.series('JSHeapUsedSize')
+        self.assertEqual(6, len(times))
+        self.assertEqual([5.0, 9.0, 7.0, 5.0, 9.0, 7.0], list(heap))
+        self.assertEqual([0, 0, 0, 0, 1, 1], list(sampler.pages))
+        _, nodes = sampler.series('Nodes')
+        self.assertTrue(all(math.isnan(value) for value in nodes[:4]))
+        self.assertEqual([42.0, 42.0], list(nodes[4:]))
+
+        first, second = sampler.summaries()
+        self.assertEqual(('http://example.com/1', 4, 9.0, 4.0, None),
+                         (first['url'], first['samples'], first['JSHeapUsedSize'],
+                          first['LayoutCount'], first['Nodes']))
+        self.assertEqual(340.0, first['largest_contentful_paint'])
+        self.assertEqual(('http://example.com/2', 2, 42.0), (second['url'], second['samples'], second['Nodes']))
+
+    def test_oldest_samples_are_dropped(self):
+        sampler = MetricsSampler(self.driver, max_samples=8)
+        for _ in range(10):
+            sampler.sample()
+        times, layouts = sampler.series('LayoutCount')
+        self.assertEqual(8, len(times))
+        self.assertEqual([3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0], list(layouts))
+        self.assertEqual(10, sampler.summaries()[0]['samples'])
+
+    def test_background_sampling(self):
+        with self.driver.sample_metrics(interval=0.01) as sampler:
+            deadline = time.time() + 5
+            while len(sampler.times) < 3 and time.time() < deadline:
+                time.sleep(0.01)
+        self.assertGreaterEqual(len(sampler.times), 3)
+        commands = [cmd for cmd, _ in self.cdp_commands()]
+        self.assertEqual(['Performance.enable', 'Page.addScriptToEvaluateOnNewDocument'], commands[:2])
+        self.assertEqual(['Performance.disable', 'Page.removeScriptToEvaluateOnNewDocument'], commands[-2:])
+        self.assertEqual({'identifier': '3'}, self.cdp_commands()[-1][1])
+
+    def test_restart_adds_the_observer_once(self):
+        sampler = MetricsSampler(self.driver, interval=60)
+        sampler.start()
+        sampler.stop()
+        sampler.start()
+        sampler.stop()
+        commands = [cmd for cmd, _ in self.cdp_commands()]
+        self.assertEqual(2, commands.count('Page.addScriptToEvaluateOnNewDocument'))
+        self.assertEqual(2, commands.count('Page.removeScriptToEvaluateOnNewDocument'))
+
+if __name__=='__main__':
+    unittest.main()
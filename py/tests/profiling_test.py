@@ -0,0 +1,136 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+import warnings
+
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+from selenium.webdriver.remote import webdriver as remote_webdriver
+from msedge.selenium_tools import Edge, EdgeOptions, EdgeStartupProfiler
+from fake_msedgedriver import FakeService, make_executable
+
+
+class StartupProfilerTest(unittest.TestCase):
+
+    def setUp(self):
+        warnings.simplefilter('ignore', DeprecationWarning)
+        self.options = EdgeOptions()
+        self.options.use_chromium = True
+
+    def test_timings_are_not_collected_by_default(self):
+        driver = Edge(options=self.options, service=FakeService())
+        driver.quit()
+        self.assertIsNone(driver.startup_timings)
+
+    def test_phases_and_callback(self):
+        launches = []
+        profiler = EdgeStartupProfiler(callback=launches.append)
+        driver = Edge(options=self.options.freeze(), service=FakeService(), startup_profiler=profiler)
+        driver.quit()
+
+        timings = driver.startup_timings
+        self.assertEqual([timings], launches)
+        for phase in ('capabilities', 'connection', 'new_session', 'total'):
+            self.assertGreaterEqual(timings[phase], 0)
+        self.assertNotIn('process_spawn', timings)
+        self.assertLessEqual(timings['new_session'], timings['total'])
+
+    def test_w3c_encoding_is_timed_as_capabilities(self):
+        make_w3c_caps = remote_webdriver._make_w3c_caps
+
+        def slow_make_w3c_caps(caps):
+            time.sleep(0.2)
+            return make_w3c_caps(caps)
+        remote_webdriver._make_w3c_caps = slow_make_w3c_caps
+        try:
+            for options in (self.options, self.options.freeze()):
+                driver = Edge(options=options, service=FakeService(), startup_profiler=EdgeStartupProfiler())
+                driver.quit()
+                self.assertGreaterEqual(driver.startup_timings['capabilities'], 0.2)
+                self.assertLess(driver.startup_timings['new_session'], 0.2)
+        finally:
+            remote_webdriver._make_w3c_caps = make_w3c_caps
+
+    def test_failing_callback_does_not_fail_the_launch(self):
+        def callback(timings):
+            raise ValueError()
+        profiler = EdgeStartupProfiler(callback=callback)
+        Edge(options=self.options, service=FakeService(), startup_profiler=profiler).quit()
+        self.assertEqual(1, profiler.count)
+
+    def test_summary(self):
+        profiler = EdgeStartupProfiler(max_samples=100)
+        for value in range(1, 101):
+            profiler.record({'new_session': value / 1000.0, 'total': value / 100.0})
+        summary = profiler.summary()
+        self.assertEqual(['new_session', 'total'], sorted(summary))
+        self.assertEqual(100, summary['total']['count'])
+        self.assertAlmostEqual(0.05, summary['new_session']['p50'])
+        self.assertAlmostEqual(0.09, summary['new_session']['p90'])
+        self.assertAlmostEqual(0.99, summary['total']['p99'])
+        self.assertAlmostEqual(1.0, summary['total']['max'])
+        profiler.record({'total': 5.0})
+        self.assertEqual(100, profiler.summary()['total']['count'])
+        profiler.reset()
+        self.assertEqual({}, profiler.summary())
+
+
+@unittest.skipIf(os.name == 'nt', reason="The fake driver launcher is a POSIX shell script.")
+class StartupProfilerServiceTest(unittest.TestCase):
+
+    def setUp(self):
+        warnings.simplefilter('ignore', DeprecationWarning)
+        self.tmpdir = tempfile.mkdtemp()
+        make_executable(self.tmpdir)
+        self.path = os.environ.get('PATH', '')
+        os.environ['PATH'] = self.tmpdir + os.pathsep + self.path
+
+    def tearDown(self):
+        os.environ['PATH'] = self.path
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_service_phases(self):
+        options = EdgeOptions()
+        options.use_chromium = True
+        profiler = EdgeStartupProfiler()
+        for _ in range(2):
+            driver = Edge(options=options, startup_profiler=profiler)
+            driver.quit()
+            self.assertEqual(os.path.join(self.tmpdir, 'msedgedriver'), driver.service.path)
+
+        summary = profiler.summary()
+        for phase in EdgeStartupProfiler.PHASES:
+            self.assertEqual(2, summary[phase]['count'], phase)
+        timings = driver.startup_timings
+        self.assertGreater(timings['port_readiness'], 0)
+        self.assertLessEqual(timings['process_spawn'] + timings['port_readiness'], timings['total'])
+
+    def test_profiling_does_not_change_the_driver_path(self):
+        options = EdgeOptions()
+        options.use_chromium = True
+        paths = []
+        for profiler in (None, EdgeStartupProfiler()):
+            driver = Edge(options=options, startup_profiler=profiler)
+            driver.quit()
+            paths.append(driver.service.path)
+        self.assertEqual(paths[0], paths[1])
+
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,237 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+import urllib3
+
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+from selenium.common.exceptions import SessionNotCreatedException, WebDriverException
+from selenium.webdriver.remote.webdriver import WebDriver as RemoteWebDriver
+from msedge.selenium_tools import Edge, EdgeOptions
+from msedge.selenium_tools.remote_connection import EdgeRemoteConnection
+from fake_msedgedriver import FakeDriverServer, FakeService
+
+
+class EdgeRemoteConnectionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeDriverServer().start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_connections_are_reused(self):
+        connection = EdgeRemoteConnection(self.server.url)
+        for _ in range(20):
+            connection.execute('status', {})
+        stats = connection.pool_stats()
+        self.assertEqual(20, stats['requests'])
+        self.assertEqual(1, stats['connections_opened'])
+        self.assertEqual(19, stats['connections_reused'])
+
+    def test_idle_connections_expire(self):
+        connection = EdgeRemoteConnection(self.server.url, pool_idle_timeout=0.05)
+        connection.execute('status', {})
+        time.sleep(0.1)
+        connection.execute('status', {})
+        stats = connection.pool_stats()
+        self.assertEqual(1, stats['connections_expired'])
+        self.assertEqual(0, stats['connections_reused'])
+        self.assertEqual(2, stats['connections_opened'])
+
+    def test_retries_are_not_counted_as_requests(self):
+        connection = EdgeRemoteConnection(self.server.url)
+        retries = urllib3.Retry(total=2, status_forcelist=[404], raise_on_status=False)
+        response = connection._conn.request('GET', self.server.url + '/missing', retries=retries)
+        self.assertEqual(404, response.status)
+        self.assertEqual(3, self.server.requests.count(('GET', '/missing')))
+        self.assertEqual(1, connection.pool_stats()['requests'])
+
+    def test_concurrent_commands_on_one_driver(self):
+        options = EdgeOptions()
+        options.use_chromium = True
+        driver = Edge(options=options, service=FakeService())
+        errors = []
+
+        def poll():
+            try:
+                for _ in range(25):
+                    driver.execute_cdp_cmd('Browser.getVersion', {})
+                    driver.current_url
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=poll) for _ in range(4)]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual([], errors)
+            stats = driver.command_executor.pool_stats()
+            self.assertLessEqual(stats['connections_opened'], 4)
+            self.assertGreater(stats['connections_reused'], 150)
+        finally:
+            driver.quit()
+
+    def test_command_stats(self):
+        options = EdgeOptions()
+        options.use_chromium = True
+        driver = Edge(options=options, service=FakeService())
+        try:
+            events = []
+            driver.command_executor.add_observer(events.append)
+            stats = driver.command_executor.enable_stats()
+            for _ in range(3):
+                driver.execute_cdp_cmd('Browser.getVersion', {})
+            driver.set_network_conditions(latency=5)
+            self.assertRaises(WebDriverException, driver.launch_app, 'app')
+            driver.service.server.cdp_handlers['Network.getResponseBody'] = lambda params: {'body': 'x' * 1000}
+            driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': '1'})
+
+            summary = driver.command_executor.stats()
+            self.assertEqual(4, summary['executeCdpCommand']['count'])
+            self.assertEqual(0, summary['executeCdpCommand']['errors'])
+            self.assertGreater(summary['executeCdpCommand']['response_bytes'], 1000)
+            self.assertGreater(summary['executeCdpCommand']['request_bytes'], 0)
+            self.assertEqual(1, summary['setNetworkConditions']['count'])
+            self.assertLessEqual(summary['executeCdpCommand']['p50'], summary['executeCdpCommand']['max'])
+            self.assertEqual(6, len(events))
+            self.assertIsNotNone(events[4].error)
+            self.assertIs(stats, driver.command_executor.enable_stats())
+
+            driver.command_executor.disable_stats()
+            driver.command_executor.remove_observer(events.append)
+            driver.execute_cdp_cmd('Browser.getVersion', {})
+            self.assertEqual({}, driver.command_executor.stats())
+            self.assertEqual(6, len(events))
+        finally:
+            driver.quit()
+
+class LoadBalancingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.servers = [FakeDriverServer().start() for _ in range(3)]
+
+    def tearDown(self):
+        for server in self.servers:
+            server.stop()
+
+    def connect(self, **kwargs):
+        connection = EdgeRemoteConnection([server.url for server in self.servers], **kwargs)
+        self.addCleanup(connection.close)
+        return connection
+
+    def new_driver(self, connection):
+        return RemoteWebDriver(command_executor=connection,
+                               desired_capabilities={'browserName': 'MicrosoftEdge'})
+
+    def session_counts(self):
+        return [len(server.sessions) for server in self.servers]
+
+    def test_least_sessions(self):
+        connection = self.connect()
+        drivers = [self.new_driver(connection) for _ in range(6)]
+        self.assertEqual([2, 2, 2], self.session_counts())
+        drivers[0].quit()
+        drivers[1].quit()
+        self.assertEqual(4, sum(self.session_counts()))
+        self.new_driver(connection)
+        self.new_driver(connection)
+        self.assertEqual([2, 2, 2], self.session_counts())
+
+    def test_round_robin(self):
+        connection = self.connect(placement='round_robin')
+        for _ in range(3):
+            self.new_driver(connection).quit()
+            self.assertEqual([0, 0, 0], self.session_counts())
+        self.assertEqual([1, 1, 1], [
+            len([r for r in server.requests if r == ('POST', '/session')]) for server in self.servers])
+
+    def test_session_commands_are_pinned(self):
+        connection = self.connect()
+        drivers = [self.new_driver(connection) for _ in range(3)]
+        for index, driver in enumerate(drivers):
+            driver.get('http://example.com/%d' % index)
+        for index, server in enumerate(self.servers):
+            session, = server.sessions.values()
+            self.assertEqual('http://example.com/%d' % index, session.url)
+
+    def test_unreachable_endpoint_is_ejected(self):
+        self.servers[0].stop()
+        connection = self.connect()
+        for _ in range(4):
+            self.new_driver(connection)
+        self.assertEqual([False, True, True], [e.healthy for e in connection.endpoints()])
+        self.assertEqual([0, 2, 2], [len(e.sessions) for e in connection.endpoints()])
+        self.servers[0] = FakeDriverServer().start()
+
+    def test_refusing_endpoint_is_ejected(self):
+        self.servers[1].refuse_sessions = True
+        connection = self.connect(placement='round_robin')
+        for _ in range(3):
+            self.new_driver(connection)
+        self.assertEqual([True, False, True], [e.healthy for e in connection.endpoints()])
+        self.assertEqual([2, 0, 1], self.session_counts())
+
+    def test_session_refused_everywhere(self):
+        for server in self.servers:
+            server.refuse_sessions = True
+        connection = self.connect()
+        with self.assertRaises(SessionNotCreatedException):
+            self.new_driver(connection)
+        self.assertEqual([True, True, True], [e.healthy for e in connection.endpoints()])
+
+    def test_dead_sessions_are_dropped(self):
+        connection = self.connect()
+        drivers = [self.new_driver(connection) for _ in range(3)]
+        self.servers[0].sessions.clear()
+        with self.assertRaises(WebDriverException):
+            drivers[0].get('http://example.com')
+        self.assertEqual([0, 1, 1], [len(e.sessions) for e in connection.endpoints()])
+
+    def test_health_checks(self):
+        self.servers[1].ready = False
+        connection = self.connect(health_check_interval=0.05)
+        deadline = time.time() + 5
+        while connection.endpoints()[1].healthy and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual([True, False, True], [e.healthy for e in connection.endpoints()])
+        self.new_driver(connection)
+        self.new_driver(connection)
+        self.assertEqual([1, 0, 1], self.session_counts())
+
+        self.servers[1].ready = True
+        connection.check_health()
+        self.assertTrue(connection.endpoints()[1].healthy)
+
+    def test_no_healthy_endpoint(self):
+        connection = self.connect()
+        for server in self.servers:
+            server.ready = False
+        connection.check_health()
+        with self.assertRaises(WebDriverException):
+            self.new_driver(connection)
+
+    def test_invalid_placement(self):
+        with self.assertRaises(ValueError):
+            EdgeRemoteConnection(self.servers[0].url, placement='random')
+
+if __name__=='__main__':
+    unittest.main()
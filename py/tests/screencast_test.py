@@ -0,0 +1,168 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import warnings
+
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+from msedge.selenium_tools import Edge, EdgeOptions
+from msedge.selenium_tools.screencast import FrameRing
+from fake_devtools import FakeDevTools
+from fake_msedgedriver import FakeService
+
+
+class FrameRingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_keeps_latest_frames(self):
+        ring = FrameRing(capacity=3, slot_size=16)
+        for i in range(5):
+            self.assertTrue(ring.put(b'frame%d' % i, timestamp=i))
+        self.assertEqual(3, len(ring))
+        self.assertEqual([(2.0, b'frame2'), (3.0, b'frame3'), (4.0, b'frame4')], list(ring.frames()))
+        self.assertEqual((4.0, b'frame4'), ring.latest())
+        self.assertFalse(ring.put_base64(base64.b64encode(b'x' * 17)))
+        self.assertEqual(1, ring.skipped)
+        self.assertTrue(ring.put_base64(base64.b64encode(b'x' * 16), timestamp=5))
+        self.assertEqual((5.0, b'x' * 16), ring.latest())
+
+    def test_base64_frames_are_decoded_into_the_slot(self):
+        ring = FrameRing(capacity=2, slot_size=100000)
+        frame = os.urandom(100000)
+        encoded = base64.b64encode(frame).decode('ascii')
+        self.assertTrue(ring.put_base64(encoded, timestamp=1))
+        self.assertEqual((1.0, frame), ring.latest())
+        self.assertFalse(ring.put_base64(base64.b64encode(frame + b'x')))
+        self.assertTrue(ring.put_base64(base64.b64encode(b'abcd').rstrip(b'='), timestamp=2))
+        self.assertEqual((2.0, b'abcd'), ring.latest())
+        self.assertEqual(1, ring.skipped)
+        self.assertEqual([(1.0, frame), (2.0, b'abcd')], list(ring.frames()))
+
+    def test_malformed_frame_drops_the_overwritten_frame(self):
+        ring = FrameRing(capacity=2, slot_size=16)
+        ring.put(b'a', timestamp=1)
+        ring.put(b'b', timestamp=2)
+        with self.assertRaises(ValueError):
+            ring.put_base64(base64.b64encode(b'c') + b'A')
+        self.assertEqual(1, ring.skipped)
+        self.assertEqual([(2.0, b'b')], list(ring.frames()))
+        self.assertEqual((2.0, b'b'), ring.latest())
+
+    def test_memory_mapped_file(self):
+        path = os.path.join(self.directory, 'frames.ring')
+        ring = FrameRing(capacity=2, slot_size=8, path=path)
+        ring.put(b'abc', timestamp=1)
+        paths = ring.save(os.path.join(self.directory, 'frames'))
+        ring.close()
+        self.assertEqual(16, os.path.getsize(path))
+        with open(paths[0], 'rb') as f:
+            self.assertEqual(b'abc', f.read())
+
+
+class RecordScreencastTest(unittest.TestCase):
+
+    def setUp(self):
+        warnings.simplefilter('ignore', DeprecationWarning)
+        self.devtools = FakeDevTools().start()
+        self.service = FakeService()
+        self.service.server.debugger_address = self.devtools.address
+        self.service.server.target_id = self.devtools.target_id
+        options = EdgeOptions()
+        options.use_chromium = True
+        self.driver = Edge(options=options, service=self.service)
+        self.acked = threading.Event()
+        self.acks = []
+        self.unacked = 0
+        self.max_unacked = 0
+        self.malformed = ()
+        self.devtools.handlers.update({
+            'Page.startScreencast': self.start_screencast,
+            'Page.screencastFrameAck': self.ack,
+        })
+
+    def tearDown(self):
+        self.driver.quit()
+        self.devtools.stop()
+
+    def start_screencast(self, params):
+        def send_frames():
+            # Like the browser, waits for each frame to be acknowledged.
+            for i in range(self.frame_count):
+                self.acked.clear()
+                self.unacked += 1
+                self.max_unacked = max(self.max_unacked, self.unacked)
+                data = base64.b64encode(b'jpeg%d' % i).decode('ascii')
+                self.devtools.emit('Page.screencastFrame', {
+                    'data': data + 'A' if i in self.malformed else data,
+                    'metadata': {'timestamp': 1000.0 + i}, 'sessionId': i})
+                self.acked.wait(5)
+        thread = threading.Thread(target=send_frames)
+        thread.daemon = True
+        thread.start()
+        return {}
+
+    def ack(self, params):
+        self.unacked -= 1
+        self.acks.append((params['sessionId'], time.time()))
+        self.acked.set()
+        return {}
+
+    def wait_for_acks(self, count):
+        deadline = time.time() + 5
+        while len(self.acks) < count and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_frames_are_stored_and_acknowledged(self):
+        self.frame_count = 5
+        with self.driver.record_screencast(capacity=3, quality=40, max_width=800) as recorder:
+            self.wait_for_acks(5)
+        self.assertEqual([0, 1, 2, 3, 4], [session for session, _ in self.acks])
+        self.assertEqual(1, self.max_unacked)
+        self.assertEqual(5, recorder.received)
+        self.assertEqual([(1002.0, b'jpeg2'), (1003.0, b'jpeg3'), (1004.0, b'jpeg4')],
+                         list(recorder.ring.frames()))
+        start = dict(self.devtools.commands)['Page.startScreencast']
+        self.assertEqual({'format': 'jpeg', 'quality': 40, 'maxWidth': 800, 'everyNthFrame': 1}, start)
+        self.assertEqual('Page.stopScreencast', self.devtools.commands[-1][0])
+
+    def test_malformed_frames_are_skipped_and_acknowledged(self):
+        self.frame_count = 3
+        self.malformed = (1,)
+        with self.driver.record_screencast(capacity=3) as recorder:
+            self.wait_for_acks(3)
+        self.assertEqual([0, 1, 2], [session for session, _ in self.acks])
+        self.assertEqual(1, recorder.ring.skipped)
+        self.assertEqual([(1000.0, b'jpeg0'), (1002.0, b'jpeg2')], list(recorder.ring.frames()))
+
+    def test_max_fps_delays_acknowledgements(self):
+        self.frame_count = 4
+        with self.driver.record_screencast(max_fps=20):
+            self.wait_for_acks(4)
+        self.assertEqual(4, len(self.acks))
+        self.assertGreaterEqual(self.acks[-1][1] - self.acks[0][1], 0.14)
+
+if __name__=='__main__':
+    unittest.main()
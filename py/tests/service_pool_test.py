@@ -0,0 +1,78 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+from msedge.selenium_tools import Edge, EdgeOptions, EdgeServicePool
+from fake_msedgedriver import make_executable
+
+
+def wait_for(predicate, timeout=30):
+    deadline = time.time() + timeout
+    while not predicate():
+        if time.time() > deadline:
+            raise AssertionError('Timed out waiting for condition')
+        time.sleep(0.05)
+
+
+@unittest.skipIf(os.name == 'nt', reason="The fake driver launcher is a POSIX shell script.")
+class ServicePoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.executable = make_executable(self.tmpdir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_pool_fills_and_hands_out_started_services(self):
+        with EdgeServicePool(size=2, executable_path=self.executable) as pool:
+            wait_for(lambda: pool.idle_count == 2)
+            service = pool.acquire()
+            try:
+                self.assertIsNone(service.process.poll())
+                self.assertTrue(service.is_connectable())
+                wait_for(lambda: pool.idle_count == 2)
+            finally:
+                service.stop()
+
+    def test_pool_replaces_dead_services(self):
+        with EdgeServicePool(size=1, executable_path=self.executable,
+                             health_check_interval=0.1) as pool:
+            wait_for(lambda: pool.idle_count == 1)
+            dead = pool._idle[0]
+            dead.process.kill()
+            dead.process.wait()
+            wait_for(lambda: pool.idle_count == 1 and pool._idle[0] is not dead)
+
+    def test_edge_uses_pooled_service(self):
+        options = EdgeOptions()
+        options.use_chromium = True
+        with EdgeServicePool(size=1, executable_path=self.executable) as pool:
+            wait_for(lambda: pool.idle_count == 1)
+            service = pool._idle[0]
+            driver = Edge(options=options, service=pool.acquire())
+            self.assertIs(service, driver.service)
+            self.assertEqual('msedge', driver.capabilities['browserName'])
+            driver.quit()
+            self.assertIsNone(service.process)
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+from selenium.common.exceptions import WebDriverException
+from msedge.selenium_tools import EdgeService
+from fake_msedgedriver import STARTED_MESSAGE, make_executable
+
+
+@unittest.skipIf(os.name == 'nt', reason="The fake driver launcher is a POSIX shell script.")
+class ServiceReadinessTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.executable = make_executable(self.tmpdir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def start(self, readiness, **kwargs):
+        service = EdgeService(self.executable, readiness=readiness, **kwargs)
+        service.start()
+        self.addCleanup(service.stop)
+        self.assertEqual(readiness, service.readiness_mode)
+        self.assertTrue(service.is_connectable())
+        return service
+
+    def test_poll(self):
+        self.start('poll')
+
+    def test_status(self):
+        self.start('status')
+
+    def test_stdout_is_still_logged(self):
+        log_path = os.path.join(self.tmpdir, 'driver.log')
+        service = self.start('stdout', log_path=log_path)
+        service.stop()
+        with open(log_path) as log:
+            self.assertIn(STARTED_MESSAGE, log.read())
+
+    def test_unknown_mode(self):
+        self.assertRaises(ValueError, EdgeService, self.executable, readiness='sleep')
+
+    def test_deadline(self):
+        hanging = os.path.join(self.tmpdir, 'hanging')
+        with open(hanging, 'w') as f:
+            f.write('#!/bin/sh\nexec sleep 30\n')
+        os.chmod(hanging, os.stat(hanging).st_mode | stat.S_IXUSR)
+        for readiness in ('status', 'stdout'):
+            service = EdgeService(hanging, readiness=readiness, start_timeout=0.3)
+            started = time.time()
+            self.assertRaises(WebDriverException, service.start)
+            self.assertLess(time.time() - started, 5)
+            self.assertIsNone(service.process)
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+import unittest
+
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+from msedge.selenium_tools import Edge, EdgeOptions, EdgeSessionPool
+from fake_msedgedriver import FakeService
+
+
+class FakeSessionPool(EdgeSessionPool):
+
+    def __init__(self, *args, **kwargs):
+        EdgeSessionPool.__init__(self, *args, **kwargs)
+        self.services = []
+
+    def create_driver(self):
+        self.services.append(FakeService())
+        return Edge(options=self.options, service=self.services[-1])
+
+
+class SessionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = FakeSessionPool(max_uses=2)
+        self.services = self.pool.services
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_requires_chromium(self):
+        self.assertRaises(ValueError, EdgeSessionPool, EdgeOptions())
+
+    def test_session_is_reset_and_reused(self):
+        with self.pool.lease() as driver:
+            driver.get('https://www.bing.com/search?q=edge')
+            session = self.services[0].server.sessions[driver.session_id]
+            session.handles.append('CDwindow-EXTRA')
+        self.assertEqual(1, len(session.handles))
+        self.assertEqual('about:blank', session.url)
+        commands = [cmd for cmd, _ in session.cdp_commands]
+        self.assertIn('Network.clearBrowserCookies', commands)
+        self.assertIn(('Storage.clearDataForOrigin',
+                       {'origin': 'https://www.bing.com', 'storageTypes': 'all'}),
+                      session.cdp_commands)
+
+        with self.pool.lease() as second:
+            self.assertIs(driver, second)
+        self.assertEqual(1, len(self.services))
+
+    def test_storage_of_every_visited_origin_is_cleared(self):
+        with self.pool.lease() as driver:
+            server = self.services[0].server
+            server.cdp_handlers['Page.getNavigationHistory'] = lambda params: {
+                'currentIndex': 1,
+                'entries': [{'url': 'https://www.bing.com/'}, {'url': 'https://example.com/a'}]}
+            server.cdp_handlers['Page.getFrameTree'] = lambda params: {'frameTree': {
+                'frame': {'url': 'https://example.com/a'},
+                'childFrames': [{'frame': {'url': 'https://ads.example.net/frame'}}]}}
+            driver.get('https://example.com/a')
+            session = server.sessions[driver.session_id]
+        cleared = [params['origin'] for cmd, params in session.cdp_commands
+                   if cmd == 'Storage.clearDataForOrigin']
+        self.assertEqual(['https://ads.example.net', 'https://example.com', 'https://www.bing.com'], cleared)
+        self.assertEqual('Page.resetNavigationHistory', session.cdp_commands[-1][0])
+
+    def test_session_is_quit_after_max_uses(self):
+        for _ in range(2):
+            with self.pool.lease() as driver:
+                pass
+        self.assertIsNone(driver.service.process)
+        with self.pool.lease() as driver:
+            self.assertEqual(2, len(self.services))
+
+    def test_session_is_discarded_when_job_fails(self):
+        try:
+            with self.pool.lease() as driver:
+                raise RuntimeError('job failed')
+        except RuntimeError:
+            pass
+        self.assertIsNone(driver.service.process)
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import warnings
+
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+from selenium.common.exceptions import WebDriverException
+from msedge.selenium_tools import Edge, EdgeOptions
+from msedge.selenium_tools.codec import JsonCodec, get_codec
+from msedge.selenium_tools.streaming import Base64Decoder, CountingWriter, FieldExtractor
+from fake_msedgedriver import FakeService
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def extract(text, key, chunk_size, decode=False):
+    out = io.BytesIO()
+    sink = Base64Decoder(out) if decode else CountingWriter(out)
+    extractor = FieldExtractor(key, sink)
+    data = text.encode('UTF-8')
+    for i in range(0, len(data), chunk_size):
+        extractor.write(data[i:i + chunk_size])
+    return out.getvalue(), json.loads(extractor.close().decode('UTF-8'))
+
+
+class FieldExtractorTest(unittest.TestCase):
+
+    def test_unescapes_across_chunk_boundaries(self):
+        value = u'a"b\\c/d\n\té€\U0001F600 end'
+        text = json.dumps({'before': 1, 'value': value, 'after': [1, 2]})
+        for chunk_size in (1, 2, 3, 5, 7, 64):
+            data, rest = extract(text, 'value', chunk_size)
+            self.assertEqual(value, data.decode('UTF-8'))
+            self.assertEqual({'before': 1, 'value': None, 'after': [1, 2]}, rest)
+
+    def test_decodes_base64(self):
+        payload = os.urandom(1000)
+        text = '{"value": "%s"}' % base64.b64encode(payload).decode('ascii').replace('/', '\\/')
+        for chunk_size in (1, 3, 4, 9, 4096):
+            data, rest = extract(text, 'value', chunk_size, decode=True)
+            self.assertEqual(payload, data)
+            self.assertEqual({'value': None}, rest)
+
+    def test_missing_or_non_string_field(self):
+        data, rest = extract('{"value": null, "data": 3}', 'data', 2)
+        self.assertEqual(b'', data)
+        self.assertEqual({'value': None, 'data': 3}, rest)
+
+    def test_unpaired_surrogate_is_replaced(self):
+        data, _ = extract('{"value": "\\ud800x"}', 'value', 1)
+        self.assertEqual(u'\ufffdx', data.decode('UTF-8'))
+
+    def test_truncated_value(self):
+        extractor = FieldExtractor('value', CountingWriter(io.BytesIO()))
+        extractor.write(b'{"value": "abc')
+        with self.assertRaises(ValueError):
+            extractor.close()
+
+
+class CodecTest(unittest.TestCase):
+
+    def test_get_codec(self):
+        self.assertEqual('json', get_codec('json').name)
+        self.assertIn(get_codec('auto').name, ('orjson', 'ujson', 'json'))
+        codec = JsonCodec()
+        self.assertIs(codec, get_codec(codec))
+        with self.assertRaises(ValueError):
+            get_codec('yaml')
+
+    @unittest.skipIf(orjson is None, reason="orjson is not installed")
+    def test_orjson_round_trip(self):
+        codec = get_codec('orjson')
+        self.assertEqual({'a': [1, u'é']}, codec.loads(codec.dumps({'a': [1, u'é']})))
+
+
+class StreamingDriverTest(unittest.TestCase):
+
+    def setUp(self):
+        warnings.simplefilter('ignore', DeprecationWarning)
+        options = EdgeOptions()
+        options.use_chromium = True
+        self.service = FakeService()
+        self.driver = Edge(options=options, service=self.service, json_codec='auto')
+        self.directory = tempfile.mkdtemp()
+        self.payload = os.urandom(300 * 1024)
+        self.encoded = base64.b64encode(self.payload).decode('ascii')
+
+    def tearDown(self):
+        self.driver.quit()
+        shutil.rmtree(self.directory)
+
+    def test_commands_use_codec(self):
+        self.driver.get('http://example.com/')
+        self.assertEqual('http://example.com/', self.driver.current_url)
+
+    def test_screenshot_as_file(self):
+        self.service.server.screenshot = self.encoded
+        path = os.path.join(self.directory, 'shot.png')
+        self.assertTrue(self.driver.get_screenshot_as_file(path))
+        with open(path, 'rb') as f:
+            self.assertEqual(self.payload, f.read())
+
+    def test_failed_screenshot_writes_nothing(self):
+        path = os.path.join(self.directory, 'shot.png')
+        with self.assertRaises(WebDriverException):
+            self.driver.get_screenshot_as_file(path)
+        self.assertFalse(os.path.exists(path))
+
+    def test_screenshot_failing_midway_leaves_no_file(self):
+        self.service.server.screenshot = self.encoded + 'A'
+        path = os.path.join(self.directory, 'shot.png')
+        with self.assertRaises(ValueError):
+            self.driver.get_screenshot_as_file(path)
+        self.assertEqual([], os.listdir(self.directory))
+
+    def test_screenshot_replaces_existing_file(self):
+        self.service.server.screenshot = self.encoded
+        path = os.path.join(self.directory, 'shot.png')
+        with open(path, 'wb') as f:
+            f.write(b'old')
+        self.assertTrue(self.driver.get_screenshot_as_file(path))
+        with open(path, 'rb') as f:
+            self.assertEqual(self.payload, f.read())
+        self.assertEqual(['shot.png'], os.listdir(self.directory))
+
+    def test_screenshot_to_missing_directory(self):
+        self.service.server.screenshot = self.encoded
+        self.assertFalse(self.driver.get_screenshot_as_file(os.path.join(self.directory, 'no', 'shot.png')))
+
+    def test_cdp_cmd_to_file(self):
+        self.service.server.cdp_handlers['Page.printToPDF'] = lambda params: {'data': self.encoded}
+        out = io.BytesIO()
+        written = self.driver.execute_cdp_cmd_to_file('Page.printToPDF', {}, out)
+        self.assertEqual(len(self.payload), written)
+        self.assertEqual(self.payload, out.getvalue())
+
+    def test_save_response_body(self):
+        bodies = {
+            '1': {'base64Encoded': True, 'body': self.encoded},
+            '2': {'base64Encoded': False, 'body': u'café "quoted"'},
+        }
+        self.service.server.cdp_handlers['Network.getResponseBody'] = \
+            lambda params: bodies[params['requestId']]
+        out = io.BytesIO()
+        self.assertEqual(len(self.payload), self.driver.save_response_body('1', out))
+        self.assertEqual(self.payload, out.getvalue())
+        path = os.path.join(self.directory, 'body.txt')
+        self.driver.save_response_body('2', path)
+        with open(path, 'rb') as f:
+            self.assertEqual(u'café "quoted"', f.read().decode('UTF-8'))
+
+if __name__=='__main__':
+    unittest.main()
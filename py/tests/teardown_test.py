@@ -0,0 +1,123 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import warnings
+
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+from msedge.selenium_tools import Edge, EdgeOptions, close_all
+from msedge.selenium_tools import teardown
+from fake_msedgedriver import FakeService, make_executable
+
+
+def _options():
+    options = EdgeOptions()
+    options.use_chromium = True
+    return options
+
+
+class TeardownTest(unittest.TestCase):
+
+    def setUp(self):
+        warnings.simplefilter('ignore', DeprecationWarning)
+
+    def test_quit_async(self):
+        service = FakeService()
+        driver = Edge(options=_options(), service=service)
+        report = driver.quit_async().result(10)
+        self.assertTrue(report.graceful)
+        self.assertFalse(report.killed)
+        self.assertEqual([], report.leaked)
+        self.assertIsNone(service.process)
+
+    def test_close_all_runs_in_parallel(self):
+        services = [FakeService() for _ in range(4)]
+        drivers = [Edge(options=_options(), service=service) for service in services]
+        for service in services:
+            service.server.delay = 0.3
+        started = time.time()
+        reports = close_all(drivers)
+        self.assertLess(time.time() - started, 2.0)
+        self.assertEqual([True] * 4, [report.graceful for report in reports])
+        self.assertEqual([None] * 4, [service.process for service in services])
+
+    def test_close_all_without_drivers(self):
+        self.assertEqual([], close_all([]))
+
+
+@unittest.skipIf(not os.path.isdir('/proc') and teardown.psutil is None,
+                 reason="Child processes can only be listed with /proc or psutil.")
+class TeardownEscalationTest(unittest.TestCase):
+
+    def setUp(self):
+        warnings.simplefilter('ignore', DeprecationWarning)
+        self.tmpdir = tempfile.mkdtemp()
+        self.executable = make_executable(self.tmpdir)
+        self.pid_file = os.path.join(self.tmpdir, 'browser.pid')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def start(self, hang=None):
+        args = ['--browser-pid-file=%s' % self.pid_file]
+        if hang:
+            args.append('--hang=%s' % hang)
+        driver = Edge(self.executable, options=_options(), service_args=args)
+        with open(self.pid_file) as f:
+            return driver, int(f.read())
+
+    def test_hung_quit_is_killed(self):
+        driver, browser_pid = self.start(hang='^DELETE /session/[^/]+$')
+        started = time.time()
+        report = driver.quit_async(timeout=0.5).result(10)
+        self.assertLess(time.time() - started, 5)
+        self.assertFalse(report.graceful)
+        self.assertTrue(report.killed)
+        self.assertEqual([], report.leaked)
+        self.assertFalse(teardown._is_running(browser_pid))
+        self.assertIsNone(driver.service.process)
+
+    def test_leaked_processes_are_reported(self):
+        # The fake driver does not stop its browser when it shuts down.
+        driver, browser_pid = self.start()
+        report = teardown.teardown(driver)
+        self.assertTrue(report.graceful)
+        self.assertEqual([browser_pid], report.leaked)
+        deadline = time.time() + 5
+        while teardown._is_running(browser_pid) and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertFalse(teardown._is_running(browser_pid))
+
+    def test_reused_process_ids_are_not_killed(self):
+        process = subprocess.Popen(['sleep', '30'])
+        try:
+            (pid, started), = [child for child in teardown._descendants(os.getpid())
+                               if child[0] == process.pid]
+            teardown._kill_pid(pid, started + 1)
+            self.assertIsNone(process.poll())
+            teardown._kill_pid(pid, started)
+            self.assertIsNotNone(process.wait())
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+if __name__=='__main__':
+    unittest.main()
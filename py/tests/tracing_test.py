@@ -0,0 +1,151 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import gzip
+import io
+import json
+import os
+import sys
+import unittest
+import warnings
+
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+from msedge.selenium_tools import Edge, EdgeOptions
+from msedge.selenium_tools.cdp import CdpError
+from msedge.selenium_tools.tracing import trace_config
+from fake_devtools import FakeCdpError, FakeDevTools
+from fake_msedgedriver import FakeService
+
+
+class TraceConfigTest(unittest.TestCase):
+
+    def test_preset_with_additions_and_exclusions(self):
+        config = trace_config(categories=['v8', '-cc'], exclude=['netlog'], preset='loading')
+        self.assertEqual(['loading', 'navigation', 'blink.user_timing', 'devtools.timeline', 'v8'],
+                         config['includedCategories'])
+        self.assertEqual(['*', 'cc', 'netlog'], config['excludedCategories'])
+        self.assertEqual('recordUntilFull', config['recordMode'])
+
+    def test_unknown_preset(self):
+        with self.assertRaises(ValueError):
+            trace_config(preset='everything')
+
+
+class TraceTest(unittest.TestCase):
+
+    def setUp(self):
+        warnings.simplefilter('ignore', DeprecationWarning)
+        self.devtools = FakeDevTools().start()
+        self.service = FakeService()
+        self.service.server.debugger_address = self.devtools.address
+        self.service.server.target_id = self.devtools.target_id
+        options = EdgeOptions()
+        options.use_chromium = True
+        self.driver = Edge(options=options, service=self.service)
+        self.trace = json.dumps({'traceEvents': [{'name': 'event%d' % i, 'ph': 'X'} for i in range(2000)]})
+        self.base64 = False
+        self.reads = []
+        self.devtools.handlers.update({
+            'Tracing.end': self.end,
+            'IO.read': self.read,
+        })
+
+    def tearDown(self):
+        self.driver.quit()
+        self.devtools.stop()
+
+    def end(self, params):
+        # Like the browser, completes the trace before replying.
+        self.devtools.emit('Tracing.tracingComplete', {'stream': '7', 'dataLossOccurred': False})
+        return {}
+
+    def read(self, params):
+        data = self.payload[len(self.reads) * params['size']:(len(self.reads) + 1) * params['size']]
+        self.reads.append(len(data))
+        if self.base64:
+            return {'data': base64.b64encode(data).decode('ascii'), 'base64Encoded': True,
+                    'eof': not data}
+        return {'data': data.decode('UTF-8'), 'eof': not data}
+
+    def test_trace_is_written_in_chunks(self):
+        self.payload = self.trace.encode('UTF-8')
+        out = io.BytesIO()
+        with self.driver.trace(out, preset='loading', chunk_size=4096) as tracer:
+            pass
+        self.assertEqual(self.payload, out.getvalue())
+        self.assertEqual(len(self.payload), tracer.written)
+        self.assertTrue(all(size <= 4096 for size in self.reads))
+        methods = [method for method, _ in self.devtools.commands]
+        self.assertEqual('Tracing.start', methods[0])
+        self.assertEqual('IO.close', methods[-1])
+        start = self.devtools.commands[0][1]
+        self.assertEqual('ReturnAsStream', start['transferMode'])
+        self.assertIn('loading', start['traceConfig']['includedCategories'])
+
+    def test_gzipped_trace(self):
+        self.payload = gzip.compress(self.trace.encode('UTF-8'))
+        self.base64 = True
+        out = io.BytesIO()
+        with self.driver.trace(out, compression='gzip', chunk_size=1000):
+            pass
+        self.assertEqual(self.trace, gzip.decompress(out.getvalue()).decode('UTF-8'))
+
+    def test_trace_is_written_when_block_raises(self):
+        self.payload = self.trace.encode('UTF-8')
+        out = io.BytesIO()
+        with self.assertRaises(RuntimeError):
+            with self.driver.trace(out):
+                raise RuntimeError("job failed")
+        self.assertEqual(self.payload, out.getvalue())
+
+    def test_mixed_chunks_are_counted(self):
+        chunks = [{'data': '{"traceEvents": ['},
+                  {'data': base64.b64encode(b'{"name": "a"}').decode('ascii'), 'base64Encoded': True},
+                  {'data': ', {"name": "b"}]}', 'eof': True}]
+        self.devtools.handlers['IO.read'] = lambda params: chunks.pop(0)
+        out = io.BytesIO()
+        with self.driver.trace(out) as tracer:
+            pass
+        self.assertEqual(b'{"traceEvents": [{"name": "a"}, {"name": "b"}]}', out.getvalue())
+        self.assertEqual(len(out.getvalue()), tracer.written)
+
+    def test_pending_base64_is_written_when_reading_fails(self):
+        chunks = [{'data': base64.b64encode(b'abcd').decode('ascii').rstrip('='), 'base64Encoded': True}]
+
+        def read(params):
+            if not chunks:
+                raise FakeCdpError("Invalid stream handle")
+            return chunks.pop(0)
+        self.devtools.handlers['IO.read'] = read
+        out = io.BytesIO()
+        with self.assertRaises(CdpError):
+            with self.driver.trace(out):
+                pass
+        self.assertEqual(b'abcd', out.getvalue())
+
+    def test_trace_timeout(self):
+        self.devtools.handlers['Tracing.end'] = lambda params: {}
+        with self.assertRaises(CdpError):
+            with self.driver.trace(io.BytesIO(), timeout=0.2):
+                pass
+
+    def test_stop_errors_do_not_hide_the_block_error(self):
+        self.devtools.handlers['Tracing.end'] = lambda params: {}
+        with self.assertRaises(RuntimeError):
+            with self.driver.trace(io.BytesIO(), timeout=0.2):
+                raise RuntimeError("job failed")
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+# Copyright 2020 Microsoft
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import warnings
+
+sys.path.insert(1, os.path.join(sys.path[0], '..'))
+from selenium.common.exceptions import TimeoutException
+from msedge.selenium_tools import Edge, EdgeOptions
+from msedge.selenium_tools.remote_connection import CommandTimeoutError, EdgeRemoteConnection
+from msedge.selenium_tools import watchdog
+from msedge.selenium_tools.watchdog import Watchdog
+from fake_msedgedriver import FakeDriverServer, FakeService, make_executable
+
+
+class WatchdogTest(unittest.TestCase):
+
+    def test_expired_and_cancelled_watches(self):
+        watchdog = Watchdog()
+        fired = threading.Event()
+        cancelled = []
+        watch = watchdog.watch(0.05, fired.set)
+        other = watchdog.watch(0.01, lambda: cancelled.append(True))
+        self.assertTrue(watchdog.cancel(other))
+        self.assertTrue(fired.wait(5))
+        self.assertTrue(watch.expired)
+        self.assertFalse(watchdog.cancel(watch))
+        time.sleep(0.05)
+        self.assertEqual([], cancelled)
+
+    def test_cancelled_watches_are_pruned(self):
+        watchdog = Watchdog()
+        for _ in range(1000):
+            watchdog.cancel(watchdog.watch(60, lambda: None))
+        self.assertEqual(0, watchdog.pending())
+        self.assertLess(len(watchdog._heap), 200)
+
+
+class CommandDeadlineTest(unittest.TestCase):
+
+    def setUp(self):
+        warnings.simplefilter('ignore', DeprecationWarning)
+        self.options = EdgeOptions()
+        self.options.use_chromium = True
+
+    def test_read_timeout_without_watchdog(self):
+        server = FakeDriverServer().start()
+        self.addCleanup(server.stop)
+        server.hang = '/status'
+        connection = EdgeRemoteConnection(server.url, command_timeouts={'status': 0.2})
+        started = time.time()
+        with self.assertRaises(CommandTimeoutError) as context:
+            connection.execute('status', {})
+        self.assertLess(time.time() - started, 5)
+        self.assertEqual('status', context.exception.command)
+        self.assertEqual(0.2, context.exception.timeout)
+
+    def test_deadline_covers_the_whole_response(self):
+        server = FakeDriverServer().start()
+        self.addCleanup(server.stop)
+        server.trickle = '/status'
+        connection = EdgeRemoteConnection(server.url, command_timeouts={'status': 0.3})
+        started = time.time()
+        with self.assertRaises(CommandTimeoutError):
+            connection.execute('status', {})
+        self.assertLess(time.time() - started, 1)
+        server.trickle = None
+        self.assertTrue(connection.execute('status', {})['value']['ready'])
+
+    def test_stalled_response_runs_on_timeout(self):
+        server = FakeDriverServer().start()
+        self.addCleanup(server.stop)
+        server.stall = '/status'
+        connection = EdgeRemoteConnection(server.url, command_timeouts={'status': 0.3})
+        expired = []
+        connection.on_timeout = expired.append
+        # The socket read times out before the watchdog fires.
+        watch = watchdog.watch
+        watchdog.watch = lambda timeout, callback: watch(timeout + 5, callback)
+        try:
+            with self.assertRaises(CommandTimeoutError):
+                connection.execute('status', {})
+        finally:
+            watchdog.watch = watch
+        self.assertEqual(['status'], expired)
+
+    def test_hung_command_stops_the_service(self):
+        service = FakeService()
+        driver = Edge(options=self.options, service=service, command_timeout=0.2)
+        service.server.hang = '/url'
+        started = time.time()
+        with self.assertRaises(TimeoutException):
+            driver.get('http://example.com')
+        self.assertLess(time.time() - started, 5)
+        self.assertIsNone(service.process)
+        driver.quit()
+
+    def test_per_command_deadline(self):
+        service = FakeService()
+        driver = Edge(options=self.options, service=service,
+                      command_timeout=0.2, command_timeouts={'get': None})
+        service.server.delay = 0.4
+        try:
+            driver.get('http://example.com')
+            with self.assertRaises(CommandTimeoutError):
+                driver.current_url
+        finally:
+            driver.quit()
+
+
+@unittest.skipIf(os.name == 'nt', reason="The fake driver launcher is a POSIX shell script.")
+class ProcessTreeKillTest(unittest.TestCase):
+
+    def setUp(self):
+        warnings.simplefilter('ignore', DeprecationWarning)
+        self.tmpdir = tempfile.mkdtemp()
+        self.executable = make_executable(self.tmpdir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_driver_and_browser_are_killed(self):
+        options = EdgeOptions()
+        options.use_chromium = True
+        pid_file = os.path.join(self.tmpdir, 'browser.pid')
+        driver = Edge(self.executable, options=options, command_timeout=1,
+                      service_args=['--hang=/url', '--browser-pid-file=%s' % pid_file])
+        with open(pid_file) as f:
+            browser_pid = int(f.read())
+        with self.assertRaises(CommandTimeoutError):
+            driver.get('http://example.com')
+        self.assertIsNotNone(driver.service.process.poll())
+        driver.quit()
+
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            try:
+                os.kill(browser_pid, 0)
+            except OSError:
+                break
+            time.sleep(0.05)
+        else:
+            self.fail("The browser process %d is still running" % browser_pid)
+
+if __name__=='__main__':
+    unittest.main()